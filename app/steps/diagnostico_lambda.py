@@ -13,6 +13,8 @@ import traceback
 
 import src.predicciones.core as core
 import src.predicciones.config as cfg
+import src.predicciones.data as data_loader
+from src.predicciones.pipeline import PipelineContext
 
 CONFIG = cfg.resolve_config()
 
@@ -187,57 +189,53 @@ def audit_global_stats_integrity(team_stats, context_name):
 
 # ========== MAIN ==========
 
-def run_diagnostic():
+def run_diagnostic(ctx=None):
+    """Auditoría de lambdas sin ajustes. `ctx` (PipelineContext) comparte inputs entre steps."""
+    ctx = ctx or PipelineContext(CONFIG)
+    config = ctx.config
+    # Buffer limpio por corrida (in-process puede correr varias jornadas)
+    output_buffer.seek(0)
+    output_buffer.truncate(0)
+
     log_section("DIAGNOSTICO LAMBDAS - v6 REFACTORED (CORE LIB)")
     log(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Load data
     log_section("CARGANDO DATOS")
-    with open(CONFIG['INPUT_MATCHES'], 'r', encoding='utf-8') as f:
-        matches_data = json.load(f)
-    log(f"[OK] {CONFIG['INPUT_MATCHES']}: {len(matches_data['matches'])} partidos")
+    matches_data = ctx.matches_data
+    log(f"[OK] {config['INPUT_MATCHES']}: {len(matches_data['matches'])} partidos")
     
-    stats_df = pd.read_csv(CONFIG['INPUT_STATS'], sep='\t')
-    log(f"[OK] {CONFIG['INPUT_STATS']}: {len(stats_df)} registros")
+    stats_df = ctx.stats_df
+    log(f"[OK] {config['INPUT_STATS']}: {len(stats_df)} registros")
     
     # VALIDACION 1: Match Uniqueness (CRITICAL)
     validate_match_uniqueness(stats_df)
     
     # Build stats CANONICAL via CORE
     log_section("CONSTRUYENDO STATS CON NOMBRES CANONICOS")
-    team_stats_current, fusion_log_current = core.build_team_stats_canonical(stats_df, CONFIG['CURRENT_TOURNAMENT'])
+    team_stats_current = ctx.team_stats_current
     
     # VALIDACION 2: Team Names Consistency (CRITICAL)
     validate_team_names_in_matches(matches_data, team_stats_current)
     
     # MULTI-TOURNAMENT PRIOR
     log("Building Multi-Tournament Weighted Prior...")
-    prior_weighted_stats = core.build_weighted_prior_stats(stats_df, CONFIG)
     
     # League avgs
-    league_avg_curr = core.calculate_league_averages_by_tournament(stats_df, CONFIG['CURRENT_TOURNAMENT'])
+    league_avg_curr = ctx.league_avg_curr
 
     # (Audits removed/disabled for priors since logic changed, focusing on lambda audit)
     
     # Calculate lambdas - FUNCION UNICA CENTRALIZADA
     log_section("CALCULANDO LAMBDAS (FUNCION CENTRALIZADA en CORE)")
     
-    results = []
     all_errors = []
     
-    for match in matches_data['matches']:
-        comp, errs = core.compute_components_and_lambdas(
-            match, team_stats_current, 
-            prior_weighted_stats, # CHANGED
-            league_avg_curr, CONFIG,
-            CONFIG['SHRINKAGE_DIVISOR_ACTUAL'], adjustments=None)
-        results.append(comp)
-        all_errors.extend(errs)
-    
-    df = pd.DataFrame(results)
+    # Toda la jornada de una vez (versión columnar, sin adjustments; compartida vía contexto)
+    df = ctx.base_components
     
     # VALIDACION 3: Lambda Sanity (CRITICAL + WARNING)
-    validate_lambda_sanity(df, league_avg_curr, CONFIG)
+    validate_lambda_sanity(df, league_avg_curr, config)
     
     # Errors
     if all_errors:
@@ -269,12 +267,12 @@ def run_diagnostic():
     
     # Save
     log_section("GUARDANDO ARCHIVOS")
-    df.to_csv(CONFIG['OUTPUT_CSV'], index=False, encoding='utf-8')
-    log(f"[OK] CSV: {CONFIG['OUTPUT_CSV']}")
+    df.to_csv(config['OUTPUT_CSV'], index=False, encoding='utf-8')
+    log(f"[OK] CSV: {config['OUTPUT_CSV']}")
     
-    with open(CONFIG['OUTPUT_TXT'], 'w', encoding='utf-8') as f:
+    with open(config['OUTPUT_TXT'], 'w', encoding='utf-8') as f:
         f.write(output_buffer.getvalue())
-    log(f"[OK] TXT: {CONFIG['OUTPUT_TXT']}")
+    log(f"[OK] TXT: {config['OUTPUT_TXT']}")
     
     log_section("COMPLETADO")
     return df
@@ -290,7 +288,7 @@ def validate_match_uniqueness(stats_df):
     
     # Intentar detectar duplicados por (date, home, away)
     if 'date' in stats_df.columns:
-        duplicates = stats_df.groupby(['date', 'home_team', 'away_team']).size()
+        duplicates = stats_df.groupby(['date', 'home_team', 'away_team'], observed=True).size()
         duplicates = duplicates[duplicates > 1]
         
         if len(duplicates) > 0:
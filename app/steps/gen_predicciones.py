@@ -5,9 +5,8 @@ import pandas as pd
 from datetime import datetime
 import src.predicciones.config as config
 import src.predicciones.core as dl  # Alias dl to minimize refactor
-import src.predicciones.data as data_loader
-import src.predicciones.quiniela as qx
-import src.predicciones.improvements as improvements
+import src.predicciones.simulation as simulation
+from src.predicciones.pipeline import PipelineContext
 
 def should_abstain(prob_1, prob_x, prob_2, gap, config):
     """
@@ -29,73 +28,40 @@ def should_abstain(prob_1, prob_x, prob_2, gap, config):
 
     return (is_tight and is_balanced) or is_low_confidence
 
-def main():
-    runtime_config = config.resolve_config()
+def main(ctx=None):
+    """Genera el CSV de predicciones. `ctx` (PipelineContext) comparte inputs entre steps."""
+    ctx = ctx or PipelineContext()
+    runtime_config = ctx.config
     print(f"=== GENERADOR DE PREDICCIONES JORNADA {runtime_config.get('JORNADA', '?')} ===")
     
     # 1. Load Data/Setup
     print("Loading data...")
-
-    with open(runtime_config['INPUT_MATCHES'], 'r', encoding='utf-8') as f:
-        matches_data = json.load(f)
-        
-    stats_df = pd.read_csv(runtime_config['INPUT_STATS'], sep='\t')
+    matches_data = ctx.matches_data
+    stats_df = ctx.stats_df
     
-    # 2. Parse Qualitative
+    # 2. Parse Qualitative (bajas dedup + cualitativo + contexto, ver PipelineContext)
     print("Parsing qualitative data (New Dedup Flow)...")
-    
-    # A. Collect Raw
-    raw_manual = data_loader.collect_manual_bajas(runtime_config['INPUT_EVALUATION'])
-    raw_perplexity = data_loader.collect_perplexity_bajas(runtime_config.get('INPUT_PERPLEXITY_BAJAS', 'data/inputs/perplexity_bajas_semana.json'))
-    
-    # B. Merge and Deduplicate
-    all_bajas = raw_manual + raw_perplexity
-    deduped_bajas = data_loader.deduplicate_bajas(all_bajas)
-    
-    print(f"  > Raw Manual: {len(raw_manual)} | Raw Perplexity: {len(raw_perplexity)}")
-    print(f"  > Deduplicated Total: {len(deduped_bajas)} (Removed {len(all_bajas) - len(deduped_bajas)} duplicates)")
-    
-    # C. Apply
-    adj_map = {} # Initialize empty
-    data_loader.apply_bajas_list(adj_map, deduped_bajas)
-    
-    # D. Qualitative Context (legacy free-text parser, kept for backwards compat)
-    adj_map = data_loader.load_qualitative_adjustments(adj_map, runtime_config['INPUT_QUALITATIVE'])
-
-    # E. Structured Context Adjustments (fatigue, rotation, suspension, motivation...)
-    context_list = data_loader.collect_context_adjustments(runtime_config.get('INPUT_CONTEXT', ''))
-    if context_list:
-        print(f"  > Context adjustments loaded: {len(context_list)} entries")
-        adj_map = data_loader.apply_context_adjustments(adj_map, context_list)
-    else:
-        print("  > No context adjustments file for this jornada (optional)")
+    adj_map = ctx.adjustment_map()
 
     # Debug adjustments
     print("\nADJUSTMENTS APPLIED:")
-    for team, data in adj_map.items():
-        if data['att_adj'] != 1.0 or data['def_adj'] != 1.0:
-            print(f"{team}: Att*{data['att_adj']:.2f}, Def*{data['def_adj']:.2f} | Notes: {len(data['notes'])} items")
+    for team, (att_adj, def_adj) in zip(adj_map.teams, adj_map.factors):
+        if att_adj != 1.0 or def_adj != 1.0:
+            print(f"{team}: Att*{att_adj:.2f}, Def*{def_adj:.2f} | Notes: {len(adj_map.channel(team, 'notes'))} items")
 
     
     # 3. Build Stats
-    # OPTIMIZATION: Pre-calculate canonical names for stats_df
-    if 'home_team_canonical' not in stats_df.columns:
-        stats_df['home_team_canonical'] = stats_df['home_team'].apply(dl.canonical_team_name)
-    if 'away_team_canonical' not in stats_df.columns:
-        stats_df['away_team_canonical'] = stats_df['away_team'].apply(dl.canonical_team_name)
-
-    team_stats_current, _ = dl.build_team_stats_canonical(stats_df, runtime_config['CURRENT_TOURNAMENT'])
+    team_stats_current = ctx.team_stats_current
 
     # MULTI-TOURNAMENT PRIOR (Weighted)
     print("Building Multi-Tournament Weighted Prior...")
-    prior_weighted_stats = dl.build_weighted_prior_stats(stats_df, runtime_config)
+    prior_weighted_stats = ctx.prior_weighted_stats
 
     # Calculate League Avgs (Current only needed for main calculation)
-    league_avg_curr = dl.calculate_league_averages_by_tournament(stats_df, runtime_config['CURRENT_TOURNAMENT'])
-    # league_avg_prior not needed for computation anymore (baked into weighted stats) but verify signature
+    league_avg_curr = ctx.league_avg_curr
 
     # Compute current table for equilibrium detection
-    current_table = dl.calculate_current_table(stats_df, runtime_config['CURRENT_TOURNAMENT'])
+    current_table = ctx.current_table
     dc_rho_base = runtime_config.get('DC_RHO', -0.10)
 
     # === INTEGRACION xG (xgscore.io) ===
@@ -128,12 +94,10 @@ def main():
             adj = max(0.97, min(1.03, 1.0 - pts_diff_ratio * XG_PTS_FACTOR))
             if abs(adj - 1.0) < 0.003:
                 continue  # efecto insignificante (<0.3%), ignorar
-            if team_canon not in adj_map:
-                adj_map[team_canon] = {'att_adj': 1.0, 'def_adj': 1.0, 'notes': []}
-            adj_map[team_canon]['att_adj'] *= adj
             direction = "↓ sobrerendimiento" if adj < 1.0 else "↑ subrendimiento"
-            adj_map[team_canon]['notes'].append(
-                f"xPTS-REGRESION {direction}: {actual_pts:.0f}pts vs {xpts:.1f}xPTS → x{adj:.3f}"
+            adj_map.record(
+                team_canon, 'xpts', att_adj=adj,
+                notes=f"xPTS-REGRESION {direction}: {actual_pts:.0f}pts vs {xpts:.1f}xPTS → x{adj:.3f}"
             )
             print(f"  [xPTS] {team_canon}: {actual_pts:.0f}pts reales vs {xpts:.1f}xPTS → x{adj:.3f}")
             xpts_count += 1
@@ -144,6 +108,11 @@ def main():
     # 4. Generate Predictions
     print("Generating predictions...")
     results = []
+    mc_inputs = []  # (match, ajustes, ρ, pick del modelo) para la simulación de robustez
+    pick_cache = ctx.pick_cache
+    
+    # Forma / momentum / crisis local de toda la jornada en un solo lote
+    team_features = ctx.team_features
     
     print("\nPREDICCIONES Y METRICAS QUINIELA:")
     for match in matches_data['matches']:
@@ -153,33 +122,19 @@ def main():
         home_canon = dl.canonical_team_name(home_raw)
         away_canon = dl.canonical_team_name(away_raw)
         
+        feat_home = team_features[(home_canon, match['match']['kickoff_datetime'])]
+        feat_away = team_features[(away_canon, match['match']['kickoff_datetime'])]
         
-        # Calculate Recent Form
-        form_mult_home, form_details_home = improvements.calculate_recent_form(
-             stats_df, home_canon, match['match']['kickoff_datetime'], runtime_config.get('RECENT_FORM_GAMES', 5)
-        )
-        form_mult_away, form_details_away = improvements.calculate_recent_form(
-             stats_df, away_canon, match['match']['kickoff_datetime'], runtime_config.get('RECENT_FORM_GAMES', 5)
-        )
+        # Recent Form
+        form_mult_home, form_details_home = feat_home['form_multiplier'], feat_home['form_info']
+        form_mult_away, form_details_away = feat_away['form_multiplier'], feat_away['form_info']
 
         # Momentum direction (aceleración/desaceleración dentro de la ventana de forma)
-        momentum_home, momentum_info_home = improvements.calculate_momentum_direction(
-            stats_df, home_canon, match['match']['kickoff_datetime'],
-            threshold=runtime_config.get('MOMENTUM_THRESHOLD', 0.20),
-            bonus_max=runtime_config.get('MOMENTUM_BONUS_MAX', 0.02),
-        )
-        momentum_away, momentum_info_away = improvements.calculate_momentum_direction(
-            stats_df, away_canon, match['match']['kickoff_datetime'],
-            threshold=runtime_config.get('MOMENTUM_THRESHOLD', 0.20),
-            bonus_max=runtime_config.get('MOMENTUM_BONUS_MAX', 0.02),
-        )
+        momentum_home, momentum_info_home = feat_home['momentum_multiplier'], feat_home['momentum_info']
+        momentum_away, momentum_info_away = feat_away['momentum_multiplier'], feat_away['momentum_info']
 
         # Home crisis / stronghold (basado solo en partidos de local)
-        home_crisis_mult, crisis_info = improvements.calculate_home_crisis_factor(
-            stats_df, home_canon, match['match']['kickoff_datetime'],
-            n_home=runtime_config.get('N_HOME_FORM', 4),
-            crisis_threshold=runtime_config.get('HOME_CRISIS_WINS_THRESHOLD', 1),
-        )
+        home_crisis_mult, crisis_info = feat_home['home_crisis_multiplier'], feat_home['home_crisis_info']
 
         # Combined home form adjustment: forma general × momentum × crisis local
         combined_home_form = form_mult_home * momentum_home * home_crisis_mult
@@ -196,24 +151,24 @@ def main():
         if abs(form_mult_home - 1.0) > 0.001:
              print(f"  > HOME FORM: {home_canon} {form_details_home['pct']:.2f} -> {form_mult_home:.3f}")
              if home_canon in adj_map:
-                 adj_map[home_canon]['notes'].append(f"RECENT FORM: {form_details_home['points']}pts ({form_details_home['pct']*100:.0f}%) -> {form_mult_home:.3f}")
+                 adj_map.record(home_canon, 'form', notes=f"RECENT FORM: {form_details_home['points']}pts ({form_details_home['pct']*100:.0f}%) -> {form_mult_home:.3f}")
 
         if abs(form_mult_away - 1.0) > 0.001:
              print(f"  > AWAY FORM: {away_canon} {form_details_away['pct']:.2f} -> {form_mult_away:.3f}")
              if away_canon in adj_map:
-                 adj_map[away_canon]['notes'].append(f"RECENT FORM: {form_details_away['points']}pts ({form_details_away['pct']*100:.0f}%) -> {form_mult_away:.3f}")
+                 adj_map.record(away_canon, 'form', notes=f"RECENT FORM: {form_details_away['points']}pts ({form_details_away['pct']*100:.0f}%) -> {form_mult_away:.3f}")
 
         # Log Momentum
         if abs(momentum_home - 1.0) > 0.005:
             direction_str = "↑ acelerando" if momentum_home > 1.0 else "↓ desacelerando"
             print(f"  > MOMENTUM HOME: {home_canon} {direction_str} -> {momentum_home:.3f}")
-            adj_map.setdefault(home_canon, {'att_adj': 1.0, 'def_adj': 1.0, 'notes': []})['notes'].append(
+            adj_map.record(home_canon, 'momentum', notes=
                 f"MOMENTUM: {direction_str} ({momentum_info_home['recent_2_pts']}pts/2 vs {momentum_info_home['prior_3_pts']}pts/3) -> {momentum_home:.3f}"
             )
         if abs(momentum_away - 1.0) > 0.005:
             direction_str = "↑ acelerando" if momentum_away > 1.0 else "↓ desacelerando"
             print(f"  > MOMENTUM AWAY: {away_canon} {direction_str} -> {momentum_away:.3f}")
-            adj_map.setdefault(away_canon, {'att_adj': 1.0, 'def_adj': 1.0, 'notes': []})['notes'].append(
+            adj_map.record(away_canon, 'momentum', notes=
                 f"MOMENTUM: {direction_str} ({momentum_info_away['recent_2_pts']}pts/2 vs {momentum_info_away['prior_3_pts']}pts/3) -> {momentum_away:.3f}"
             )
 
@@ -221,17 +176,13 @@ def main():
         if abs(home_crisis_mult - 1.0) > 0.001:
             label = crisis_info.get('label', 'normal')
             print(f"  > HOME {label.upper()}: {home_canon} {crisis_info['home_wins']}V/{crisis_info['home_games']}J local -> {home_crisis_mult:.3f}")
-            adj_map.setdefault(home_canon, {'att_adj': 1.0, 'def_adj': 1.0, 'notes': []})['notes'].append(
+            adj_map.record(home_canon, 'home_crisis', notes=
                 f"LOCAL {label.upper()}: {crisis_info['home_wins']}V en {crisis_info['home_games']}J de local -> {home_crisis_mult:.3f}"
             )
         
-        # Apply adjustments from adj_map
-        if home_canon in adj_map:
-             match_adjustments['home_att_adj'] = adj_map[home_canon].get('att_adj', 1.0)
-             match_adjustments['home_def_adj'] = adj_map[home_canon].get('def_adj', 1.0)
-        if away_canon in adj_map:
-             match_adjustments['away_att_adj'] = adj_map[away_canon].get('att_adj', 1.0)
-             match_adjustments['away_def_adj'] = adj_map[away_canon].get('def_adj', 1.0)
+        # Apply adjustments from adj_map (1.0 si el equipo no tiene ajustes)
+        match_adjustments['home_att_adj'], match_adjustments['home_def_adj'] = adj_map.factor(home_canon)
+        match_adjustments['away_att_adj'], match_adjustments['away_def_adj'] = adj_map.factor(away_canon)
         
         # Compute Lambda Components
         try:
@@ -261,7 +212,8 @@ def main():
         dc_rho = (dc_rho_base - 0.04) if is_equilibrio else dc_rho_base
 
         # Optimize pick for quiniela scoring (2 exacto / 1 resultado) con Dixon-Coles
-        quiniela = qx.optimize_pick_for_quiniela(l_home, l_away, dc_rho=dc_rho)
+        quiniela = pick_cache.optimize(l_home, l_away, dc_rho=dc_rho)
+        mc_inputs.append((match, dict(match_adjustments), dc_rho, quiniela['pick_exact']))
         prob_home_win = quiniela['prob_home_win']
         prob_draw = quiniela['prob_draw']
         prob_away_win = quiniela['prob_away_win']
@@ -287,32 +239,23 @@ def main():
         # Baja uncertainty capping: si bajas combinadas son muy altas, bajar confianza a MEDIO
         if conf_label == 'ALTO':
             combined_baja_penalty = 0.0
-            if home_canon in adj_map:
-                combined_baja_penalty += abs(1.0 - adj_map[home_canon].get('att_adj', 1.0))
-                combined_baja_penalty += abs(1.0 - adj_map[home_canon].get('def_adj', 1.0))
-            if away_canon in adj_map:
-                combined_baja_penalty += abs(1.0 - adj_map[away_canon].get('att_adj', 1.0))
-                combined_baja_penalty += abs(1.0 - adj_map[away_canon].get('def_adj', 1.0))
+            for factor in adj_map.factor(home_canon) + adj_map.factor(away_canon):
+                combined_baja_penalty += abs(1.0 - factor)
             baja_threshold = runtime_config.get('BAJA_UNCERTAINTY_THRESHOLD', 0.25)
             if combined_baja_penalty > baja_threshold:
                 conf_label = 'MEDIO'
-                adj_map.setdefault(home_canon, {'att_adj': 1.0, 'def_adj': 1.0, 'notes': []})['notes'].append(
+                adj_map.record(home_canon, 'baja_cap', notes=
                     f"[BAJA-CAP: impacto={combined_baja_penalty:.2f} > {baja_threshold:.2f} → rebajado a MEDIO]"
                 )
 
         # Equilibrio en tabla: añadir nota informativa
         if is_equilibrio and pick_1x2 != 'N/A':
-            adj_map.setdefault(home_canon, {'att_adj': 1.0, 'def_adj': 1.0, 'notes': []})['notes'].append(
+            adj_map.record(home_canon, 'table', notes=
                 f"TABLA-EQUILIBRIO: {home_canon}({home_pts_table}pts) vs {away_canon}({away_pts_table}pts) → DC-ρ={dc_rho:.2f}"
             )
 
         # Qualitative Notes
-        notes_str = ""
-        if home_canon in adj_map and adj_map[home_canon]['notes']:
-            notes_str += f"{' | '.join(adj_map[home_canon]['notes'])}"
-        if away_canon in adj_map and adj_map[away_canon]['notes']:
-            if notes_str: notes_str += " | "
-            notes_str += f"{' | '.join(adj_map[away_canon]['notes'])}"
+        notes_str = " | ".join(adj_map.channel(home_canon, 'notes') + adj_map.channel(away_canon, 'notes'))
 
         results.append({
             'home_team_canonical': home_canon,
@@ -362,5 +305,33 @@ def main():
     df.to_csv(out_file, index=False)
     print(f"\nGuardado en {out_file}")
 
+    cache_stats = ctx.save_pick_cache()
+    print(f"Pick cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['size']} entradas)")
+
+    # 5. Robustez del pick: Monte Carlo sobre posteriores de tasas + ajustes inciertos
+    if runtime_config.get('MC_SIMULATIONS', 0) and mc_inputs:
+        start = datetime.now()
+        teams = list(team_stats_current)
+        home_idx, away_idx, rivalry = dl.encode_matches([m for m, _, _, _ in mc_inputs], teams)
+        robustez = simulation.simulate_pick_robustness(
+            home_idx, away_idx, teams, team_stats_current, prior_weighted_stats,
+            league_avg_curr, runtime_config,
+            point_picks=[pick for _, _, _, pick in mc_inputs],
+            adjustments=dl.adjustments_matrix([adj for _, adj, _, _ in mc_inputs]),
+            adjustment_cv=simulation.adjustment_uncertainty(
+                [teams[i] for i in home_idx], [teams[i] for i in away_idx], adj_map, runtime_config),
+            rivalry=rivalry,
+            dc_rho=[rho for _, _, rho, _ in mc_inputs],
+            xg_lookup=xg_lookup,
+        )
+        robustez_file = f'outputs/robustez_jornada_{jornada}.csv'
+        robustez.to_csv(robustez_file, index=False)
+        print(f"\nROBUSTEZ DEL PICK ({runtime_config['MC_SIMULATIONS']} draws, {(datetime.now() - start).total_seconds():.2f}s):")
+        for row in robustez.itertuples():
+            print(f"  {row.home_team_canonical} vs {row.away_team_canonical}: {row.pick_exact_point} "
+                  f"estable {row.pick_stability:.0%} (1X2 {row.pick_1x2_stability:.0%}) | "
+                  f"EV p05-p95 {row.ev_p05:.3f}-{row.ev_p95:.3f}")
+        print(f"Guardado en {robustez_file}")
+
 if __name__ == "__main__":
     main()
@@ -10,9 +10,7 @@ from math import isnan, exp
 # === CONFIG (Same as gen_predicciones) ===
 # ... (Repeated logic for parsing will be refined to capture text)
 
-import src.predicciones.data as data_loader
-import src.predicciones.quiniela as qx
-import src.predicciones.improvements as improvements
+from src.predicciones.pipeline import PipelineContext
 
 def should_abstain(prob_1, prob_x, prob_2, gap, config):
     """
@@ -28,41 +26,25 @@ def should_abstain(prob_1, prob_x, prob_2, gap, config):
     
     return gap < threshold and spread < spread_threshold
 
-def main():
-    runtime_config = config.resolve_config()
+def main(ctx=None):
+    """Genera el reporte técnico. `ctx` (PipelineContext) comparte inputs entre steps."""
+    ctx = ctx or PipelineContext()
+    runtime_config = ctx.config
     print("Generando Reporte Técnico Automático...")
     
-    # Load inputs
     # Load Inputs
-    with open(runtime_config['INPUT_MATCHES'], 'r', encoding='utf-8') as f:
-        matches_data = json.load(f)
-    stats_df = pd.read_csv(runtime_config['INPUT_STATS'], sep='\t')
+    matches_data = ctx.matches_data
+    stats_df = ctx.stats_df
     
-    team_stats_current, _ = dl.build_team_stats_canonical(stats_df, runtime_config['CURRENT_TOURNAMENT'])
+    team_stats_current = ctx.team_stats_current
     # PRIOR MULTI
     print("Building Multi-Tournament Weights...")
-    prior_weighted_stats = dl.build_weighted_prior_stats(stats_df, runtime_config)
+    prior_weighted_stats = ctx.prior_weighted_stats
     
-    league_avg_curr = dl.calculate_league_averages_by_tournament(stats_df, runtime_config['CURRENT_TOURNAMENT'])
+    league_avg_curr = ctx.league_avg_curr
     
-    # Parse bajas con flujo deduplicado (igual que gen_predicciones.py)
-    raw_manual = data_loader.collect_manual_bajas(runtime_config['INPUT_EVALUATION'])
-    raw_perplexity = data_loader.collect_perplexity_bajas(runtime_config.get('INPUT_PERPLEXITY_BAJAS', 'data/inputs/perplexity_bajas_semana.json'))
-    all_bajas = raw_manual + raw_perplexity
-    deduped_bajas = data_loader.deduplicate_bajas(all_bajas)
-    print(f"  > Raw Manual: {len(raw_manual)} | Raw Perplexity: {len(raw_perplexity)}")
-    print(f"  > Deduplicated Total: {len(deduped_bajas)} (Removed {len(all_bajas) - len(deduped_bajas)} duplicates)")
-    adj_map = {}
-    data_loader.apply_bajas_list(adj_map, deduped_bajas)
-    adj_map = data_loader.load_qualitative_adjustments(adj_map, runtime_config['INPUT_QUALITATIVE'])
-
-    # Structured context adjustments (same channel as gen_predicciones.py)
-    context_list = data_loader.collect_context_adjustments(runtime_config.get('INPUT_CONTEXT', ''))
-    if context_list:
-        print(f"  > Context adjustments loaded: {len(context_list)} entries")
-        adj_map = data_loader.apply_context_adjustments(adj_map, context_list)
-    else:
-        print("  > No context adjustments file for this jornada (optional)")
+    # Bajas con flujo deduplicado + cualitativo + contexto (igual que gen_predicciones.py)
+    adj_map = ctx.adjustment_map()
     # OUTPUT MARKDOWN BUILDER
     md_output = []
     # ... header lines ...
@@ -74,6 +56,10 @@ def main():
     md_output.append(f"\n---")
     
     summary_picks = []
+    pick_cache = ctx.pick_cache
+
+    # Forma reciente de toda la jornada en un solo lote
+    team_features = ctx.team_features
 
     for match in matches_data['matches']:
         home_raw = match['match']['home']
@@ -85,13 +71,11 @@ def main():
         home_data = adj_map.get(home_canon, {'att_adj':1.0, 'def_adj':1.0, 'report_log':[], 'context_txt':[], 'ausencias_txt':[], 'movimientos_txt':[]})
         away_data = adj_map.get(away_canon, {'att_adj':1.0, 'def_adj':1.0, 'report_log':[], 'context_txt':[], 'ausencias_txt':[], 'movimientos_txt':[]})
         
-        # Calculate Recent Form
-        form_mult_home, form_details_home = improvements.calculate_recent_form(
-             stats_df, home_canon, match['match']['kickoff_datetime'], runtime_config.get('RECENT_FORM_GAMES', 5)
-        )
-        form_mult_away, form_details_away = improvements.calculate_recent_form(
-             stats_df, away_canon, match['match']['kickoff_datetime'], runtime_config.get('RECENT_FORM_GAMES', 5)
-        )
+        # Recent Form
+        feat_home = team_features[(home_canon, match['match']['kickoff_datetime'])]
+        feat_away = team_features[(away_canon, match['match']['kickoff_datetime'])]
+        form_mult_home, form_details_home = feat_home['form_multiplier'], feat_home['form_info']
+        form_mult_away, form_details_away = feat_away['form_multiplier'], feat_away['form_info']
 
         match_adjustments = {
             'home_att_adj': home_data['att_adj'],
@@ -132,7 +116,7 @@ def main():
         l_away_base = comp['lambda_away_base']
         
         # Probs + pick optimization for quiniela scoring
-        quiniela = qx.optimize_pick_for_quiniela(l_home, l_away)
+        quiniela = pick_cache.optimize(l_home, l_away, dc_rho=runtime_config.get('DC_RHO', -0.10))
         prob_home = quiniela['prob_home_win']
         prob_draw = quiniela['prob_draw']
         prob_away = quiniela['prob_away_win']
@@ -495,6 +479,9 @@ def main():
     print(f"Reporte generado: {out_file}")
     print(f"Copia en raíz: {root_file}")
 
+    cache_stats = ctx.save_pick_cache()
+    print(f"Pick cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['size']} entradas)")
+
 if __name__ == "__main__":
     try:
         main()
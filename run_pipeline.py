@@ -5,11 +5,16 @@ Fuente de Verdad: src.predicciones.core
 """
 
 import argparse
+import contextlib
+import importlib
+import io
 import json
 import os
 import sys
 import subprocess
 import hashlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 # Reconfigure stdout to UTF-8 so subprocess output with emojis (✅ ⚠️) can be
@@ -21,21 +26,10 @@ if hasattr(sys.stderr, 'reconfigure'):
 
 
 import src.predicciones.config as config
+import src.predicciones.data as data_loader
 import src.predicciones.utils as utils
 
 
-def calculate_file_hash(filepath):
-    """Calcula SHA256 de un archivo."""
-    if not os.path.exists(filepath):
-        return "FILE_NOT_FOUND"
-
-    sha256_hash = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
-
-
 def check_legacy_guard():
     """Detecta archivos legacy peligrosos en raíz."""
     legacy_files = ["diagnostico_visitante.py", "modelo.py"]
@@ -141,59 +135,201 @@ def run_step(script_name, description, env):
         return False
 
 
-def parse_args():
-    parser = argparse.ArgumentParser(description="Pipeline canónico de predicciones")
-    parser.add_argument("--jornada", type=int, default=None, help="Jornada a procesar")
-    return parser.parse_args()
+def run_stage_inprocess(stage, description, ctx):
+    """Ejecuta un step en este mismo proceso sobre el contexto compartido."""
+    print(f"\n>>> EJECUTANDO: {description} (in-process)...")
+    start_time = datetime.now()
+    captured = io.StringIO()
 
+    try:
+        with contextlib.redirect_stdout(captured):
+            stage(ctx)
+    except Exception:
+        print(f"  [ERROR] Falló ejecución de {description}")
+        print("  STDOUT:", captured.getvalue())
+        print("  TRACEBACK:", traceback.format_exc())
+        return False
 
-def main():
-    timestamp_start = datetime.now()
-    args = parse_args()
-    cfg = config.resolve_config(args.jornada)
+    print(f"  [OK] Completado en {datetime.now() - start_time}")
+    for line in captured.getvalue().splitlines()[:3]:
+        print(f"  > {line}")
+    return True
 
-    print("=" * 80)
-    print(f"INICIANDO PIPELINE CANON - {timestamp_start}")
-    print(f"JORNADA OBJETIVO: {cfg['JORNADA']}")
-    print("=" * 80)
 
-    check_legacy_guard()
+# ========== DAG DE ETAPAS (ejecución incremental) ==========
 
-    if not validate_runtime_imports():
-        sys.exit(1)
+FINGERPRINT_PATH = "outputs/fingerprint_jornada_{jornada}.json"
 
-    missing_modules = check_dependencies()
-    if missing_modules:
-        print(f"\nPipeline ABORTADO por dependencias faltantes: {', '.join(missing_modules)}")
-        sys.exit(1)
 
-    if not validate_inputs(cfg):
-        print("\nPipeline ABORTADO por inputs faltantes.")
-        sys.exit(1)
+def pipeline_stages(cfg):
+    """
+    Etapas del pipeline en orden topológico, con inputs/outputs declarados.
+    Si una etapa consumiera outputs de otra, basta listarlos como input: el hash
+    se calcula justo antes de correrla (después de sus upstream).
+    """
+    jornada = cfg['JORNADA']
+    base_inputs = [cfg['INPUT_MATCHES'], cfg['INPUT_STATS']]
+    adjustment_inputs = [
+        cfg['INPUT_EVALUATION'],
+        cfg.get('INPUT_PERPLEXITY_BAJAS', 'data/inputs/perplexity_bajas_semana.json'),
+        cfg['INPUT_QUALITATIVE'],
+        cfg.get('INPUT_CONTEXT', ''),
+        cfg.get('INPUT_KEY_PLAYERS', 'data/key_players.json'),
+    ]
+    return [
+        {
+            'name': 'predicciones',
+            'description': "Generación de CSV de Predicciones",
+            'script': "app/steps/gen_predicciones.py",
+            'module': "app.steps.gen_predicciones",
+            'entry': "main",
+            'inputs': base_inputs + adjustment_inputs + [cfg.get('XG_STATS_PATH', 'data/xg_stats.json')],
+            'outputs': [f"outputs/predicciones_jornada_{jornada}_final.csv"]
+                       + ([f"outputs/robustez_jornada_{jornada}.csv"] if cfg.get('MC_SIMULATIONS') else []),
+        },
+        {
+            'name': 'reporte',
+            'description': "Generación de Reporte Markdown",
+            'script': "app/steps/gen_reporte_tecnico.py",
+            'module': "app.steps.gen_reporte_tecnico",
+            'entry': "main",
+            'inputs': base_inputs + adjustment_inputs,
+            'outputs': [f"outputs/reporte_tecnico_jornada_{jornada}.md", f"reporte_tecnico_jornada_{jornada}.md"],
+        },
+        {
+            'name': 'diagnostico',
+            'description': "Auditoría de Sistema (Diagnóstico)",
+            'script': "app/steps/diagnostico_lambda.py",
+            'module': "app.steps.diagnostico_lambda",
+            'entry': "run_diagnostic",
+            'inputs': base_inputs,
+            'outputs': [cfg['OUTPUT_CSV'], cfg['OUTPUT_TXT']],
+        },
+    ]
 
-    os.makedirs("outputs", exist_ok=True)
 
+def calculate_code_version(script):
+    """Hash del script del step + la librería src/predicciones (cualquier cambio re-ejecuta)."""
+    lib_dir = os.path.join("src", "predicciones")
+    sources = [script] + sorted(
+        os.path.join(lib_dir, name) for name in os.listdir(lib_dir) if name.endswith(".py"))
+    digest = hashlib.sha256()
+    for path, file_hash in utils.calculate_file_hashes(sources).items():
+        digest.update(path.encode())
+        digest.update(file_hash.encode())
+    return digest.hexdigest()[:16]
+
+
+def stage_signature(stage, cfg):
+    """Lo que determina los outputs de una etapa: hashes de inputs + config + código."""
+    return {
+        'input_hashes': utils.calculate_file_hashes([path for path in stage['inputs'] if path]),
+        'config_hash': utils.calculate_full_config_hash(cfg),
+        'code_version': calculate_code_version(stage['script']),
+    }
+
+
+def is_stage_fresh(signature, previous):
+    """True si la corrida anterior tuvo la misma firma y sus outputs siguen intactos."""
+    if not previous:
+        return False
+    for key in ('input_hashes', 'config_hash', 'code_version'):
+        if previous.get(key) != signature[key]:
+            return False
+    recorded = previous.get('output_hashes') or {}
+    if not recorded:
+        return False
+    current = utils.calculate_file_hashes(list(recorded))
+    return all(current[path] == file_hash for path, file_hash in recorded.items())
+
+
+def load_previous_stages(fingerprint_path):
+    """Registro de etapas del fingerprint anterior ({} si no existe o es ilegible)."""
+    try:
+        with open(fingerprint_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('stages', {})
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        return {}
+
+
+def run_dag(cfg, runner, previous=None, force=False):
+    """
+    Ejecuta las etapas en orden saltando las que no cambiaron desde el fingerprint
+    anterior (sus outputs registrados se reutilizan tal cual).
+
+    Returns:
+        dict {stage: registro para el fingerprint} | None si alguna etapa falla
+    """
+    previous = previous or {}
+    records = {}
+    for stage in pipeline_stages(cfg):
+        signature = stage_signature(stage, cfg)
+        prev = previous.get(stage['name'])
+        if not force and is_stage_fresh(signature, prev):
+            print(f"\n>>> SALTANDO: {stage['description']} (inputs/config sin cambios, outputs reutilizados)")
+            records[stage['name']] = dict(prev, status='skipped')
+            continue
+
+        if not runner(stage):
+            return None
+        signature['output_hashes'] = utils.calculate_file_hashes(stage['outputs'])
+        records[stage['name']] = dict(signature, status='ran')
+    return records
+
+
+def inprocess_runner(cfg, stats_df=None):
+    """
+    Runner in-process: un solo PipelineContext (perezoso) compartido por las etapas.
+    La config viaja explícita en el contexto; los steps no leen PRED_JORNADA.
+    """
+    from src.predicciones.pipeline import PipelineContext
+
+    ctx = PipelineContext(cfg, stats_df=stats_df)
+
+    def run(stage):
+        module = importlib.import_module(stage['module'])
+        return run_stage_inprocess(getattr(module, stage['entry']), stage['description'], ctx)
+    return run
+
+
+def subprocess_runner(cfg):
+    """
+    Runner fallback: cada step en su propio intérprete (carga inputs en cada uno).
+    La config resuelta viaja en PRED_CONFIG (outputs por jornada, overrides de la CLI).
+    """
     env = os.environ.copy()
     env["PRED_JORNADA"] = str(cfg['JORNADA'])
+    env["PRED_CONFIG"] = json.dumps(cfg)
     env["PYTHONPATH"] = os.getcwd() + os.pathsep + env.get("PYTHONPATH", "")
     env["PYTHONIOENCODING"] = "utf-8"
+    return lambda stage: run_step(stage['script'], stage['description'], env)
 
-    steps = [
-        ("app/steps/gen_predicciones.py", "Generación de CSV de Predicciones"),
-        ("app/steps/gen_reporte_tecnico.py", "Generación de Reporte Markdown"),
-        ("app/steps/diagnostico_lambda.py", "Auditoría de Sistema (Diagnóstico)"),
-    ]
 
-    for script, desc in steps:
-        if not run_step(script, desc, env):
-            print("\nPipeline ABORTADO por error.")
-            sys.exit(1)
+def run_jornada(cfg, use_subprocess=False, force=False, stats_df=None):
+    """
+    Etapas + fingerprint de UNA jornada a partir de una config explícita.
+
+    Returns:
+        bool: True si la jornada terminó sin errores
+    """
+    if not validate_inputs(cfg):
+        print("\nPipeline ABORTADO por inputs faltantes.")
+        return False
+
+    os.makedirs("outputs", exist_ok=True)
+
+    jornada = cfg['JORNADA']
+    fp_filename = FINGERPRINT_PATH.format(jornada=jornada)
+    runner = subprocess_runner(cfg) if use_subprocess else inprocess_runner(cfg, stats_df)
+    stage_records = run_dag(cfg, runner, load_previous_stages(fp_filename), force=force)
+    if stage_records is None:
+        print("\nPipeline ABORTADO por error.")
+        return False
 
     print("\n" + "=" * 80)
     print("RESUMEN DE EJECUCIÓN")
     print("=" * 80)
 
-    jornada = cfg['JORNADA']
     fingerprint = {
         'timestamp': datetime.now().isoformat(),
         'config_version': '2026.02.12',
@@ -201,13 +337,14 @@ def main():
         'git_commit': utils.get_git_commit(),
         'git_dirty': utils.is_git_dirty(),
         'input_hashes': {
-            'stats': calculate_file_hash(cfg['INPUT_STATS']),
-            'matches': calculate_file_hash(cfg['INPUT_MATCHES']),
-            'bajas': calculate_file_hash(cfg['INPUT_EVALUATION']),
-            'qualitative': calculate_file_hash(cfg['INPUT_QUALITATIVE']),
+            'stats': utils.calculate_file_hash(cfg['INPUT_STATS']),
+            'matches': utils.calculate_file_hash(cfg['INPUT_MATCHES']),
+            'bajas': utils.calculate_file_hash(cfg['INPUT_EVALUATION']),
+            'qualitative': utils.calculate_file_hash(cfg['INPUT_QUALITATIVE']),
         },
         'config_hash': utils.calculate_config_hash(cfg),
-        'output_hashes': {}
+        'output_hashes': {},
+        'stages': stage_records,
     }
 
     print("-" * 80)
@@ -220,15 +357,150 @@ def main():
         cfg['OUTPUT_CSV'],
     ]
 
-    for filepath in files_to_hash:
-        file_hash = calculate_file_hash(filepath)
+    for filepath, file_hash in utils.calculate_file_hashes(files_to_hash).items():
         fingerprint['output_hashes'][filepath] = file_hash
         print(f"  {filepath:<35} : {file_hash}")
 
-    fp_filename = f"outputs/fingerprint_jornada_{jornada}.json"
     with open(fp_filename, 'w', encoding='utf-8') as fp_file:
         json.dump(fingerprint, fp_file, indent=2)
     print(f"\n[OK] Fingerprint guardado: {fp_filename}")
+    utils.save_file_hash_cache()
+    return True
+
+
+# ========== MODO MULTI-JORNADA (process pool) ==========
+
+def parse_jornadas(spec):
+    """'6-10' -> [6, 7, 8, 9, 10]; también acepta listas '6,8,10' y mezclas '6-8,10'."""
+    jornadas = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(x) for x in part.split('-', 1))
+            if end < start:
+                raise ValueError(f"Rango de jornadas inválido: {part}")
+            jornadas.extend(range(start, end + 1))
+        else:
+            jornadas.append(int(part))
+    return sorted(set(jornadas))
+
+
+def jornada_config(jornada, overrides=None):
+    """
+    Config explícita de una jornada para el modo multi-jornada. Los outputs del
+    diagnóstico son globales en la config base; aquí se separan por jornada para
+    que los workers no se pisen. `overrides` son los valores de la CLI.
+    """
+    cfg = dict(config.get_config(jornada), **(overrides or {}))
+    cfg['OUTPUT_CSV'] = f"outputs/diagnostico_lambda_components_jornada_{jornada}.csv"
+    cfg['OUTPUT_TXT'] = f"outputs/diagnostico_report_jornada_{jornada}.txt"
+    return cfg
+
+
+_WORKER_STATS = None
+
+
+def _init_worker(stats_path, snapshot_dir):
+    """Cada worker mapea el snapshot de stats una vez y lo reusa entre jornadas."""
+    global _WORKER_STATS
+    _WORKER_STATS = data_loader.load_stats_table(stats_path, snapshot_dir)
+
+
+def run_jornada_worker(cfg, use_subprocess=False, force=False):
+    """Corre una jornada en un worker capturando su salida (se imprime en orden en el padre)."""
+    captured = io.StringIO()
+    start_time = datetime.now()
+    with contextlib.redirect_stdout(captured):
+        try:
+            ok = run_jornada(cfg, use_subprocess, force, stats_df=_WORKER_STATS)
+        except Exception:
+            print(traceback.format_exc())
+            ok = False
+    return cfg['JORNADA'], ok, datetime.now() - start_time, captured.getvalue()
+
+
+def run_jornadas_parallel(jornadas, workers=None, use_subprocess=False, force=False, overrides=None):
+    """
+    Reparte jornadas en un pool de procesos. El snapshot tipado de stats se
+    construye una sola vez aquí; los workers sólo lo mapean (mmap).
+
+    Returns:
+        bool: True si todas las jornadas terminaron sin errores
+    """
+    configs = [jornada_config(j, overrides) for j in jornadas]
+    stats_path = configs[0]['INPUT_STATS']
+    snapshot_dir = configs[0].get('STATS_SNAPSHOT_DIR')
+    data_loader.load_stats_table(stats_path, snapshot_dir)
+
+    workers = workers or min(len(configs), os.cpu_count() or 1)
+    print(f"Procesando {len(configs)} jornadas con {workers} workers: {jornadas}")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(stats_path, snapshot_dir)) as pool:
+        futures = [pool.submit(run_jornada_worker, cfg, use_subprocess, force) for cfg in configs]
+        results = [future.result() for future in futures]
+
+    for jornada, ok, elapsed, output in results:
+        print("\n" + "#" * 80)
+        print(f"JORNADA {jornada}")
+        print("#" * 80)
+        print(output, end="")
+
+    print("\n" + "=" * 80)
+    print("RESUMEN MULTI-JORNADA")
+    print("=" * 80)
+    for jornada, ok, elapsed, _ in results:
+        print(f"  Jornada {jornada:>3}: {'[OK]' if ok else '[ERROR]'} en {elapsed}")
+    return all(ok for _, ok, _, _ in results)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline canónico de predicciones")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--jornada", type=int, default=None, help="Jornada a procesar")
+    group.add_argument("--jornadas", type=str, default=None,
+                       help="Varias jornadas en paralelo, p.ej. 6-10 o 6,8,10")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos para --jornadas (default: núm. de CPUs)")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="Correr cada step en un subprocess (modo legacy / fallback)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-ejecutar todas las etapas aunque sus inputs no hayan cambiado")
+    parser.add_argument("--mc-simulations", type=int, default=None,
+                        help="Draws Monte Carlo del reporte de robustez (default: desactivado)")
+    return parser.parse_args()
+
+
+def main():
+    timestamp_start = datetime.now()
+    args = parse_args()
+    jornadas = parse_jornadas(args.jornadas) if args.jornadas else None
+    overrides = {} if args.mc_simulations is None else {'MC_SIMULATIONS': args.mc_simulations}
+    cfg = dict(config.resolve_config(args.jornada), **overrides)
+
+    print("=" * 80)
+    print(f"INICIANDO PIPELINE CANON - {timestamp_start}")
+    print(f"JORNADA OBJETIVO: {jornadas if jornadas else cfg['JORNADA']}")
+    print("=" * 80)
+
+    check_legacy_guard()
+
+    if not validate_runtime_imports():
+        sys.exit(1)
+
+    missing_modules = check_dependencies()
+    if missing_modules:
+        print(f"\nPipeline ABORTADO por dependencias faltantes: {', '.join(missing_modules)}")
+        sys.exit(1)
+
+    if jornadas:
+        ok = run_jornadas_parallel(jornadas, args.workers, args.subprocess, args.force, overrides)
+    else:
+        ok = run_jornada(cfg, args.subprocess, args.force)
+    if not ok:
+        sys.exit(1)
 
     print("-" * 80)
     print(f"PIPELINE FINALIZADO EN {datetime.now() - timestamp_start}")
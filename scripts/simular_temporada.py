@@ -0,0 +1,93 @@
+"""
+simular_temporada.py
+====================
+Simula el resto del torneo actual (por defecto 100k temporadas) desde la
+tabla vigente y reporta, por equipo, la distribución de posición final y las
+probabilidades de superliderato, liguilla directa (1°-6°) y play-in (7°-10°).
+
+Lambdas: matriz round-robin del modelo SIN ajustes de bajas/contexto
+(son de la semana, no del resto del torneo). Sedes: las de los
+data/inputs/jornada_*_final.json pendientes; el resto se sortea.
+
+Uso:
+    python scripts/simular_temporada.py
+    python scripts/simular_temporada.py --jornada 10 --sims 200000
+    python scripts/simular_temporada.py --workers 4      # reparte bloques en procesos
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+
+# ── Añadir raíz del proyecto al path ─────────────────────────────────────────
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import src.predicciones.core as dl
+from src.predicciones import season
+from src.predicciones.pipeline import PipelineContext
+
+JORNADA_JSON_GLOB = os.path.join(ROOT, "data", "inputs", "jornada_*_final.json")
+OUTPUT_TEMPLATE = os.path.join(ROOT, "outputs", "simulacion_temporada_jornada_{jornada}.csv")
+
+
+def load_schedule(pattern=JORNADA_JSON_GLOB):
+    """Cruces (local, visita) y clásicos de todos los JSON de jornada disponibles."""
+    fixtures, rivalries = [], []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, 'r', encoding='utf-8') as f:
+            matches = json.load(f).get('matches', [])
+        for m in matches:
+            pair = (m['match']['home'], m['match']['away'])
+            fixtures.append(pair)
+            if m['match'].get('rivalry'):
+                rivalries.append(pair)
+    return fixtures, rivalries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de temporada (liguilla / play-in)")
+    parser.add_argument('--jornada', type=int, help="Jornada de referencia (default: config)")
+    parser.add_argument('--sims', type=int, help="Temporadas a simular (default: SEASON_SIMULATIONS)")
+    parser.add_argument('--seed', type=int, help="Semilla (default: SEASON_SEED)")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos para los bloques")
+    parser.add_argument('--output', help="CSV de salida")
+    args = parser.parse_args()
+
+    ctx = PipelineContext(jornada=args.jornada)
+    cfg = ctx.config
+    n_seasons = args.sims or cfg.get('SEASON_SIMULATIONS', 100000)
+    seed = cfg.get('SEASON_SEED', 2026) if args.seed is None else args.seed
+
+    schedule, rivalries = load_schedule()
+    matrices = dl.round_robin_matrices(
+        ctx.team_stats_current, ctx.prior_weighted_stats, ctx.league_avg_curr, cfg, rivalries=rivalries)
+    teams = matrices['teams']
+    table = season.table_arrays(ctx.current_table, teams)
+    home_idx, away_idx, neutral = season.remaining_fixtures(
+        ctx.stats_df, cfg['CURRENT_TOURNAMENT'], teams, schedule)
+    print(f"📅 {cfg['CURRENT_TOURNAMENT']}: {len(home_idx)} partidos pendientes "
+          f"({int(neutral.sum())} sin sede conocida)")
+
+    start = time.perf_counter()
+    simulation = season.simulate_seasons(
+        table, home_idx, away_idx, matrices['lambda_home'], matrices['lambda_away'], neutral,
+        n_seasons=n_seasons, seed=seed, workers=args.workers)
+    print(f"🎲 {n_seasons:,} temporadas en {time.perf_counter() - start:.2f}s")
+
+    summary = season.season_summary(teams, table, simulation, cfg)
+    output = args.output or OUTPUT_TEMPLATE.format(jornada=cfg['JORNADA'])
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    summary.to_csv(output, index=False, encoding='utf-8-sig')
+
+    cols = ['team', 'pts', 'pts_mean', 'pos_mean', 'p_superlider', 'p_liguilla_directa', 'p_play_in', 'p_clasifica']
+    print(summary[cols].to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    print(f"✅ Guardado: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -92,7 +92,7 @@ def run_test():
         json.dump(real_bajas_input, f)
         
     # Clear cache just in case
-    data.KEY_PLAYERS_CACHE = {}
+    data.reset_key_player_index()
     
     # Run logic
     try:
@@ -108,7 +108,7 @@ def run_test():
     target_team_key = "guadalajara"
     
     # Debug: print keys
-    print(f"Adjustment keys: {list(adj.keys())}")
+    print(f"Adjustment keys: {list(adj)}")
 
     chivas = adj.get(target_team_key)
     if not chivas:
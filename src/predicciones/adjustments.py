@@ -0,0 +1,195 @@
+"""
+Store columnar de ajustes por equipo (bajas / cualitativo / contexto / xPTS / notas).
+
+Reemplaza el adj_map {team: {'att_adj', 'def_adj', 'notes', 'report_log', ...}}:
+  - los multiplicadores viven en un arreglo (equipos × 2) [att_adj, def_adj],
+    compuesto con una reducción de producto (np.multiply.at) sobre los factores
+    del log, en el mismo orden en que se registraron;
+  - todo lo demás es un log de eventos append-only (team, source, channel,
+    att_adj, def_adj, entry) en columnas. Las listas por equipo de antes
+    ('notes', 'report_log', 'ausencias_txt', ...) son vistas del log.
+
+copy() copia el arreglo y las columnas del log (listas planas, sin deepcopy);
+snapshot() / rollback() marcan y deshacen eventos para escenarios what-if.
+Los lectores del formato anterior siguen funcionando: store.get(team) y
+store[team] devuelven un dict con la forma del adj_map.
+"""
+import numpy as np
+import pandas as pd
+
+FACTOR_COLUMNS = ('att_adj', 'def_adj')
+CHANNELS = ('notes', 'report_log', 'ausencias_txt', 'ausencias_items',
+            'context_txt', 'context_items', 'movimientos_txt')
+
+
+class TeamAdjustments:
+    """Multiplicadores por equipo + log de eventos append-only."""
+
+    def __init__(self):
+        self.teams = []      # índice → nombre canónico
+        self._index = {}     # nombre canónico → índice
+        self._rows = []      # por equipo: filas del log que le pertenecen
+        # Log de eventos (columnas paralelas)
+        self._team = []
+        self._source = []
+        self._channel = []
+        self._att = []
+        self._def = []
+        self._entry = []
+        self._factors = np.ones((0, 2))
+        self._folded = 0     # filas del log ya compuestas en _factors
+
+    @classmethod
+    def from_dict(cls, adj_map):
+        """Store equivalente a un adj_map legacy {team: {'att_adj', 'def_adj', 'notes', ...}}."""
+        store = cls()
+        for team, data in adj_map.items():
+            store.record(team, 'legacy', data.get('att_adj', 1.0), data.get('def_adj', 1.0))
+            for channel in CHANNELS:
+                for entry in data.get(channel, []):
+                    store.record(team, 'legacy', **{channel: entry})
+        return store
+
+    # --- Escritura ---
+
+    def add_team(self, team):
+        """Índice del equipo; si es nuevo queda registrado con factores 1.0."""
+        idx = self._index.get(team)
+        if idx is None:
+            idx = self._index[team] = len(self.teams)
+            self.teams.append(team)
+            self._rows.append([])
+        return idx
+
+    def record(self, team, source, att_adj=1.0, def_adj=1.0, **entries):
+        """
+        Registra un evento del equipo. att_adj / def_adj multiplican sus
+        factores; cada channel=entry (ver CHANNELS) agrega una fila al log.
+        """
+        idx = self.add_team(team)
+        if not entries:
+            entries = {None: None}  # sólo factor
+        for channel, entry in entries.items():
+            self._rows[idx].append(len(self._team))
+            self._team.append(idx)
+            self._source.append(source)
+            self._channel.append(channel)
+            self._att.append(att_adj)
+            self._def.append(def_adj)
+            self._entry.append(entry)
+            att_adj = def_adj = 1.0  # el factor va en la primera fila del evento
+
+    def snapshot(self):
+        """Marca (equipos, eventos) para volver con rollback()."""
+        return len(self.teams), len(self._team)
+
+    def rollback(self, mark):
+        """Descarta equipos y eventos registrados después de `mark`."""
+        n_teams, n_rows = mark
+        for name in ('_team', '_source', '_channel', '_att', '_def', '_entry'):
+            del getattr(self, name)[n_rows:]
+        for team in self.teams[n_teams:]:
+            del self._index[team]
+        del self.teams[n_teams:]
+        del self._rows[n_teams:]
+        self._rows = [[r for r in rows if r < n_rows] for rows in self._rows]
+        self._factors = np.ones((0, 2))
+        self._folded = 0
+
+    def copy(self):
+        """Copia independiente (arreglo + columnas del log; las entradas se comparten)."""
+        new = TeamAdjustments.__new__(TeamAdjustments)
+        new.teams = list(self.teams)
+        new._index = dict(self._index)
+        new._rows = [list(rows) for rows in self._rows]
+        for name in ('_team', '_source', '_channel', '_att', '_def', '_entry'):
+            setattr(new, name, list(getattr(self, name)))
+        new._factors = self.factors.copy()
+        new._folded = self._folded
+        return new
+
+    # --- Lectura ---
+
+    @property
+    def factors(self):
+        """(equipos × 2) [att_adj, def_adj]: producto de los factores del log (solo lectura)."""
+        n = len(self.teams)
+        if len(self._factors) < n:
+            self._factors = np.vstack([self._factors, np.ones((n - len(self._factors), 2))])
+        start = self._folded
+        if start < len(self._team):
+            idx = np.asarray(self._team[start:], dtype=np.intp)
+            np.multiply.at(self._factors, (idx, 0), self._att[start:])
+            np.multiply.at(self._factors, (idx, 1), self._def[start:])
+            self._folded = len(self._team)
+        view = self._factors.view()
+        view.flags.writeable = False
+        return view
+
+    def factor(self, team):
+        """(att_adj, def_adj) del equipo; (1.0, 1.0) si no tiene ajustes."""
+        idx = self._index.get(team)
+        if idx is None:
+            return 1.0, 1.0
+        att, dfn = self.factors[idx]
+        return float(att), float(dfn)
+
+    def factor_matrix(self, teams):
+        """(len(teams) × 2) alineado con `teams`; equipos sin ajustes → 1.0."""
+        padded = np.vstack([self.factors, np.ones((1, 2))])
+        return padded[[self._index.get(t, -1) for t in teams]]
+
+    def channel(self, team, channel):
+        """Entradas de un canal del equipo, en orden de registro ([] si no hay)."""
+        idx = self._index.get(team)
+        if idx is None:
+            return []
+        return [self._entry[r] for r in self._rows[idx] if self._channel[r] == channel]
+
+    def event_log(self):
+        """Log completo como DataFrame (auditoría)."""
+        return pd.DataFrame({
+            'team': [self.teams[i] for i in self._team],
+            'source': self._source,
+            'channel': self._channel,
+            'att_adj': self._att,
+            'def_adj': self._def,
+            'entry': self._entry,
+        })
+
+    # --- Vista compatible con el adj_map ---
+
+    def _view(self, idx):
+        att, dfn = self.factors[idx]
+        view = {'att_adj': float(att), 'def_adj': float(dfn)}
+        view.update((channel, []) for channel in CHANNELS)
+        for r in self._rows[idx]:
+            if self._channel[r] is not None:
+                view[self._channel[r]].append(self._entry[r])
+        return view
+
+    def __len__(self):
+        return len(self.teams)
+
+    def __iter__(self):
+        return iter(self.teams)
+
+    def __contains__(self, team):
+        return team in self._index
+
+    def __getitem__(self, team):
+        return self._view(self._index[team])
+
+    def get(self, team, default=None):
+        idx = self._index.get(team)
+        return default if idx is None else self._view(idx)
+
+    def items(self):
+        return ((team, self._view(idx)) for idx, team in enumerate(self.teams))
+
+
+def as_store(team_adjustments):
+    """TeamAdjustments tal cual; un adj_map legacy (dict) o None se convierten."""
+    if isinstance(team_adjustments, TeamAdjustments):
+        return team_adjustments
+    return TeamAdjustments.from_dict(team_adjustments or {})
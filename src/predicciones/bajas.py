@@ -0,0 +1,626 @@
+"""
+Ingesta de feeds de bajas: lectura en streaming + esquema compilado + filtros columnares.
+
+Los feeds (evaluacion_bajas.json, perplexity_bajas_semana.json y archivos
+multi-semana como data/archive/ligamx_clausura2026_injuries.json) se leen
+por chunks, en lotes de items, sin cargar el archivo completo. Cada lote se
+valida por columnas contra un esquema precompilado (los inválidos se descartan
+y se reportan en table.attrs['invalid']); los filtros de vigencia /
+verificación / jugador clave corren como máscaras sobre una tabla tipada, no
+como ifs por item.
+
+La tabla resultante tiene BAJAS_COLUMNS; bajas_records() la convierte a la
+lista de dicts que consumen deduplicate_bajas / apply_bajas_list.
+merge_bajas() une varios feeds y deja una fila por (team, jugador) con la
+tupla de prioridad impacto > confianza > fuente > llegada, más una tabla de
+provenance con el ganador de cada llave y el motivo.
+"""
+import json
+import os
+import re
+from itertools import compress, repeat
+
+import numpy as np
+import pandas as pd
+
+import src.predicciones.core as dl
+
+STREAM_CHUNK_SIZE = 1 << 20  # 1 MB por lectura
+BAJAS_COLUMNS = ['team', 'player', 'role', 'status', 'impact_level', 'reason',
+                 'confidence', 'recency_days', 'source']
+
+REQUIRED = object()  # marcador de campo obligatorio en los esquemas
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+_SEPARATOR_RE = re.compile(r'[ \t\n\r]*([,\]])[ \t\n\r]*')
+
+
+class BajaSchemaError(ValueError):
+    """Item de un feed de bajas que no cumple el esquema."""
+
+
+# ========== LECTURA EN STREAMING ==========
+
+class _JsonStream:
+    """Buffer incremental sobre un archivo JSON (raw_decode por valor, no json.load)."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.scan = json.JSONDecoder().scan_once  # escáner en C, sin el wrapper de raw_decode
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > self.chunk_size:
+            self.buf, self.pos = self.buf[self.pos:], 0
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        """Siguiente carácter no blanco ('' al final del archivo)."""
+        while True:
+            self.pos = _WHITESPACE_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Se esperaba {char!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decodifica el siguiente valor completo, leyendo más si quedó cortado."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.scan(self.buf, self.pos)
+            except (json.JSONDecodeError, StopIteration):
+                if not self._fill():
+                    raise json.JSONDecodeError("Valor JSON incompleto", self.buf, self.pos)
+                continue
+            # Un número al borde del buffer podría seguir en el siguiente chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _bulk_items(self, buf, pos):
+        """
+        Ruta rápida: todos los objetos completos del buffer en un solo json.loads,
+        cortando en el último '}' seguido de separador. Un corte dentro de un
+        string o de un objeto anidado produce JSON inválido, así que si loads
+        acepta el texto el corte era de nivel superior.
+
+        Returns: (items, pos siguiente, ¿cerró el arreglo?) o None (usar el escáner).
+        """
+        cut = len(buf)
+        for _ in range(3):
+            cut = buf.rfind('}', pos, cut)
+            if cut < 0:
+                return None
+            match = _SEPARATOR_RE.match(buf, cut + 1)
+            if match is None:
+                continue
+            try:
+                items = json.loads('[' + buf[pos:cut + 1] + ']')
+            except json.JSONDecodeError:
+                continue
+            return items, match.end(), match.group(1) == ']'
+        return None
+
+    def array_batches(self):
+        """
+        Elementos de un arreglo (cursor en '[') en lotes: todos los que caben
+        completos en el buffer actual. Un elemento cortado se re-escanea tras leer más.
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        scan, separator = self.scan, _SEPARATOR_RE.match
+        while True:
+            self.peek()
+            bulk = self._bulk_items(self.buf, self.pos)
+            if bulk is not None:
+                batch, self.pos, closed = bulk
+                yield batch
+                if closed:
+                    return
+                continue
+
+            buf, pos, batch = self.buf, self.pos, []
+            while True:
+                try:
+                    value, end = scan(buf, pos)
+                except (StopIteration, json.JSONDecodeError):
+                    break
+                # Sin separador todavía (fin del buffer): el elemento podría seguir
+                match = separator(buf, end)
+                if match is None or match.end() == len(buf):
+                    if end < len(buf) and match is None and not buf[end:].isspace():
+                        raise json.JSONDecodeError("Arreglo mal formado", buf, end)
+                    break
+                batch.append(value)
+                pos = match.end()
+                if match.group(1) == ']':
+                    self.pos = pos
+                    yield batch
+                    return
+            self.pos = pos
+            if batch:
+                yield batch
+            if not self._fill():
+                raise json.JSONDecodeError("Arreglo JSON incompleto", self.buf, self.pos)
+
+
+def iter_json_batches(file_path, key, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Lotes de items de la lista `key` de un JSON cuyo nivel superior es un objeto,
+    leyendo el archivo por chunks. Las demás llaves se saltan; si `key` no existe
+    o no es lista no produce nada.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f, chunk_size)
+        stream.expect('{')
+        while stream.peek() not in ('}', ''):
+            name = stream.value()
+            stream.expect(':')
+            if name == key and stream.peek() == '[':
+                yield from stream.array_batches()
+                return
+            stream.value()
+            if stream.peek() == ',':
+                stream.pos += 1
+
+
+def iter_json_array(file_path, key, chunk_size=STREAM_CHUNK_SIZE):
+    """Items de la lista `key` uno a uno (ver iter_json_batches)."""
+    for batch in iter_json_batches(file_path, key, chunk_size):
+        yield from batch
+
+
+# ========== ESQUEMAS COMPILADOS ==========
+
+def _coerce_str(value):
+    if not isinstance(value, str):
+        raise BajaSchemaError(f"se esperaba texto, llegó {type(value).__name__}")
+    return value
+
+
+def _coerce_float(value):
+    if isinstance(value, bool):
+        raise BajaSchemaError("se esperaba número, llegó bool")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BajaSchemaError(f"número inválido: {value!r}")
+
+
+def _coerce_int(value):
+    if isinstance(value, bool):
+        raise BajaSchemaError("se esperaba entero, llegó bool")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BajaSchemaError(f"entero inválido: {value!r}")
+
+
+def _coerce_bool(value):
+    if not isinstance(value, bool):
+        raise BajaSchemaError(f"se esperaba bool, llegó {value!r}")
+    return value
+
+
+_COERCERS = {str: _coerce_str, float: _coerce_float, int: _coerce_int, bool: _coerce_bool}
+
+
+def compile_schema(schema):
+    """
+    Compila {campo: (tipo, default)} a un validador por lotes:
+    validate(items) -> (columnas {campo: lista}, inválidos {fila: motivo}).
+    default=REQUIRED → obligatorio; un valor null/ausente toma el default.
+
+    Se valida por columna: si todos los valores de un campo ya tienen el tipo
+    exacto (lo normal) basta un set(map(type, ...)); sólo las columnas con
+    nulls o valores a convertir se recorren valor por valor.
+    """
+    fields = tuple((name, kind, _COERCERS[kind], default) for name, (kind, default) in schema.items())
+
+    def validate(items):
+        invalid = {}
+        if set(map(type, items)) - {dict}:
+            invalid.update((i, "el item no es un objeto") for i, item in enumerate(items) if type(item) is not dict)
+            items = [item if type(item) is dict else {} for item in items]
+        columns = {}
+        for name, kind, coerce, default in fields:
+            values = list(map(dict.get, items, repeat(name)))
+            if set(map(type, values)) - {kind}:
+                for i, value in enumerate(values):
+                    if type(value) is kind:
+                        continue
+                    if value is None:
+                        if default is REQUIRED:
+                            invalid.setdefault(i, f"falta '{name}'")
+                        else:
+                            values[i] = default
+                        continue
+                    try:
+                        values[i] = coerce(value)
+                    except BajaSchemaError as e:
+                        invalid.setdefault(i, f"'{name}': {e}")
+            columns[name] = values
+        if invalid:
+            keep = [i not in invalid for i in range(len(items))]
+            columns = {name: list(compress(values, keep)) for name, values in columns.items()}
+        return columns, invalid
+
+    validate.columns = tuple(schema)
+    return validate
+
+
+MANUAL_SCHEMA = {
+    'team': (str, REQUIRED),
+    'player': (str, 'Unknown'),
+    'role': (str, ''),
+    'status': (str, ''),
+    'manual_impact_level': (str, 'Low'),
+    'reason': (str, ''),
+}
+
+PERPLEXITY_SCHEMA = {
+    'team': (str, ''),
+    'current_team': (str, ''),
+    'player': (str, 'Unknown'),
+    'role': (str, ''),
+    'status': (str, 'Duda'),
+    'impact_level': (str, 'Low'),
+    'confidence': (float, 0.75),
+    'recency_days': (int, 0),
+    'is_active_for_next_match': (bool, None),
+    'is_retired': (bool, False),
+    'is_transferred_out': (bool, False),
+    'verification_status': (str, ''),
+    'reason': (str, ''),
+}
+
+ARCHIVE_PLAYER_SCHEMA = {
+    'player_name': (str, REQUIRED),
+    'position': (str, ''),
+    'status': (str, ''),
+    'reason': (str, ''),
+    'last_updated': (str, None),
+    'minutes_season': (int, None),
+}
+
+_validate_manual = compile_schema(MANUAL_SCHEMA)
+_validate_perplexity = compile_schema(PERPLEXITY_SCHEMA)
+_validate_archive_player = compile_schema(ARCHIVE_PLAYER_SCHEMA)
+
+
+def _validated_columns(batches, validate, keep_raw=False):
+    """Valida lotes de items → (dict de columnas, raws, inválidos [(i, motivo)])."""
+    columns = {name: [] for name in validate.columns}
+    raws, invalid = [], []
+    offset = 0
+    for batch in batches:
+        batch_columns, batch_invalid = validate(batch)
+        for name, values in batch_columns.items():
+            columns[name].extend(values)
+        invalid.extend((offset + i, reason) for i, reason in sorted(batch_invalid.items()))
+        if keep_raw:
+            raws.extend(item for i, item in enumerate(batch) if i not in batch_invalid)
+        offset += len(batch)
+    return columns, raws, invalid
+
+
+# ========== TABLA COLUMNAR ==========
+
+def _canonical_column(values):
+    """Canónico por valor único (category), no por fila."""
+    cat = pd.Categorical(values)
+    mapping = [dl.canonical_team_name(name) for name in cat.categories]
+    return np.asarray(mapping + [''], dtype=object)[cat.codes]
+
+
+def _key_player_levels(teams, players, key_players):
+    """Nivel del índice de jugadores clave por fila, resolviendo cada par único una vez."""
+    if key_players is None:
+        return np.full(len(teams), None, dtype=object)
+    levels = {}
+    for pair in zip(teams, players):
+        if pair not in levels:
+            levels[pair] = key_players.importance(*pair)
+    return _object_array([levels[pair] for pair in zip(teams, players)])
+
+
+def _object_array(values):
+    out = np.empty(len(values), dtype=object)
+    out[:] = list(values)
+    return out
+
+
+_CATEGORY_COLUMNS = ('team', 'role', 'status', 'impact_level')
+
+
+def _lower_in(values, options):
+    """values.lower() in options, evaluado una vez por valor único."""
+    codes, uniques = pd.factorize(_object_array(values))
+    hits = np.array([str(u).lower() in options for u in uniques] + [False], dtype=bool)
+    return hits[codes]
+
+
+def _finish_table(columns, mask, source, raws=None, invalid=(), file_path=''):
+    """Filtra con `mask`, tipa las columnas y adjunta metadatos de la ingesta."""
+    keep = np.flatnonzero(mask)
+
+    def take(name, dtype=object):
+        values = columns[name]
+        return (np.asarray(values, dtype=dtype) if dtype is not object else _object_array(values))[keep]
+
+    data = {name: pd.Categorical(take(name)) if name in _CATEGORY_COLUMNS else take(name)
+            for name in ('team', 'player', 'role', 'status', 'impact_level', 'reason')}
+    data['confidence'] = take('confidence', np.float64)
+    data['recency_days'] = pd.array(take('recency_days'), dtype='Int16')
+    data['source'] = pd.Categorical.from_codes(np.zeros(len(keep), dtype=np.int8), [source])
+    table = pd.DataFrame(data)
+    if raws is not None:
+        table['raw_data'] = _object_array(raws)[keep]
+    if invalid:
+        print(f"⚠️ {len(invalid)} bajas inválidas descartadas ({file_path}): {invalid[0][1]}")
+    table.attrs['invalid'] = list(invalid)
+    return table
+
+
+def empty_bajas_table():
+    return _finish_table({name: [] for name in BAJAS_COLUMNS}, np.zeros(0, dtype=bool), '')
+
+
+def ingest_manual_bajas(file_path, key_players=None, keep_raw=False):
+    """
+    Tabla de bajas de la evaluación manual. El índice de jugadores clave sube
+    el impacto (High si es clave alta; Low → Mid si es media).
+    """
+    if not os.path.exists(file_path):
+        return empty_bajas_table()
+    cols, raws, invalid = _validated_columns(iter_json_batches(file_path, 'bajas_identificadas'),
+                                             _validate_manual, keep_raw)
+    teams = _canonical_column(cols['team'])
+    impact = np.asarray(cols['manual_impact_level'], dtype=object)
+    auto = _key_player_levels(teams, cols['player'], key_players)
+    impact = np.where(auto == 'High', 'High', np.where((auto == 'Mid') & (impact == 'Low'), 'Mid', impact))
+
+    n = len(teams)
+    columns = dict(cols, team=teams, impact_level=impact,
+                   status=[s.title() for s in cols['status']],
+                   confidence=np.ones(n),  # la evaluación manual es la verdad
+                   recency_days=np.zeros(n, dtype=np.int64))
+    # Minute gate: no aplica a entradas manuales (el usuario ya las validó)
+    return _finish_table(columns, teams != '', 'manual', raws if keep_raw else None, invalid, file_path)
+
+
+def ingest_perplexity_bajas(file_path, key_players=None, keep_raw=False):
+    """
+    Tabla de bajas del feed semanal. Descarta inactivos, retirados, transferidos,
+    de otro equipo actual, no confirmados y viejos (> 21 días sin estar activos);
+    la confianza se capa a 0.55 pasados 14 días y quedan sólo impactos Mid/High.
+    """
+    if not os.path.exists(file_path):
+        return empty_bajas_table()
+    cols, raws, invalid = _validated_columns(iter_json_batches(file_path, 'bajas'), _validate_perplexity, keep_raw)
+    teams = _canonical_column(cols['team'])
+    current = _canonical_column(cols['current_team'])
+    active = cols['is_active_for_next_match']  # tri-estado: True / False / None
+    is_false = np.fromiter((v is False for v in active), dtype=bool, count=len(active))
+    not_true = ~np.fromiter((v is True for v in active), dtype=bool, count=len(active))
+    recency = np.asarray(cols['recency_days'], dtype=np.int64)
+    verified = _lower_in(cols['verification_status'], {'confirmed'})
+
+    mask = (
+        (teams != '')
+        & ~is_false
+        & ~np.asarray(cols['is_retired'], dtype=bool)
+        & ~np.asarray(cols['is_transferred_out'], dtype=bool)
+        & ((current == '') | (current == teams))
+        & verified
+        & ~((recency > 21) & not_true)
+    )
+    confidence = np.asarray(cols['confidence'], dtype=float)
+    confidence = np.where((recency > 14) & not_true, np.minimum(confidence, 0.55), confidence)
+
+    impact = np.asarray(cols['impact_level'], dtype=object)
+    auto = _key_player_levels(teams, cols['player'], key_players)
+    impact = np.where(auto == 'High', 'High', np.where((auto == 'Mid') & (impact == 'Low'), 'Mid', impact))
+    mask &= ~_lower_in(impact, {'low', 'none', 'unknown'})
+
+    columns = dict(cols, team=teams, impact_level=impact, confidence=confidence, recency_days=recency)
+    return _finish_table(columns, mask, 'perplexity', raws if keep_raw else None, invalid, file_path)
+
+
+# Archivo multi-semana (teams[].players[]) → vocabulario de los feeds semanales
+ARCHIVE_ROLES = {'GK': 'Portero', 'DEF': 'Defensa', 'MID': 'Mediocampista', 'FW': 'Delantero'}
+ARCHIVE_STATUS = {'OUT': 'Fuera', 'SUSPENDED': 'Fuera', 'DOUBTFUL': 'Duda', 'QUESTIONABLE': 'Duda'}
+
+
+def _archive_player_batches(file_path, team_names):
+    """Lotes de jugadores (teams[].players[] aplanado); el equipo de cada uno va a team_names."""
+    for batch in iter_json_batches(file_path, 'teams'):
+        players = []
+        for entry in batch:
+            entry = entry if isinstance(entry, dict) else {}
+            roster = entry.get('players') or []
+            team_names.extend([entry.get('team') or ''] * len(roster))
+            players.extend(roster)
+        yield players
+
+
+def ingest_archive_bajas(file_path, as_of=None, key_players=None, confidence=0.75):
+    """
+    Tabla de bajas de un archivo multi-semana (backfill de jornadas pasadas).
+
+    Args:
+        as_of: Fecha de corte (p.ej. kickoff de la jornada). Se descartan reportes
+            con last_updated posterior (información del futuro); recency_days se
+            mide contra esta fecha (nulo si el reporte no tiene fecha).
+            Default: hoy.
+        confidence: Confianza asignada a todas las filas del archivo
+    """
+    if not os.path.exists(file_path):
+        return empty_bajas_table()
+    team_names = []
+    cols, _, invalid = _validated_columns(_archive_player_batches(file_path, team_names),
+                                          _validate_archive_player)
+    valid = np.ones(len(team_names), dtype=bool)
+    valid[[i for i, _ in invalid]] = False
+    teams = _canonical_column(_object_array(team_names)[valid])
+
+    updated = pd.to_datetime(pd.Series(cols['last_updated'], dtype=object), errors='coerce')
+    as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.now().normalize()
+    recency = (as_of - updated).dt.days.astype('Int16')
+    status = np.asarray([ARCHIVE_STATUS.get(s.upper(), s.title()) for s in cols['status']], dtype=object)
+    auto = _key_player_levels(teams, cols['player_name'], key_players)
+
+    mask = (teams != '') & ~(updated > as_of).to_numpy(dtype=bool)
+    columns = {
+        'team': teams,
+        'player': cols['player_name'],
+        'role': [ARCHIVE_ROLES.get(p.upper(), p) for p in cols['position']],
+        'status': status,
+        'impact_level': [level or 'Low' for level in auto],
+        'reason': cols['reason'],
+        'confidence': np.full(len(teams), float(confidence)),
+        'recency_days': recency.to_numpy(dtype=object, na_value=None),
+    }
+    return _finish_table(columns, mask, 'archive', None, invalid, file_path)
+
+
+def bajas_records(table):
+    """Filas de la tabla como dicts (formato de deduplicate_bajas / apply_bajas_list)."""
+    names = list(table.columns)
+    values = [table[name].tolist() for name in names]
+    values[names.index('recency_days')] = [None if v is pd.NA else v for v in table['recency_days'].tolist()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+# ========== MERGE + DEDUPLICACIÓN ==========
+
+# Tupla de prioridad por fila (mayor gana): impacto > confianza > fuente > llegada más temprana
+IMPACT_PRIORITY = {'High': 3, 'Mid': 2, 'Low': 1, 'None': 0}
+SOURCE_PRIORITY = {'manual': 1}  # el resto de fuentes empata; decide el orden de llegada
+PRIORITY_FIELDS = ('impact', 'confidence', 'source', 'arrival')
+_DEDUP_REASONS = {'impact': 'impacto', 'confidence': 'confianza', 'source': 'fuente', 'arrival': 'orden'}
+
+
+def _mapped_codes(values, mapping, default=0):
+    """mapping.get(v, default) por fila, evaluado una vez por valor único."""
+    codes, uniques = pd.factorize(_object_array(values))
+    lookup = np.array([mapping.get(u, default) for u in uniques] + [default], dtype=np.int64)
+    return lookup[codes]
+
+
+def dedup_keys(teams, players):
+    """
+    Código de llave (team, jugador normalizado) por fila, en orden de primera
+    aparición. Hash (factorize) sobre valores únicos: lineal en filas.
+    """
+    team_codes, _ = pd.factorize(_object_array(teams), use_na_sentinel=False)
+    player_codes, player_uniques = pd.factorize(_object_array(players), use_na_sentinel=False)
+    norm_codes, norm_uniques = pd.factorize(_object_array(
+        [dl.remove_accents(p.lower().strip()) if isinstance(p, str) else '' for p in player_uniques]))
+    combined = team_codes.astype(np.int64) * (len(norm_uniques) + 1) + norm_codes[player_codes]
+    keys, _ = pd.factorize(combined)
+    return keys
+
+
+def priority_columns(table):
+    """Componentes de la tupla de prioridad (PRIORITY_FIELDS) como columnas; mayor = mejor."""
+    n = len(table)
+    return {
+        'impact': _mapped_codes(table['impact_level'], IMPACT_PRIORITY),
+        'confidence': table['confidence'].to_numpy(dtype=np.float64, na_value=np.nan),
+        'source': _mapped_codes(table['source'], SOURCE_PRIORITY),
+        'arrival': -np.arange(n, dtype=np.int64),
+    }
+
+
+def resolve_duplicates(table):
+    """
+    Ganador por llave (team, jugador normalizado): un solo sort por
+    (llave, prioridad desc) y el primero de cada grupo.
+
+    Returns:
+        tuple: (posiciones ganadoras en `table`, en orden de primera aparición
+                de la llave; provenance DataFrame, una fila por llave)
+    """
+    n = len(table)
+    keys = dedup_keys(table['team'], table['player'])
+    priority = priority_columns(table)
+    # lexsort: la última llave es la primaria → llave, luego prioridad descendente
+    order = np.lexsort(tuple(-priority[f] for f in reversed(PRIORITY_FIELDS)) + (keys,))
+    sorted_keys = keys[order]
+    first = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if n else np.zeros(0, np.intp)
+    winners = order[first]
+
+    # Subcampeón (segundo del grupo) → qué componente de la tupla decidió
+    nxt = np.minimum(first + 1, max(n - 1, 0))
+    contested = (first + 1 < n) & (sorted_keys[nxt] == sorted_keys[first])
+    runners = order[nxt]
+    reason = np.full(len(first), 'unica', dtype=object)
+    undecided = contested.copy()
+    for field in PRIORITY_FIELDS:
+        values = priority[field]
+        decided = undecided & (values[winners] != values[runners])
+        reason[decided] = _DEDUP_REASONS[field]
+        undecided &= ~decided
+
+    candidates = np.bincount(keys, minlength=len(first))
+    sources = _object_array(table['source'])
+    group_sources = [[] for _ in range(len(first))]
+    for key, src in zip(keys, sources):
+        group_sources[key].append(src)
+
+    provenance = pd.DataFrame({
+        'team': _object_array(table['team'])[winners],
+        'player': _object_array(table['player'])[winners],
+        'winner_row': winners,
+        'source': sources[winners],
+        'impact_level': _object_array(table['impact_level'])[winners],
+        'confidence': priority['confidence'][winners],
+        'candidates': candidates,
+        'sources': ['+'.join(s) for s in group_sources],
+        'reason': reason,
+        'runner_up_source': np.where(contested, sources[runners], None),
+    })
+    return winners, provenance
+
+
+def concat_bajas_tables(tables):
+    """Une tablas de bajas (en orden de llegada) conservando las columnas categóricas."""
+    tables = [t for t in tables if len(t)]
+    if not tables:
+        return empty_bajas_table()
+    merged = pd.concat(tables, ignore_index=True)
+    for name in _CATEGORY_COLUMNS + ('source',):
+        merged[name] = merged[name].astype('category')
+    merged.attrs['invalid'] = [item for t in tables for item in t.attrs.get('invalid', [])]
+    return merged
+
+
+def merge_bajas(tables):
+    """
+    Merge + dedup de varios feeds en una pasada (p.ej. manual + N semanas de
+    perplexity / archivo). El orden de `tables` es el orden de llegada: a
+    igual impacto, confianza y fuente, gana la fila que llegó antes.
+
+    Returns:
+        tuple: (tabla deduplicada, provenance)
+    """
+    merged = concat_bajas_tables(tables)
+    winners, provenance = resolve_duplicates(merged)
+    return merged.iloc[winners].reset_index(drop=True), provenance
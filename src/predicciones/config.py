@@ -1,6 +1,7 @@
 
 # src/predicciones/config.py
 
+import json
 import os
 
 def get_config(jornada):
@@ -28,6 +29,35 @@ def get_config(jornada):
         # Dixon-Coles draw correction (ρ negativo = aumenta P(0-0) y P(1-1), reduce P(1-0) y P(0-1))
         'DC_RHO': -0.10,
 
+        # Cache content-addressed de prior / league averages (config + datos + código)
+        'CACHE_DIR': 'data/processed',
+        'CACHE_MAX_FILES': 8,            # archivos por tipo de artefacto antes de evicción
+
+        # Snapshot binario tipado de INPUT_STATS (llave = hash del archivo; None = sin snapshot)
+        'STATS_SNAPSHOT_DIR': 'data/processed',
+
+        # Feature store point-in-time (forma/momentum/crisis por partido histórico)
+        'FEATURE_STORE_PATH': 'data/processed/feature_store.npz',
+
+        # Cache de picks (optimize_pick_for_quiniela) persistido entre pasos del pipeline
+        'PICK_CACHE_PATH': 'data/processed/pick_cache.json',
+        'PICK_CACHE_RESOLUTION': 1e-4,  # cuantización de λ_home, λ_away y ρ en la llave
+        'PICK_CACHE_MAXSIZE': 4096,
+
+        # Monte Carlo de incertidumbre de lambdas (robustez del pick; 0 = desactivado).
+        # Opt-in: run_pipeline.py --mc-simulations N (p.ej. 20000) genera robustez_jornada_N.csv
+        'MC_SIMULATIONS': 0,
+        'MC_SEED': 2026,                 # semilla fija: el reporte de robustez es reproducible
+        'MC_ADJ_CV_MIN': 0.15,           # CV del efecto de bajas/contexto con confianza 1.0
+        'MC_ADJ_CV_MAX': 0.60,           # CV con confianza 0.0 (interpolación lineal)
+        'MC_DEFAULT_CONFIDENCE': 0.75,   # ajustes sin confianza registrada (xPTS, cualitativo)
+
+        # Simulador de temporada (scripts/simular_temporada.py)
+        'SEASON_SIMULATIONS': 100000,
+        'SEASON_SEED': 2026,
+        'LIGUILLA_DIRECT_SPOTS': 6,      # 1°-6° directo a cuartos
+        'PLAY_IN_LAST_SPOT': 10,         # 7°-10° play-in
+
         # Crisis / Momentum
         'HOME_CRISIS_WINS_THRESHOLD': 1,   # ≤ 1 victoria local en últimos N_HOME_FORM partidos → crisis
         'N_HOME_FORM': 4,                   # Partidos de local a revisar para crisis
@@ -98,6 +128,7 @@ def get_config(jornada):
         'INPUT_CONTEXT': f'data/inputs/context_adjustments_jornada{jornada}.json',
         'INPUT_EVALUATION': 'data/inputs/evaluacion_bajas.json',  # Común a todas
         'INPUT_PERPLEXITY_BAJAS': 'data/inputs/perplexity_bajas_semana.json',
+        'INPUT_KEY_PLAYERS': 'data/key_players.json',
         'INPUT_STATS': 'data/inputs/Stats_liga_mx.json',  # Común a todas
         'OUTPUT_CSV': 'outputs/diagnostico_lambda_components.csv',
         'OUTPUT_TXT': 'outputs/diagnostico_report.txt',
@@ -110,9 +141,13 @@ def resolve_config(jornada=None):
 
     Precedencia:
     1) Argumento explícito `jornada`
-    2) Variable de entorno `PRED_JORNADA`
-    3) Fallback a jornada 10 (jornada activa)
+    2) Variable de entorno `PRED_CONFIG` (config ya resuelta en JSON, la pasa
+       run_pipeline.py a los steps en modo --subprocess)
+    3) Variable de entorno `PRED_JORNADA`
+    4) Fallback a jornada 10 (jornada activa)
     """
+    if jornada is None and os.getenv('PRED_CONFIG'):
+        return json.loads(os.environ['PRED_CONFIG'])
     if jornada is None:
         env_jornada = os.getenv('PRED_JORNADA')
         jornada = int(env_jornada) if env_jornada else 10
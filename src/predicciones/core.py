@@ -1,9 +1,17 @@
 
+import csv
+import os
 import unicodedata
 import re
 import logging
+
+import numpy as np
+import pandas as pd
+
 from .config import CANONICAL_ALIASES
 from . import utils  # Importar utils para caché
+from . import adjustments as adj_store
+from . import quiniela as qx
 
 
 # ========== CANONICALIZACION DE NOMBRES ==========
@@ -13,107 +21,210 @@ def remove_accents(text):
     return ''.join(c for c in unicodedata.normalize('NFD', text) 
                    if unicodedata.category(c) != 'Mn')
 
-def canonical_team_name(name):
+# Patrones precompilados (antes se compilaban en cada llamada)
+_DOT_RE = re.compile(r'[.]')
+_DASH_RE = re.compile(r'[-]')
+_SPACES_RE = re.compile(r'\s+')
+_NOISE_TOKENS_RE = re.compile(r'\b(?:fc|cf|club|deportivo)\b')
+
+
+def _canonicalize_uncached(name):
     """
-    Canonicaliza nombre de equipo con reglas estrictas
+    Canonicaliza nombre de equipo con reglas estrictas (sin memo).
     """
     if not name:
         return ""
-    
+
     # 1. Lowercase y strip
     name = name.lower().strip()
-    
+
     # 2. Remover acentos
     name = remove_accents(name)
-    
+
     # 3. Remover puntuacion (puntos, comas, guiones internos)
-    name = re.sub(r'[.]', '', name)
-    name = re.sub(r'[-]', ' ', name)
-    
+    name = _DOT_RE.sub('', name)
+    name = _DASH_RE.sub(' ', name)
+
     # 4. Normalizar espacios multiples
-    name = re.sub(r'\s+', ' ', name).strip()
-    
+    name = _SPACES_RE.sub(' ', name).strip()
+
     # 5. Remover tokens irrelevantes SOLO si no rompen
-    tokens_to_remove = ['fc', 'cf', 'club', 'deportivo']
-    for token in tokens_to_remove:
-        name = re.sub(r'\b' + token + r'\b', '', name)
-    
+    name = _NOISE_TOKENS_RE.sub('', name)
+
     # Normalizar espacios de nuevo
-    name = re.sub(r'\s+', ' ', name).strip()
-    
+    name = _SPACES_RE.sub(' ', name).strip()
+
     # 6. Aplicar diccionario de alias explicitos
     if name in CANONICAL_ALIASES:
         name = CANONICAL_ALIASES[name]
-    
+
     return name
 
+
+class TeamNameCanonicalizer:
+    """
+    Índice raw -> canonical con memo. Cada nombre crudo se normaliza una sola vez;
+    las llamadas repetidas (los ~40 nombres de Stats_liga_mx.json) son lookups O(1).
+    """
+
+    def __init__(self):
+        self._index = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, name):
+        try:
+            canonical = self._index[name]
+        except KeyError:
+            self.misses += 1
+            canonical = self._index[name] = _canonicalize_uncached(name)
+            return canonical
+        except TypeError:
+            # No hasheable: no se memoiza
+            return _canonicalize_uncached(name)
+        self.hits += 1
+        return canonical
+
+    def seed(self, names):
+        """Pre-carga nombres crudos al índice (sin contar como hits/misses)."""
+        for name in names:
+            if name not in self._index:
+                self._index[name] = _canonicalize_uncached(name)
+        return self
+
+    def seed_from_aliases(self, aliases=None):
+        aliases = CANONICAL_ALIASES if aliases is None else aliases
+        return self.seed(list(aliases.keys()) + list(aliases.values()))
+
+    def seed_from_stats_file(self, stats_path):
+        """Pre-carga todos los home_team/away_team distintos del TSV de stats."""
+        if not os.path.exists(stats_path):
+            return self
+        with open(stats_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f, delimiter='\t')
+            names = set()
+            for row in reader:
+                names.add(row.get('home_team'))
+                names.add(row.get('away_team'))
+        names.discard(None)
+        return self.seed(sorted(names))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._index),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._index.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+TEAM_NAME_INDEX = TeamNameCanonicalizer().seed_from_aliases()
+
+
+def canonical_team_name(name):
+    """
+    Canonicaliza nombre de equipo con reglas estrictas (memoizado en TEAM_NAME_INDEX)
+    """
+    return TEAM_NAME_INDEX(name)
+
 # ========== BUILD STATS CON CANONICAL NAMES ==========
 
+TEAM_STAT_COLUMNS = (
+    'PJ_home', 'PJ_away', 'PJ_total',
+    'GF_home', 'GF_away', 'GF_total',
+    'GC_home', 'GC_away', 'GC_total',
+)
+
+
+def encode_teams(home_teams, away_teams):
+    """
+    Canonicaliza los nombres crudos UNA vez por nombre único y los mapea a códigos enteros.
+
+    El orden de los equipos es el de primera aparición recorriendo partido a partido
+    (local antes que visitante), igual que el loop original por filas.
+
+    Returns: (teams, home_codes, away_codes, fusion_log)
+      teams: lista de nombres canónicos (índice = código)
+      fusion_log: {canonical: set(raw)} para nombres crudos distintos al canónico
+    """
+    home_teams = np.asarray(home_teams, dtype=object)
+    away_teams = np.asarray(away_teams, dtype=object)
+    interleaved = np.column_stack([home_teams, away_teams]).ravel()
+    raw_codes, raw_names = pd.factorize(interleaved)
+
+    teams = []
+    team_code = {}
+    fusion_log = {}
+    raw_to_team = np.empty(len(raw_names), dtype=np.int64)
+    for i, raw in enumerate(raw_names):
+        canonical = canonical_team_name(raw)
+        if raw != canonical:
+            fusion_log.setdefault(canonical, set()).add(raw)
+        if canonical not in team_code:
+            team_code[canonical] = len(teams)
+            teams.append(canonical)
+        raw_to_team[i] = team_code[canonical]
+
+    codes = raw_to_team[raw_codes].reshape(-1, 2)
+    return teams, codes[:, 0], codes[:, 1], fusion_log
+
+
+def build_team_stats_matrix(stats_df, tournament):
+    """
+    Versión columnar de build_team_stats_canonical.
+
+    Returns: (teams, matrix, fusion_log)
+      matrix: np.ndarray (len(teams) x len(TEAM_STAT_COLUMNS)) con PJ/GF/GC home/away/total
+    """
+    tournament_matches = stats_df[stats_df['tournament'] == tournament]
+
+    if len(tournament_matches) == 0:
+        raise ValueError(f"No matches for tournament: {tournament}")
+
+    teams, home_codes, away_codes, fusion_log = encode_teams(
+        tournament_matches['home_team'].to_numpy(), tournament_matches['away_team'].to_numpy()
+    )
+    home_goals = tournament_matches['home_goals'].to_numpy()
+    away_goals = tournament_matches['away_goals'].to_numpy()
+    n_teams = len(teams)
+
+    # Sumas agrupadas por código de equipo sobre ambas columnas
+    pj_home = np.bincount(home_codes, minlength=n_teams)
+    pj_away = np.bincount(away_codes, minlength=n_teams)
+    gf_home = np.bincount(home_codes, weights=home_goals, minlength=n_teams)
+    gf_away = np.bincount(away_codes, weights=away_goals, minlength=n_teams)
+    gc_home = np.bincount(home_codes, weights=away_goals, minlength=n_teams)
+    gc_away = np.bincount(away_codes, weights=home_goals, minlength=n_teams)
+
+    matrix = np.column_stack([
+        pj_home, pj_away, pj_home + pj_away,
+        gf_home, gf_away, gf_home + gf_away,
+        gc_home, gc_away, gc_home + gc_away,
+    ])
+    # Goles enteros → matriz entera (bincount con weights regresa float)
+    if np.issubdtype(home_goals.dtype, np.integer) and np.issubdtype(away_goals.dtype, np.integer):
+        matrix = matrix.astype(np.int64)
+
+    return teams, matrix, fusion_log
+
+
 def build_team_stats_canonical(stats_df, tournament):
     """
     Construye stats por equipo con nombres canonicos
     FUSIONA duplicados y loggea fusiones
     """
-    
-    tournament_matches = stats_df[stats_df['tournament'] == tournament].copy()
-    
-    if len(tournament_matches) == 0:
-        raise ValueError(f"No matches for tournament: {tournament}")
-    
-    team_stats = {}
-    fusion_log = {}
-    
-    for _, match in tournament_matches.iterrows():
-        home_team_raw = match['home_team']
-        away_team_raw = match['away_team']
-        
-        home_team_canonical = canonical_team_name(home_team_raw)
-        away_team_canonical = canonical_team_name(away_team_raw)
-        
-        # Track fusions
-        if home_team_raw != home_team_canonical:
-            if home_team_canonical not in fusion_log:
-                fusion_log[home_team_canonical] = set()
-            fusion_log[home_team_canonical].add(home_team_raw)
-        
-        if away_team_raw != away_team_canonical:
-            if away_team_canonical not in fusion_log:
-                fusion_log[away_team_canonical] = set()
-            fusion_log[away_team_canonical].add(away_team_raw)
-        
-        home_goals = match['home_goals']
-        away_goals = match['away_goals']
-        
-        # Initialize if not exists
-        if home_team_canonical not in team_stats:
-            team_stats[home_team_canonical] = {
-                'PJ_home': 0, 'PJ_away': 0, 'PJ_total': 0,
-                'GF_home': 0, 'GF_away': 0, 'GF_total': 0,
-                'GC_home': 0, 'GC_away': 0, 'GC_total': 0,
-            }
-        
-        if away_team_canonical not in team_stats:
-            team_stats[away_team_canonical] = {
-                'PJ_home': 0, 'PJ_away': 0, 'PJ_total': 0,
-                'GF_home': 0, 'GF_away': 0, 'GF_total': 0,
-                'GC_home': 0, 'GC_away': 0, 'GC_total': 0,
-            }
-        
-        # Update stats
-        team_stats[home_team_canonical]['PJ_home'] += 1
-        team_stats[home_team_canonical]['PJ_total'] += 1
-        team_stats[home_team_canonical]['GF_home'] += home_goals
-        team_stats[home_team_canonical]['GF_total'] += home_goals
-        team_stats[home_team_canonical]['GC_home'] += away_goals
-        team_stats[home_team_canonical]['GC_total'] += away_goals
-        
-        team_stats[away_team_canonical]['PJ_away'] += 1
-        team_stats[away_team_canonical]['PJ_total'] += 1
-        team_stats[away_team_canonical]['GF_away'] += away_goals
-        team_stats[away_team_canonical]['GF_total'] += away_goals
-        team_stats[away_team_canonical]['GC_away'] += home_goals
-        team_stats[away_team_canonical]['GC_total'] += home_goals
-    
+    teams, matrix, fusion_log = build_team_stats_matrix(stats_df, tournament)
+
+    team_stats = {
+        team: dict(zip(TEAM_STAT_COLUMNS, row))
+        for team, row in zip(teams, matrix.tolist())
+    }
     return team_stats, fusion_log
 
 # ========== LEAGUE AVERAGES SEPARADOS POR TORNEO ==========
@@ -231,125 +342,167 @@ def calculate_weighted_means_correct(team_stats_current, team_stats_prior, leagu
 
 # ========== MULTI-TOURNAMENT PRIOR LOGIC ==========
 
+def build_tournament_cube(stats_df, tournaments):
+    """
+    Agregado de TODOS los torneos en un solo scan (group-by torneo × equipo × venue).
+
+    Args:
+        tournaments (list[str]): torneos a incluir; los que no existen en los datos se omiten.
+
+    Returns: dict con
+      'tournaments': torneos encontrados (eje 0, en el orden pedido)
+      'teams': nombres canónicos (eje 1, orden de primera aparición torneo por torneo)
+      'cube': np.ndarray (T x equipos x TEAM_STAT_COLUMNS)
+      'present': np.ndarray bool (T x equipos), equipo jugó en el torneo
+      'avg_home', 'avg_away', 'matches': np.ndarray (T,) promedios de liga por torneo
+    """
+    order = {}
+    for name in tournaments:
+        order.setdefault(name, len(order))
+
+    subset = stats_df[stats_df['tournament'].isin(list(order))]
+    t_idx = subset['tournament'].map(order).to_numpy(dtype=np.int64)
+    # Filas agrupadas por torneo en el orden pedido (estable dentro de cada torneo)
+    row_order = np.argsort(t_idx, kind='stable')
+    t_idx = t_idx[row_order]
+
+    teams, home_codes, away_codes, _ = encode_teams(
+        subset['home_team'].to_numpy()[row_order], subset['away_team'].to_numpy()[row_order]
+    )
+    home_goals = subset['home_goals'].to_numpy()[row_order].astype(float)
+    away_goals = subset['away_goals'].to_numpy()[row_order].astype(float)
+
+    n_t, n_teams = len(order), len(teams)
+    size = n_t * n_teams
+    home_cell = t_idx * n_teams + home_codes
+    away_cell = t_idx * n_teams + away_codes
+
+    def grouped(cells, weights=None):
+        return np.bincount(cells, weights=weights, minlength=size).reshape(n_t, n_teams)
+
+    pj_home, pj_away = grouped(home_cell), grouped(away_cell)
+    gf_home, gf_away = grouped(home_cell, home_goals), grouped(away_cell, away_goals)
+    gc_home, gc_away = grouped(home_cell, away_goals), grouped(away_cell, home_goals)
+
+    cube = np.stack([
+        pj_home, pj_away, pj_home + pj_away,
+        gf_home, gf_away, gf_home + gf_away,
+        gc_home, gc_away, gc_home + gc_away,
+    ], axis=2)
+
+    matches = np.bincount(t_idx, minlength=n_t)
+    sum_home = np.bincount(t_idx, weights=home_goals, minlength=n_t)
+    sum_away = np.bincount(t_idx, weights=away_goals, minlength=n_t)
+
+    found = matches > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_home = sum_home / matches
+        avg_away = sum_away / matches
+
+    return {
+        'tournaments': [name for name, i in order.items() if found[i]],
+        'teams': teams,
+        'cube': cube[found],
+        'present': (pj_home + pj_away)[found] > 0,
+        'avg_home': avg_home[found],
+        'avg_away': avg_away[found],
+        'matches': matches[found],
+    }
+
+
+def _smoothed_relatives(cube, avg_home, avg_away, K):
+    """
+    Tasas suavizadas (Bayes simple con K) y relativos por torneo como arreglos (T x equipos).
+    """
+    col = {name: cube[..., i] for i, name in enumerate(TEAM_STAT_COLUMNS)}
+    mu_att_home = avg_home[:, None]
+    mu_att_away = avg_away[:, None]
+    mu_def_home = avg_away[:, None]  # Home defense vs Away attack
+    mu_def_away = avg_home[:, None]  # Away defense vs Home attack
+
+    def relative(rate, mu):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(mu > 0, rate / mu, 1.0)
+
+    rate_att_home = (col['GF_home'] + K * mu_att_home) / (col['PJ_home'] + K)
+    rate_att_away = (col['GF_away'] + K * mu_att_away) / (col['PJ_away'] + K)
+    rate_def_home = (col['GC_home'] + K * mu_def_home) / (col['PJ_home'] + K)
+    rate_def_away = (col['GC_away'] + K * mu_def_away) / (col['PJ_away'] + K)
+
+    return {
+        'att_home': relative(rate_att_home, mu_att_home), 'rate_att_home': rate_att_home,
+        'att_away': relative(rate_att_away, mu_att_away), 'rate_att_away': rate_att_away,
+        'def_home': relative(rate_def_home, mu_def_home), 'rate_def_home': rate_def_home,
+        'def_away': relative(rate_def_away, mu_def_away), 'rate_def_away': rate_def_away,
+        'pj_total': col['PJ_total'],
+    }
+
+
 def calculate_tournament_relatives(stats_df, tournament, K=3.0):
     """Calcula componentes relativos Y TASAS suavizadas para UN torneo."""
-    try:
-        # Build Stats & League Avg for this specific tournament
-        # Note: This calls existing functions but we handle empty/missing gracefully
-        team_stats, _ = build_team_stats_canonical(stats_df, tournament)
-        league_avg = calculate_league_averages_by_tournament(stats_df, tournament)
-    except ValueError:
+    agg = build_tournament_cube(stats_df, [tournament])
+    if not agg['tournaments']:
         return {} # Tournament might not exist in data
 
+    rels = _smoothed_relatives(agg['cube'], agg['avg_home'], agg['avg_away'], K)
     relatives = {}
-    
-    # Pre-calculate constants
-    mu_att_home = league_avg['home']
-    mu_att_away = league_avg['away']
-    mu_def_home = league_avg['away'] # Home defense vs Away attack
-    mu_def_away = league_avg['home'] # Away defense vs Home attack
-
-    for team, stats in team_stats.items():
-        # Using simple Bayes (K) for the *historical* tournament rates themselves 
-        # to ensure the prior itself isn't too noisy if that tournament had few games.
-        
-        # ATT HOME
-        gf_home = stats['GF_home']
-        pj_home = stats['PJ_home']
-        rate_att_home = (gf_home + K * mu_att_home) / (pj_home + K)
-        att_home_rel = rate_att_home / mu_att_home if mu_att_home > 0 else 1.0
-        
-        # ATT AWAY
-        gf_away = stats['GF_away']
-        pj_away = stats['PJ_away']
-        rate_att_away = (gf_away + K * mu_att_away) / (pj_away + K)
-        att_away_rel = rate_att_away / mu_att_away if mu_att_away > 0 else 1.0
-        
-        # DEF HOME
-        gc_home = stats['GC_home']
-        rate_def_home = (gc_home + K * mu_def_home) / (pj_home + K)
-        def_home_rel = rate_def_home / mu_def_home if mu_def_home > 0 else 1.0
-        
-        # DEF AWAY
-        gc_away = stats['GC_away']
-        rate_def_away = (gc_away + K * mu_def_away) / (pj_away + K)
-        def_away_rel = rate_def_away / mu_def_away if mu_def_away > 0 else 1.0
-        
-        relatives[team] = {
-            'att_home': att_home_rel, 'rate_att_home': rate_att_home,
-            'att_away': att_away_rel, 'rate_att_away': rate_att_away,
-            'def_home': def_home_rel, 'rate_def_home': rate_def_home,
-            'def_away': def_away_rel, 'rate_def_away': rate_def_away,
-            'pj_total': stats['PJ_total']
-        }
-        
+    for j, team in enumerate(agg['teams']):
+        relatives[team] = {key: arr[0, j].item() for key, arr in rels.items()}
+        relatives[team]['pj_total'] = int(relatives[team]['pj_total'])
     return relatives
 
 def build_weighted_prior_stats(stats_df, config):
     """
     Construye prior ponderado incluyendo RELATIVOS y TASAS (RATES).
     Utiliza caché si está disponible y la configuración no ha cambiado.
+
+    Todos los torneos de PRIOR_TOURNAMENTS se agregan en un solo cubo
+    (torneo × equipo × stat); relativos y normalización ponderada son
+    operaciones de arreglo sobre el eje de torneos.
     """
-    # Intentar cargar desde caché
-    cached_prior = utils.load_prior_cache(config)
+    cache_dir = config.get('CACHE_DIR', utils.DEFAULT_CACHE_DIR)
+
+    # Intentar cargar desde caché (llave: config + contenido de stats_df + código)
+    cached_prior = utils.load_prior_cache(config, stats_df, cache_dir)
     if cached_prior:
         return cached_prior
 
     tournaments = config.get('PRIOR_TOURNAMENTS', [])
     K = config.get('BAYES_K', 3.0)
-    
-    # Storage for weighted sums: team -> {component -> weighted_sum, weight_sum -> total_weight}
-    agg_stats = {}
-    
-    for t_conf in tournaments:
-        t_name = t_conf['name']
-        t_weight = t_conf['weight']
-        
-        # Calculate relatives for this tournament
-        t_relatives = calculate_tournament_relatives(stats_df, t_name, K)
-        
-        for team, rels in t_relatives.items():
-            if team not in agg_stats:
-                agg_stats[team] = {
-                    'att_home_sum': 0.0, 'att_away_sum': 0.0,
-                    'def_home_sum': 0.0, 'def_away_sum': 0.0,
-                    'rate_att_home_sum': 0.0, 'rate_att_away_sum': 0.0,
-                    'rate_def_home_sum': 0.0, 'rate_def_away_sum': 0.0,
-                    'pj_total_sum': 0, # Just for info
-                    'weight_sum': 0.0
-                }
-            
-            agg = agg_stats[team]
-            agg['att_home_sum'] += rels['att_home'] * t_weight
-            agg['att_away_sum'] += rels['att_away'] * t_weight
-            agg['def_home_sum'] += rels['def_home'] * t_weight
-            agg['def_away_sum'] += rels['def_away'] * t_weight
-            
-            agg['rate_att_home_sum'] += rels['rate_att_home'] * t_weight
-            agg['rate_att_away_sum'] += rels['rate_att_away'] * t_weight
-            agg['rate_def_home_sum'] += rels['rate_def_home'] * t_weight
-            agg['rate_def_away_sum'] += rels['rate_def_away'] * t_weight
-            
-            agg['pj_total_sum'] += rels['pj_total']
-            agg['weight_sum'] += t_weight
-            
+
+    agg = build_tournament_cube(stats_df, [t_conf['name'] for t_conf in tournaments])
+    rels = _smoothed_relatives(agg['cube'], agg['avg_home'], agg['avg_away'], K)
+
+    # Peso por torneo (una entrada de config por fila; torneos sin datos se omiten)
+    t_pos = {name: i for i, name in enumerate(agg['tournaments'])}
+    entries = [(t_pos[t['name']], t['weight']) for t in tournaments if t['name'] in t_pos]
+    rows = np.array([i for i, _ in entries], dtype=np.int64)
+    # weights (E x equipos): 0 donde el equipo no jugó ese torneo
+    weights = np.array([w for _, w in entries], dtype=float)[:, None] * agg['present'][rows]
+
+    weight_sum = weights.sum(axis=0)
+    weighted = {key: (arr[rows] * weights).sum(axis=0) for key, arr in rels.items() if key != 'pj_total'}
+    pj_total_sum = (rels['pj_total'][rows] * agg['present'][rows]).sum(axis=0)
+
     # Normalize
     final_priors = {}
-    for team, agg in agg_stats.items():
-        w_total = agg['weight_sum']
+    for j, team in enumerate(agg['teams']):
+        if not agg['present'][rows, j].any():
+            continue
+        w_total = weight_sum[j]
         if w_total > 0:
             final_priors[team] = {
-                'att_home_prior': agg['att_home_sum'] / w_total,
-                'att_away_prior': agg['att_away_sum'] / w_total,
-                'def_home_prior': agg['def_home_sum'] / w_total,
-                'def_away_prior': agg['def_away_sum'] / w_total,
-                
-                'rate_att_home_prior': agg['rate_att_home_sum'] / w_total,
-                'rate_att_away_prior': agg['rate_att_away_sum'] / w_total,
-                'rate_def_home_prior': agg['rate_def_home_sum'] / w_total,
-                'rate_def_away_prior': agg['rate_def_away_sum'] / w_total,
-                
-                'pj_prior_total': agg['pj_total_sum'] # Not strictly used for shrinkage anymore but good for audit
+                'att_home_prior': (weighted['att_home'][j] / w_total).item(),
+                'att_away_prior': (weighted['att_away'][j] / w_total).item(),
+                'def_home_prior': (weighted['def_home'][j] / w_total).item(),
+                'def_away_prior': (weighted['def_away'][j] / w_total).item(),
+
+                'rate_att_home_prior': (weighted['rate_att_home'][j] / w_total).item(),
+                'rate_att_away_prior': (weighted['rate_att_away'][j] / w_total).item(),
+                'rate_def_home_prior': (weighted['rate_def_home'][j] / w_total).item(),
+                'rate_def_away_prior': (weighted['rate_def_away'][j] / w_total).item(),
+
+                'pj_prior_total': int(pj_total_sum[j]) # Not strictly used for shrinkage anymore but good for audit
             }
         else:
             # Fallback (should not happen if weights > 0)
@@ -361,17 +514,26 @@ def build_weighted_prior_stats(stats_df, config):
             }
             
     # Guardar en caché antes de retornar
-    utils.save_prior_cache(final_priors, config)
+    utils.save_prior_cache(final_priors, config, stats_df, cache_dir)
 
     return final_priors
 
 def calculate_weighted_league_averages(stats_df, config):
-    """Calcula promedio de liga ponderado multi-torneo (PRIOR)."""
+    """
+    Calcula promedio de liga ponderado multi-torneo (PRIOR).
+    Usa el mismo cache content-addressed que el prior (kind='league_avg').
+    """
+    cache_dir = config.get('CACHE_DIR', utils.DEFAULT_CACHE_DIR)
+    cached_avgs, _ = utils.load_cached_artifact('league_avg', config, stats_df, cache_dir)
+    if cached_avgs is not None:
+        return cached_avgs
+
     tournaments = config.get('PRIOR_TOURNAMENTS', [])
     
     avg_home_sum = 0
     avg_away_sum = 0
     total_weight = 0
+    complete = True
     
     for t_conf in tournaments:
         t_name = t_conf['name']
@@ -383,14 +545,22 @@ def calculate_weighted_league_averages(stats_df, config):
             total_weight += t_weight
         except (ValueError, KeyError, TypeError) as e:
             logging.warning(f"Error calculando avg para torneo '{t_name}': {e}")
+            complete = False
             continue
             
     if total_weight > 0:
-        return {
-            'home': avg_home_sum / total_weight,
-            'away': avg_away_sum / total_weight, 
-            'total': (avg_home_sum + avg_away_sum) / total_weight
+        result = {
+            'home': float(avg_home_sum / total_weight),
+            'away': float(avg_away_sum / total_weight),
+            'total': float((avg_home_sum + avg_away_sum) / total_weight)
         }
+        # Solo se cachean resultados completos (un torneo faltante debe seguir avisando)
+        if complete:
+            utils.save_cached_artifact(
+                'league_avg', result, config, stats_df, cache_dir,
+                max_files=config.get('CACHE_MAX_FILES', utils.DEFAULT_CACHE_MAX_FILES)
+            )
+        return result
     return {'home': 0, 'away': 0, 'total': 0} # Should not happen
 
 # ========== TABLA DE POSICIONES ACTUAL ==========
@@ -399,7 +569,7 @@ def calculate_current_table(stats_df, tournament):
     """
     Calcula la tabla de posiciones actual a partir de los partidos registrados.
 
-    Returns: dict {team_canonical: {'pts': int, 'pj': int, 'gd': int}}
+    Returns: dict {team_canonical: {'pts': int, 'pj': int, 'gd': int, 'gf': int}}
     """
     tournament_matches = stats_df[stats_df['tournament'] == tournament].copy()
 
@@ -412,12 +582,14 @@ def calculate_current_table(stats_df, tournament):
 
         for team in (home, away):
             if team not in table:
-                table[team] = {'pts': 0, 'pj': 0, 'gd': 0}
+                table[team] = {'pts': 0, 'pj': 0, 'gd': 0, 'gf': 0}
 
         table[home]['pj'] += 1
         table[away]['pj'] += 1
         table[home]['gd'] += hg - ag
         table[away]['gd'] += ag - hg
+        table[home]['gf'] += hg
+        table[away]['gf'] += ag
 
         if hg > ag:
             table[home]['pts'] += 3
@@ -709,3 +881,385 @@ def compute_components_and_lambdas(match_data, team_stats_current,
         'mu_away_final': mu_away_final,
         
     }, errors
+
+
+# ========== VERSIÓN COLUMNAR (backtests / todas las combinaciones) ==========
+
+# Columnas de la matriz de ajustes de compute_components_and_lambdas_batch
+ADJUSTMENT_COLUMNS = (
+    'home_att_adj', 'home_def_adj', 'away_att_adj', 'away_def_adj',
+    'home_form_adj', 'away_form_adj',
+)
+
+
+def adjustments_matrix(adjustments_list):
+    """Convierte una lista de dicts de ajustes por partido (o None) a matriz (n, 6)."""
+    return np.array(
+        [[(adj or {}).get(col, 1.0) for col in ADJUSTMENT_COLUMNS] for adj in adjustments_list],
+        dtype=float
+    ).reshape(len(adjustments_list), len(ADJUSTMENT_COLUMNS))
+
+
+def build_team_component_arrays(teams, team_stats_current, prior_weighted_stats,
+                                config, xg_lookup=None):
+    """
+    Arreglos por equipo (alineados con `teams`) con todo lo que
+    compute_components_and_lambdas consulta en los dicts de stats/prior/xG.
+    Los priors ausentes quedan como NaN (el default depende de mu_final).
+    """
+    n = len(teams)
+    arrays = {}
+    for col in ('PJ_home', 'PJ_away', 'GF_home', 'GC_home', 'GF_away', 'GC_away'):
+        arrays[col] = np.array([team_stats_current.get(t, {}).get(col, 0) for t in teams]).reshape(n)
+
+    for col in ('rate_att_home_prior', 'rate_att_away_prior', 'rate_def_home_prior', 'rate_def_away_prior'):
+        arrays[col] = np.array(
+            [prior_weighted_stats.get(t, {}).get(col, np.nan) for t in teams], dtype=float
+        ).reshape(n)
+    for col in ('att_home_prior', 'att_away_prior', 'def_home_prior', 'def_away_prior'):
+        arrays[col] = np.array(
+            [prior_weighted_stats.get(t, {}).get(col, 1.0) for t in teams], dtype=float
+        ).reshape(n)
+
+    home_adv_factors = config.get('HOME_ADVANTAGE_FACTOR', {})
+    arrays['home_factor'] = np.array([home_adv_factors.get(t, 1.0) for t in teams], dtype=float).reshape(n)
+    arrays['has_home_factor'] = np.array([t in home_adv_factors for t in teams], dtype=bool).reshape(n)
+
+    xg_att, xg_def = [], []
+    for t in teams:
+        entry = (xg_lookup or {}).get(t, {})
+        att = entry.get('xG_per_match') if entry else None
+        xg_att.append(np.nan if att is None else att)
+        xg_def.append(entry['xGC'] / entry['PJ'] if entry and entry.get('PJ', 0) > 0 else np.nan)
+    arrays['xg_att'] = np.array(xg_att, dtype=float).reshape(n)
+    arrays['xg_def'] = np.array(xg_def, dtype=float).reshape(n)
+    return arrays
+
+
+def rate_posteriors_batch(home_idx, away_idx, teams, team_stats_current, prior_weighted_stats,
+                          league_avg_curr_raw, config, xg_lookup=None, team_arrays=None):
+    """
+    Pasos 1-3 de compute_components_and_lambdas en forma columnar: promedios de liga
+    suavizados, goles efectivos (xG blend) y la posterior gamma de cada tasa.
+
+    La tasa suavizada (obs_g + alpha * prior_rate) / (obs_pj + alpha) es la media de
+    una Gamma(shape = obs_g + alpha * prior_rate, rate = obs_pj + alpha): los
+    BAYES_ALPHA_* son pseudo-partidos del prior.
+
+    Returns:
+        dict con arreglos (n,) por partido; 'posterior' = {tasa: (shape, rate)} para
+        'att_home', 'att_away', 'def_home', 'def_away'.
+    """
+    home_idx = np.asarray(home_idx, dtype=np.intp).ravel()
+    away_idx = np.asarray(away_idx, dtype=np.intp).ravel()
+    if team_arrays is None:
+        team_arrays = build_team_component_arrays(teams, team_stats_current, prior_weighted_stats,
+                                                  config, xg_lookup)
+    H = {k: v[home_idx] for k, v in team_arrays.items()}
+    A = {k: v[away_idx] for k, v in team_arrays.items()}
+
+    # === 1. LEAGUE AVERAGE SMOOTHING (escalar, común a la jornada) ===
+    matches_played_curr = league_avg_curr_raw.get('matches', 0)
+    LEAGUE_K = config.get('LEAGUE_AVG_K', 30.0)
+    w_league = matches_played_curr / (matches_played_curr + LEAGUE_K)
+    mu_home_final = w_league * league_avg_curr_raw['home'] + (1 - w_league) * config.get('GENERIC_PRIOR_HOME', 1.45)
+    mu_away_final = w_league * league_avg_curr_raw['away'] + (1 - w_league) * config.get('GENERIC_PRIOR_AWAY', 1.15)
+
+    # === 2. SETUP TEAMS ===
+    for t in sorted({teams[i] for i in np.unique(home_idx[~H['has_home_factor']])}):
+        logging.warning(f"HOME_ADVANTAGE_FACTOR no encontrado para '{t}', usando 1.0")
+    pj_home = H['PJ_home']
+    pj_away = A['PJ_away']
+
+    # === 3. EMPIRICAL BAYES ON RATES (con xG blend previo) ===
+    ALPHA_ATT = config.get('BAYES_ALPHA_ATT', 4.0)
+    ALPHA_DEF = config.get('BAYES_ALPHA_DEF', 5.0)
+    XG_BLEND = config.get('XG_BLEND', 0.0)
+
+    def _blend(actual_g, actual_pj, xg_per_match):
+        use = (XG_BLEND > 0.0) & ~np.isnan(xg_per_match) & (actual_pj >= 3)
+        if not use.any():
+            return actual_g  # sin blend: goles observados tal cual (enteros, como la versión por partido)
+        return np.where(use, (1.0 - XG_BLEND) * actual_g + XG_BLEND * xg_per_match * actual_pj, actual_g)
+
+    eff_gf_home = _blend(H['GF_home'], pj_home, H['xg_att'])
+    eff_gc_home = _blend(H['GC_home'], pj_home, H['xg_def'])
+    eff_gf_away = _blend(A['GF_away'], pj_away, A['xg_att'])
+    eff_gc_away = _blend(A['GC_away'], pj_away, A['xg_def'])
+
+    def _prior(values, default):
+        return np.where(np.isnan(values), default, values)
+
+    prior_rate_att_home = _prior(H['rate_att_home_prior'], mu_home_final)
+    prior_rate_att_away = _prior(A['rate_att_away_prior'], mu_away_final)
+    prior_rate_def_home = _prior(H['rate_def_home_prior'], mu_away_final)
+    prior_rate_def_away = _prior(A['rate_def_away_prior'], mu_home_final)
+
+    return {
+        'H': H, 'A': A, 'n': len(home_idx), 'xg_blend': XG_BLEND,
+        'mu_home_final': mu_home_final, 'mu_away_final': mu_away_final,
+        'pj_home': pj_home, 'pj_away': pj_away,
+        'eff_gf_home': eff_gf_home, 'eff_gc_home': eff_gc_home,
+        'eff_gf_away': eff_gf_away, 'eff_gc_away': eff_gc_away,
+        'prior_rate_att_home': prior_rate_att_home, 'prior_rate_att_away': prior_rate_att_away,
+        'prior_rate_def_home': prior_rate_def_home, 'prior_rate_def_away': prior_rate_def_away,
+        'posterior': {
+            'att_home': (eff_gf_home + ALPHA_ATT * prior_rate_att_home, pj_home + ALPHA_ATT),
+            'att_away': (eff_gf_away + ALPHA_ATT * prior_rate_att_away, pj_away + ALPHA_ATT),
+            'def_home': (eff_gc_home + ALPHA_DEF * prior_rate_def_home, pj_home + ALPHA_DEF),
+            'def_away': (eff_gc_away + ALPHA_DEF * prior_rate_def_away, pj_away + ALPHA_DEF),
+        },
+    }
+
+
+def posterior_mean_rates(posteriors):
+    """Tasas suavizadas puntuales (media de cada posterior gamma)."""
+    return {name: shape / rate for name, (shape, rate) in posteriors['posterior'].items()}
+
+
+def lambdas_from_rates(posteriors, rates, config, adjustments=None, rivalry=None):
+    """
+    Pasos 4-7 de compute_components_and_lambdas: relativos, blend con el prior
+    histórico, clamps, ajustes y clásico. Todo hace broadcasting: `rates` puede traer
+    arreglos (n,) (puntual) o (draws, n) (Monte Carlo), y `adjustments` (n, 6) o
+    (draws, n, 6) en el orden de ADJUSTMENT_COLUMNS.
+    """
+    H, A, n = posteriors['H'], posteriors['A'], posteriors['n']
+    mu_home_final = posteriors['mu_home_final']
+    mu_away_final = posteriors['mu_away_final']
+    pj_home, pj_away = posteriors['pj_home'], posteriors['pj_away']
+
+    # === 4. CONVERT TO RELATIVES ===
+    ones = np.ones(n)
+    att_home_rel_curr_eb = rates['att_home'] / mu_home_final if mu_home_final > 0 else ones
+    att_away_rel_curr_eb = rates['att_away'] / mu_away_final if mu_away_final > 0 else ones
+    def_home_rel_curr_eb = rates['def_home'] / mu_away_final if mu_away_final > 0 else ones
+    def_away_rel_curr_eb = rates['def_away'] / mu_home_final if mu_home_final > 0 else ones
+
+    # === 5. DYNAMIC BLENDING ===
+    BLEND_K = config.get('BLEND_K', 6.0)
+    w_curr_home = pj_home / (pj_home + BLEND_K)
+    w_curr_away = pj_away / (pj_away + BLEND_K)
+
+    att_home_final_raw = w_curr_home * att_home_rel_curr_eb + (1 - w_curr_home) * H['att_home_prior']
+    def_home_final_raw = w_curr_home * def_home_rel_curr_eb + (1 - w_curr_home) * H['def_home_prior']
+    att_away_final_raw = w_curr_away * att_away_rel_curr_eb + (1 - w_curr_away) * A['att_away_prior']
+    def_away_final_raw = w_curr_away * def_away_rel_curr_eb + (1 - w_curr_away) * A['def_away_prior']
+
+    # === 6. GUARDRAILS / CLAMPING ===
+    CLAMP_REL_MIN = config.get('CLAMP_REL_MIN', 0.60)
+    CLAMP_REL_MAX = config.get('CLAMP_REL_MAX', 1.60)
+    att_home_final = np.clip(att_home_final_raw, CLAMP_REL_MIN, CLAMP_REL_MAX)
+    def_home_final = np.clip(def_home_final_raw, CLAMP_REL_MIN, CLAMP_REL_MAX)
+    att_away_final = np.clip(att_away_final_raw, CLAMP_REL_MIN, CLAMP_REL_MAX)
+    def_away_final = np.clip(def_away_final_raw, CLAMP_REL_MIN, CLAMP_REL_MAX)
+
+    # === 7. CALCULATE LAMBDAS ===
+    lambda_home_base = att_home_final * def_away_final * mu_home_final * H['home_factor']
+    lambda_away_base = att_away_final * def_home_final * mu_away_final
+
+    adj = np.ones((n, len(ADJUSTMENT_COLUMNS))) if adjustments is None else np.asarray(adjustments, dtype=float)
+    col = {name: adj[..., i] for i, name in enumerate(ADJUSTMENT_COLUMNS)}
+    lambda_home_final = lambda_home_base * col['home_att_adj'] * col['away_def_adj'] * col['home_form_adj']
+    lambda_away_final = lambda_away_base * col['away_att_adj'] * col['home_def_adj'] * col['away_form_adj']
+
+    if rivalry is not None:
+        rivalry_factor = np.where(np.asarray(rivalry, dtype=bool), config.get('RIVALRY_LAMBDA_FACTOR', 0.88), 1.0)
+        lambda_home_final = lambda_home_final * rivalry_factor
+        lambda_away_final = lambda_away_final * rivalry_factor
+
+    CLAMP_L_MIN = config.get('CLAMP_LAMBDA_MIN', 0.25)
+    CLAMP_L_MAX = config.get('CLAMP_LAMBDA_MAX', 3.20)
+    lambda_home_final = np.clip(lambda_home_final, CLAMP_L_MIN, CLAMP_L_MAX)
+    lambda_away_final = np.clip(lambda_away_final, CLAMP_L_MIN, CLAMP_L_MAX)
+
+    return {
+        'w_curr_home': w_curr_home, 'w_curr_away': w_curr_away,
+        'att_home_rel_curr_eb': att_home_rel_curr_eb, 'def_home_rel_curr_eb': def_home_rel_curr_eb,
+        'att_away_rel_curr_eb': att_away_rel_curr_eb, 'def_away_rel_curr_eb': def_away_rel_curr_eb,
+        'att_home_final': att_home_final, 'def_home_final': def_home_final,
+        'att_away_final': att_away_final, 'def_away_final': def_away_final,
+        'lambda_home_base': lambda_home_base, 'lambda_away_base': lambda_away_base,
+        'lambda_home_final': lambda_home_final, 'lambda_away_final': lambda_away_final,
+    }
+
+
+def compute_components_and_lambdas_batch(home_idx, away_idx, teams, team_stats_current,
+                                         prior_weighted_stats, league_avg_curr_raw, config,
+                                         adjustments=None, rivalry=None, xg_lookup=None,
+                                         team_arrays=None):
+    """
+    Versión columnar de compute_components_and_lambdas para muchos partidos a la vez.
+
+    Args:
+        home_idx, away_idx: Índices (int) a `teams` para local y visitante
+        teams (list): Nombres canónicos
+        adjustments: Matriz (n, 6) en el orden de ADJUSTMENT_COLUMNS, o None (= 1.0)
+        rivalry: Arreglo bool (n,) de clásicos, o None
+        team_arrays: Salida de build_team_component_arrays ya calculada (opcional)
+
+    Returns:
+        DataFrame con una fila por partido y las mismas columnas de auditoría
+        que el dict escalar (xG ausente = NaN en vez de None).
+    """
+    post = rate_posteriors_batch(home_idx, away_idx, teams, team_stats_current, prior_weighted_stats,
+                                 league_avg_curr_raw, config, xg_lookup, team_arrays)
+    rates = posterior_mean_rates(post)
+    lam = lambdas_from_rates(post, rates, config, adjustments, rivalry)
+    H, A, n = post['H'], post['A'], post['n']
+
+    team_names = np.asarray(teams, dtype=object)
+    return pd.DataFrame({
+        'home_team_canonical': team_names[np.asarray(home_idx, dtype=np.intp).ravel()],
+        'away_team_canonical': team_names[np.asarray(away_idx, dtype=np.intp).ravel()],
+        'pj_home_current': post['pj_home'],
+        'pj_away_current': post['pj_away'],
+        'w_curr_home': lam['w_curr_home'],
+        'w_curr_away': lam['w_curr_away'],
+
+        'gf_home_obs': H['GF_home'],
+        'ga_home_obs': H['GC_home'],
+        'gf_away_obs': A['GF_away'],
+        'ga_away_obs': A['GC_away'],
+
+        'xg_blend': np.full(n, post['xg_blend']),
+        'xg_att_home': H['xg_att'],
+        'xg_def_home': H['xg_def'],
+        'xg_att_away': A['xg_att'],
+        'xg_def_away': A['xg_def'],
+        'eff_gf_home': np.round(post['eff_gf_home'], 3),
+        'eff_gc_home': np.round(post['eff_gc_home'], 3),
+        'eff_gf_away': np.round(post['eff_gf_away'], 3),
+        'eff_gc_away': np.round(post['eff_gc_away'], 3),
+
+        'prior_rate_att_home': post['prior_rate_att_home'],
+        'rate_att_home_smooth': rates['att_home'],
+        'prior_rate_def_away': post['prior_rate_def_away'],
+        'rate_def_away_smooth': rates['def_away'],
+
+        'att_home_rel_curr_eb': lam['att_home_rel_curr_eb'],
+        'def_home_rel_curr_eb': lam['def_home_rel_curr_eb'],
+        'att_away_rel_curr_eb': lam['att_away_rel_curr_eb'],
+        'def_away_rel_curr_eb': lam['def_away_rel_curr_eb'],
+
+        'att_home_final': lam['att_home_final'],
+        'def_home_final': lam['def_home_final'],
+        'att_home_rel_blend': lam['att_home_final'],
+        'def_away_rel_blend': lam['def_away_final'],
+        'att_away_rel_blend': lam['att_away_final'],
+        'def_home_rel_blend': lam['def_home_final'],
+
+        'lambda_home_base': lam['lambda_home_base'],
+        'lambda_away_base': lam['lambda_away_base'],
+        'lambda_home_final': lam['lambda_home_final'],
+        'lambda_away_final': lam['lambda_away_final'],
+        'lambda_total_base': lam['lambda_home_base'] + lam['lambda_away_base'],
+        'lambda_total_final': lam['lambda_home_final'] + lam['lambda_away_final'],
+
+        'mu_home_final': np.full(n, post['mu_home_final']),
+        'mu_away_final': np.full(n, post['mu_away_final']),
+    })
+
+
+def encode_matches(matches, teams):
+    """
+    Índices (home_idx, away_idx) y bandera de clásico para una lista de partidos
+    del formato matches_data['matches'], contra la lista canónica `teams`.
+    Equipos no presentes se agregan al final de `teams` (in place).
+    """
+    position = {t: i for i, t in enumerate(teams)}
+    home_idx, away_idx, rivalry = [], [], []
+    for match in matches:
+        for raw, out in ((match['match']['home'], home_idx), (match['match']['away'], away_idx)):
+            canon = canonical_team_name(raw)
+            if canon not in position:
+                position[canon] = len(teams)
+                teams.append(canon)
+            out.append(position[canon])
+        rivalry.append(bool(match.get('match', {}).get('rivalry', False)))
+    return np.array(home_idx, dtype=np.intp), np.array(away_idx, dtype=np.intp), np.array(rivalry, dtype=bool)
+
+
+# ========== ROUND-ROBIN: TODAS LAS COMBINACIONES DEL TORNEO ==========
+
+def round_robin_matrices(team_stats_current, prior_weighted_stats, league_avg_curr_raw, config,
+                         teams=None, team_adjustments=None, form_multipliers=None,
+                         rivalries=None, xg_lookup=None, dc_rho=None):
+    """
+    Matrices N×N (fila = local, columna = visitante) de lambdas, picks y EV
+    para todas las combinaciones del torneo actual en una sola llamada.
+    Sirve para precalcular partidos reprogramados o cambios de calendario.
+
+    Args:
+        teams (list): Nombres canónicos (default: equipos de team_stats_current)
+        team_adjustments (TeamAdjustments | dict): store de ajustes (o adj_map legacy)
+        form_multipliers (dict): {canon: multiplicador de forma}
+        rivalries (iterable): Pares (local, visita) de clásicos, aplican en ambos sentidos
+        dc_rho (float): Default config['DC_RHO']
+
+    Returns:
+        dict con 'teams', matrices 'lambda_home', 'lambda_away', 'pick_exact',
+        'pick_1x2', 'ev', 'ev_confidence_gap', 'prob_home_win', 'prob_draw',
+        'prob_away_win' (diagonal NaN / '') y 'components' (DataFrame de auditoría
+        de los N×(N-1) cruces).
+    """
+    teams = list(team_stats_current) if teams is None else [canonical_team_name(t) for t in teams]
+    n = len(teams)
+    home_idx, away_idx = np.nonzero(~np.eye(n, dtype=bool))
+
+    form_multipliers = form_multipliers or {}
+    per_team = np.column_stack([
+        adj_store.as_store(team_adjustments).factor_matrix(teams).reshape(n, 2),
+        np.array([form_multipliers.get(t, 1.0) for t in teams], dtype=float),
+    ])
+    adjustments = np.column_stack([
+        per_team[home_idx, 0], per_team[home_idx, 1],
+        per_team[away_idx, 0], per_team[away_idx, 1],
+        per_team[home_idx, 2], per_team[away_idx, 2],
+    ])  # orden de ADJUSTMENT_COLUMNS
+
+    rivalry_pairs = {frozenset((canonical_team_name(h), canonical_team_name(a))) for h, a in (rivalries or [])}
+    rivalry = np.array([frozenset((teams[h], teams[a])) in rivalry_pairs
+                        for h, a in zip(home_idx, away_idx)], dtype=bool)
+
+    components = compute_components_and_lambdas_batch(
+        home_idx, away_idx, teams, team_stats_current, prior_weighted_stats,
+        league_avg_curr_raw, config, adjustments=adjustments, rivalry=rivalry,
+        xg_lookup=xg_lookup
+    )
+
+    if dc_rho is None:
+        dc_rho = config.get('DC_RHO', -0.10)
+    picks = qx.optimize_picks_batch(
+        components['lambda_home_final'].to_numpy(), components['lambda_away_final'].to_numpy(), dc_rho
+    )
+
+    def _square(values, fill):
+        out = np.full((n, n), fill, dtype=object if isinstance(fill, str) else float)
+        out[home_idx, away_idx] = values
+        return out
+
+    result = {
+        'teams': teams,
+        'lambda_home': _square(components['lambda_home_final'].to_numpy(), np.nan),
+        'lambda_away': _square(components['lambda_away_final'].to_numpy(), np.nan),
+        'components': components,
+    }
+    for key in ('pick_exact', 'pick_1x2'):
+        result[key] = _square(picks[key], '')
+    for key in ('ev', 'ev_confidence_gap', 'prob_home_win', 'prob_draw', 'prob_away_win'):
+        result[key] = _square(picks[key], np.nan)
+    return result
+
+
+def round_robin_pairing(matrices, home, away):
+    """Extrae un cruce (nombres crudos o canónicos) de la salida de round_robin_matrices."""
+    teams = matrices['teams']
+    h = teams.index(canonical_team_name(home))
+    a = teams.index(canonical_team_name(away))
+    if h == a:
+        raise ValueError(f"Cruce inválido: {home} vs {away}")
+    return {
+        key: (value[h, a].item() if hasattr(value[h, a], 'item') else value[h, a])
+        for key, value in matrices.items() if key not in ('teams', 'components')
+    }
@@ -2,7 +2,151 @@
 import json
 import os
 import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import src.predicciones.adjustments as adjustments
+import src.predicciones.bajas as bajas_feed
+import src.predicciones.qualitative as qualitative
 import src.predicciones.core as dl
+import src.predicciones.utils as utils
+
+# === STATS TIPADAS + SNAPSHOT BINARIO ===
+# Stats_liga_mx.json es un TSV. Se parsea una vez (fechas day-first, equipos
+# categóricos + canónicos, goles int8) y se guarda un snapshot .npy (un solo
+# arreglo estructurado, memory-mappable) llave = hash del archivo fuente.
+
+STATS_SNAPSHOT_DIR = 'data/processed'
+STATS_SNAPSHOT_VERSION = 1
+STATS_SNAPSHOT_MAX_FILES = 3
+_TEAM_COLUMNS = ('home_team', 'away_team')
+
+
+def parse_stats_table(file_path):
+    """
+    Parsea el TSV de stats a un DataFrame tipado:
+    texto → category, 'date' → datetime64 (dayfirst), goles → int8,
+    más home_team_canonical / away_team_canonical (category).
+    """
+    df = pd.read_csv(file_path, sep='\t')
+    typed = {}
+    for col in df.columns:
+        values = df[col]
+        if col == 'date':
+            typed[col] = pd.to_datetime(values, dayfirst=True).astype('datetime64[ns]')
+        elif pd.api.types.is_integer_dtype(values) and len(values) and values.min() >= -128 and values.max() <= 127:
+            typed[col] = values.astype(np.int8)
+        elif pd.api.types.is_numeric_dtype(values):
+            typed[col] = values
+        else:
+            typed[col] = values.astype('category')
+    for col in _TEAM_COLUMNS:
+        if col in df.columns:
+            names = typed[col].cat.categories
+            typed[f'{col}_canonical'] = (
+                typed[col].map({n: dl.canonical_team_name(n) for n in names}).astype(str).astype('category')
+            )
+    return pd.DataFrame(typed)
+
+
+def _snapshot_paths(source_hash, snapshot_dir):
+    base = os.path.join(snapshot_dir, f'stats_snapshot_{source_hash[:16]}')
+    return base + '.npy', base + '.json'
+
+
+def save_stats_snapshot(typed_df, source_hash, snapshot_dir=STATS_SNAPSHOT_DIR):
+    """
+    Guarda typed_df como un arreglo estructurado .npy (códigos de categoría,
+    datetime64, numéricos) + un .json con categorías y dtypes. Escritura atómica;
+    el .json se escribe al final y marca el snapshot como completo.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    npy_path, meta_path = _snapshot_paths(source_hash, snapshot_dir)
+
+    fields, columns, categories = [], {}, {}
+    for col in typed_df.columns:
+        values = typed_df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            fields.append((col, np.int32))
+            columns[col] = values.cat.codes.to_numpy(dtype=np.int32)
+            categories[col] = [str(c) for c in values.cat.categories]
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            fields.append((col, 'M8[ns]'))
+            columns[col] = values.to_numpy(dtype='datetime64[ns]')
+        else:
+            fields.append((col, values.dtype.str))
+            columns[col] = values.to_numpy()
+
+    records = np.empty(len(typed_df), dtype=fields)
+    for col, values in columns.items():
+        records[col] = values
+
+    tmp_npy = f'{npy_path}.tmp.{os.getpid()}.npy'
+    np.save(tmp_npy, records)
+    os.replace(tmp_npy, npy_path)
+
+    meta = {
+        'version': STATS_SNAPSHOT_VERSION,
+        'source_hash': source_hash,
+        'row_count': int(len(typed_df)),
+        'columns': list(typed_df.columns),
+        'categories': categories,
+    }
+    tmp_meta = f'{meta_path}.tmp.{os.getpid()}'
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_meta, meta_path)
+
+    _evict_stats_snapshots(snapshot_dir, STATS_SNAPSHOT_MAX_FILES)
+    return npy_path
+
+
+def load_stats_snapshot(source_hash, snapshot_dir=STATS_SNAPSHOT_DIR):
+    """Reconstruye el DataFrame tipado desde el snapshot (mmap); None si no existe o no coincide."""
+    npy_path, meta_path = _snapshot_paths(source_hash, snapshot_dir)
+    if not (os.path.exists(meta_path) and os.path.exists(npy_path)):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STATS_SNAPSHOT_VERSION or meta.get('source_hash') != source_hash:
+            return None
+        records = np.load(npy_path, mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError, json.JSONDecodeError) as e:
+        print(f"WARNING: snapshot de stats ilegible, se re-parsea: {npy_path} ({e})")
+        return None
+
+    data = {}
+    for col in meta['columns']:
+        if col in meta['categories']:
+            data[col] = pd.Categorical.from_codes(records[col], meta['categories'][col])
+        else:
+            data[col] = np.asarray(records[col])
+    return pd.DataFrame(data)
+
+
+def _evict_stats_snapshots(snapshot_dir, max_files):
+    """Desaloja los pares .json/.npy más viejos (tolera borrados concurrentes de otros workers)."""
+    return utils.evict_oldest_files(snapshot_dir, 'stats_snapshot_', '.json', max_files, companions=('.npy',))
+
+
+def load_stats_table(file_path, snapshot_dir=STATS_SNAPSHOT_DIR):
+    """
+    Punto de entrada único para Stats_liga_mx.json en steps y scripts:
+    usa el snapshot binario si el hash del archivo coincide; si no, parsea y lo guarda.
+    snapshot_dir=None desactiva el snapshot.
+    """
+    if not snapshot_dir:
+        return parse_stats_table(file_path)
+    source_hash = utils.calculate_file_hash(file_path)
+    typed_df = load_stats_snapshot(source_hash, snapshot_dir)
+    if typed_df is None:
+        typed_df = parse_stats_table(file_path)
+        save_stats_snapshot(typed_df, source_hash, snapshot_dir)
+    return typed_df
+
 
 # === CONFIGURACION DE PENALIZACIONES (Shared) ===
 PENALTIES = {
@@ -16,69 +160,180 @@ PENALTIES = {
     'STATUS_DUDA_FACTOR': 0.35, # Factor para reducir impacto si es Duda (0.35 = 35% del impacto aplicado)
 }
 
-KEY_PLAYERS_CACHE = {}
+# === JUGADORES CLAVE (índice con invalidación por archivo) ===
+
+DEFAULT_KEY_PLAYERS_PATH = "data/key_players.json"
+_PLAYER_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=8192)
+def normalize_player_name(name):
+    """'  Efraín Álvarez ' -> 'efrain alvarez' (memo: los mismos nombres se repiten cada semana)."""
+    return dl.remove_accents((name or '').lower().strip())
+
+
+def _player_tokens(name_norm):
+    return tuple(_PLAYER_TOKEN_RE.findall(name_norm))
+
+
+def _tokens_compatible(short, long):
+    """Cada token de `short` aparece en `long` (una inicial 'a' empata con 'armando')."""
+    remaining = list(long)
+    for token in short:
+        match = next((t for t in remaining
+                      if t == token or (len(token) == 1 and t.startswith(token))
+                      or (len(t) == 1 and token.startswith(t))), None)
+        if match is None:
+            return False
+        remaining.remove(match)
+    return True
+
 
-def load_key_players(file_path="data/key_players.json"):
+def _importance_from_info(info):
+    if info['elite'] or info['rank'] <= 40:
+        return 'High'
+    if info['rank'] <= 80:
+        return 'Mid'
+    return None
+
+
+class KeyPlayerIndex:
     """
-    Loads key players and elite traits into a cache for quick lookup.
-    Returns a dict: {(team_canonical, player_name_lower): {'rank': int, 'elite': bool}}
+    Índice de key_players.json: (equipo canónico, jugador normalizado) -> {'rank', 'elite'}.
+    Las llaves se normalizan una vez al construirlo; además guarda un índice de
+    tokens por equipo para empatar variantes del nombre ("Armando González" vs
+    "Armando 'Hormiga' González" o "A. González") sin recorrer la plantilla.
     """
-    global KEY_PLAYERS_CACHE
-    if KEY_PLAYERS_CACHE:
-        return KEY_PLAYERS_CACHE
-        
-    if not os.path.exists(file_path):
-        print(f"WARNING: {file_path} not found. Key player logic disabled.")
-        return {}
 
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        cache = {}
-        # 1. Process Ranked Players
+    def __init__(self, entries=None, file_hash=None):
+        self.entries = entries or {}
+        self.file_hash = file_hash
+        self._importance = {key: _importance_from_info(info) for key, info in self.entries.items()}
+        self._tokens = {}  # {team: {token: [(name_norm, tokens), ...]}}
+        for team, name_norm in self.entries:
+            tokens = _player_tokens(name_norm)
+            by_token = self._tokens.setdefault(team, {})
+            for token in set(tokens):
+                if len(token) > 1:
+                    by_token.setdefault(token, []).append((name_norm, tokens))
+        self._resolved = {}
+
+    @classmethod
+    def from_data(cls, data, file_hash=None):
+        entries = {}
+        # 1. Ranked players
         for p in data.get('players', []):
             tm = dl.canonical_team_name(p.get('team', ''))
-            nm = dl.remove_accents(p.get('name', '').lower().strip())
-            rank = p.get('rank', 999)
+            nm = normalize_player_name(p.get('name', ''))
             if tm and nm:
-                cache[(tm, nm)] = {'rank': rank, 'elite': False}
-                
-        # 2. Process Elite Traits (Force Elite)
-        elite_sections = data.get('elite_traits_players', {})
-        for trait, players in elite_sections.items():
+                entries[(tm, nm)] = {'rank': p.get('rank', 999), 'elite': False}
+
+        # 2. Elite traits (fuerzan elite)
+        for players in data.get('elite_traits_players', {}).values():
             for p in players:
                 tm = dl.canonical_team_name(p.get('team', ''))
-                nm = dl.remove_accents(p.get('name', '').lower().strip())
+                nm = normalize_player_name(p.get('name', ''))
                 if tm and nm:
-                    if (tm, nm) not in cache:
-                        cache[(tm, nm)] = {'rank': 999, 'elite': True}
-                    else:
-                        cache[(tm, nm)]['elite'] = True
-                        
-        KEY_PLAYERS_CACHE = cache
-        return cache
-    except Exception as e:
-        print(f"ERROR loading key players: {e}")
-        return {}
-
-def get_player_importance_level(team, player_name):
+                    entries.setdefault((tm, nm), {'rank': 999, 'elite': False})['elite'] = True
+        return cls(entries, file_hash)
+
+    @classmethod
+    def from_file(cls, file_path=DEFAULT_KEY_PLAYERS_PATH):
+        """Construye el índice; archivo ausente o ilegible → índice vacío (con aviso)."""
+        if not os.path.exists(file_path):
+            print(f"WARNING: {file_path} not found. Key player logic disabled.")
+            return cls(file_hash="FILE_NOT_FOUND")
+        file_hash = utils.calculate_file_hash(file_path)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return cls.from_data(json.load(f), file_hash)
+        except (json.JSONDecodeError, IOError, AttributeError, TypeError) as e:
+            print(f"ERROR loading key players: {e}")
+            return cls(file_hash=file_hash)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def resolve(self, team, player_name):
+        """
+        Llave del índice para (equipo, jugador): exacta, o el único candidato del
+        equipo con tokens compatibles. Ambiguo o sin candidato → None.
+        """
+        memo_key = (team, player_name)
+        if memo_key in self._resolved:
+            return self._resolved[memo_key]
+
+        team_canon = dl.canonical_team_name(team)
+        name_norm = normalize_player_name(player_name)
+        key = (team_canon, name_norm)
+        if key not in self.entries:
+            key = None
+            tokens = _player_tokens(name_norm)
+            by_token = self._tokens.get(team_canon, {})
+            candidates = {cand for token in tokens if len(token) > 1 for cand in by_token.get(token, [])}
+            matches = [name for name, cand_tokens in candidates
+                       if _tokens_compatible(*sorted((tokens, cand_tokens), key=len))]
+            if len(matches) == 1:
+                key = (team_canon, matches[0])
+        self._resolved[memo_key] = key
+        return key
+
+    def lookup(self, team, player_name):
+        key = self.resolve(team, player_name)
+        return self.entries[key] if key else None
+
+    def importance(self, team, player_name):
+        """'High' (elite o top 40), 'Mid' (top 80) o None (sin override)."""
+        key = self.resolve(team, player_name)
+        return self._importance[key] if key else None
+
+
+_KEY_PLAYER_INDEXES = {}  # {abspath: ((size, mtime_ns), KeyPlayerIndex)}
+
+
+def key_player_index(file_path=DEFAULT_KEY_PLAYERS_PATH):
+    """
+    Índice compartido de jugadores clave. Se reconstruye sólo si el archivo cambió
+    (size/mtime distintos Y hash distinto); un archivo ausente o con error también
+    queda en caché hasta que cambie, en vez de reintentarse en cada llamada.
+    """
+    path = os.path.abspath(file_path)
+    try:
+        st = os.stat(path)
+        stat_key = (st.st_size, st.st_mtime_ns)
+    except OSError:
+        stat_key = None
+
+    cached = _KEY_PLAYER_INDEXES.get(path)
+    if cached is not None and cached[0] == stat_key:
+        return cached[1]
+    if cached is not None and stat_key is not None and cached[1].file_hash == utils.calculate_file_hash(path):
+        index = cached[1]  # touch sin cambios de contenido
+    else:
+        index = KeyPlayerIndex.from_file(file_path)
+    _KEY_PLAYER_INDEXES[path] = (stat_key, index)
+    return index
+
+
+def reset_key_player_index():
+    """Olvida los índices cargados (tests / scripts que cambian el archivo)."""
+    _KEY_PLAYER_INDEXES.clear()
+
+
+def load_key_players(file_path=DEFAULT_KEY_PLAYERS_PATH):
+    """
+    Jugadores clave como dict {(team_canonical, player_name_norm): {'rank': int, 'elite': bool}}.
+    """
+    return key_player_index(file_path).entries
+
+
+def get_player_importance_level(team, player_name, key_players=None):
     """
     Determines if a player is 'High', 'Mid', or 'Low' importance based on key_players.json
     """
-    cache = load_key_players()
-    # Normalize player name too (remove accents) to ensure match
-    player_norm = dl.remove_accents(player_name.lower().strip())
-    key = (dl.canonical_team_name(team), player_norm)
-    
-    if key in cache:
-        info = cache[key]
-        if info['elite'] or info['rank'] <= 40:
-            return 'High'
-        elif info['rank'] <= 80:
-            return 'Mid'
-            
-    return None # No override
+    if key_players is None:
+        key_players = key_player_index()
+    return key_players.importance(team, player_name)
 
 
 
@@ -120,164 +375,49 @@ def apply_minutes_gate(baja):
     return impact_orig
 
 def _ensure_team_adjustment(team_adjustments, team):
-    if team not in team_adjustments:
-        team_adjustments[team] = {
-            'att_adj': 1.0,
-            'def_adj': 1.0,
-            'notes': [],
-            'report_log': [],
-            'context_txt': [],
-            'ausencias_txt': [],
-            'ausencias_items': [],
-            'movimientos_txt': []
-        }
+    team_adjustments.add_team(team)
 
 
 # === DATA COLLECTION & DEDUPLICATION ===
 
-def collect_manual_bajas(file_path="data/inputs/evaluacion_bajas.json"):
+def collect_manual_bajas(file_path="data/inputs/evaluacion_bajas.json", key_players=None):
     """
     Collects raw bajas from manual evaluation file.
-    Returns list of dicts.
+    Returns list of dicts (ver bajas.ingest_manual_bajas para la tabla columnar).
     """
-    if not os.path.exists(file_path):
-        return []
-        
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        
-    bajas_list = []
-    for item in data.get('bajas_identificadas', []):
-        team = dl.canonical_team_name(item['team'])
-        if not team: continue
-        
-        # Key Player Override (Early Check)
-        player = item.get('player', 'Unknown')
-        impact = item.get('manual_impact_level', 'Low')
-        auto_imp = get_player_importance_level(team, player)
-        
-        if auto_imp == 'High' and impact != 'High':
-             impact = 'High'
-        elif auto_imp == 'Mid' and impact == 'Low':
-             impact = 'Mid'
-             
-        # Minute Gate: skipped for manual entries (user has explicitly validated these)
-
-        bajas_list.append({
-            'team': team,
-            'player': player,
-            'role': item.get('role', ''),
-            'status': item.get('status', '').title(),
-            'impact_level': impact,
-            'reason': item.get('reason', ''),
-            'confidence': 1.0, # Manual is absolute truth usually
-            'recency_days': 0,
-            'source': 'manual',
-            'raw_data': item
-        })
-    return bajas_list
+    if key_players is None:
+        key_players = key_player_index()
+    return bajas_feed.bajas_records(bajas_feed.ingest_manual_bajas(file_path, key_players, keep_raw=True))
 
-def collect_perplexity_bajas(file_path="data/inputs/perplexity_bajas_semana.json"):
+def collect_perplexity_bajas(file_path="data/inputs/perplexity_bajas_semana.json", key_players=None):
     """
     Collects raw bajas from Perplexity file.
-    Returns list of dicts.
+    Returns list of dicts (ver bajas.ingest_perplexity_bajas para la tabla columnar).
     """
-    if not os.path.exists(file_path):
-        return []
-
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    bajas = data.get('bajas', [])
-    if not isinstance(bajas, list): return []
-    
-    bajas_list = []
-    for item in bajas:
-        team = dl.canonical_team_name(item.get('team', ''))
-        if not team: continue
-        
-        # Filtering Logic
-        is_active = item.get('is_active_for_next_match', None)
-        recency = int(item.get('recency_days', 0))
-        
-        if is_active is False: continue
-        if bool(item.get('is_retired', False)): continue
-        if bool(item.get('is_transferred_out', False)): continue
-        
-        curr_team = dl.canonical_team_name(item.get('current_team', ''))
-        if curr_team and curr_team != team: continue
-        
-        if str(item.get('verification_status', '')).lower() != 'confirmed': continue
-        if recency > 21 and is_active is not True: continue
-        
-        conf = float(item.get('confidence', 0.75))
-        if recency > 14 and is_active is not True: conf = min(conf, 0.55)
-        
-        # Key Player Check
-        player = item.get('player', 'Unknown')
-        impact = item.get('impact_level', 'Low')
-        auto_imp = get_player_importance_level(team, player)
-        if auto_imp == 'High': impact = 'High'
-        elif auto_imp == 'Mid' and impact == 'Low': impact = 'Mid'
-        
-        if impact.lower() in ['low', 'none', 'unknown']:
-             continue
-
-        bajas_list.append({
-            'team': team,
-            'player': player,
-            'role': item.get('role', ''),
-            'status': item.get('status', 'Duda'),
-            'impact_level': impact,
-            'reason': item.get('reason', ''),
-            'confidence': conf,
-            'recency_days': recency,
-            'source': 'perplexity',
-            'raw_data': item
-        })
-    return bajas_list
+    if key_players is None:
+        key_players = key_player_index()
+    return bajas_feed.bajas_records(bajas_feed.ingest_perplexity_bajas(file_path, key_players, keep_raw=True))
 
-def deduplicate_bajas(bajas_list):
+def deduplicate_bajas(bajas_list, with_provenance=False):
     """
     Deduplicates bajas list based on (team, normalized_player).
-    Priority: Impact Level > Confidence > Source(Manual>Perplexity)
+    Priority: Impact Level > Confidence > Source(Manual>Perplexity) > first seen
+    (ver bajas.resolve_duplicates; con with_provenance=True también devuelve
+    la tabla de qué registro ganó cada llave y por qué).
     """
-    unique_map = {}
-    
-    impact_score = {'High': 3, 'Mid': 2, 'Low': 1, 'None': 0}
-    
-    for item in bajas_list:
-        p_norm = dl.remove_accents(item['player'].lower().strip())
-        team = item['team']
-        key = (team, p_norm)
-        
-        if key not in unique_map:
-            unique_map[key] = item
-        else:
-            existing = unique_map[key]
-            
-            # Compare Scores
-            score_new = impact_score.get(item['impact_level'], 0)
-            score_old = impact_score.get(existing['impact_level'], 0)
-            
-            if score_new > score_old:
-                unique_map[key] = item
-                # print(f"  > Dedup: Replaced {existing['player']} ({existing['impact_level']}) with {item['impact_level']} from {item['source']}")
-            elif score_new == score_old:
-                # Tie-break: Confidence
-                if item['confidence'] > existing['confidence']:
-                    unique_map[key] = item
-                elif item['confidence'] == existing['confidence']:
-                     # Tie-break: Manual wins
-                     if item['source'] == 'manual' and existing['source'] != 'manual':
-                         unique_map[key] = item
-    
-    return list(unique_map.values())
+    table = pd.DataFrame(bajas_list, columns=['team', 'player', 'impact_level', 'confidence', 'source'])
+    winners, provenance = bajas_feed.resolve_duplicates(table)
+    deduped = [bajas_list[i] for i in winners]
+    return (deduped, provenance) if with_provenance else deduped
 
-def apply_bajas_list(team_adjustments, bajas_list):
+def apply_bajas_list(team_adjustments, bajas_list, key_players=None):
     """
     Applies the final deduplicated list of bajas to team_adjustments.
+    Returns the TeamAdjustments store (un adj_map dict legacy se convierte).
     """
+    team_adjustments = adjustments.as_store(team_adjustments)
+    if key_players is None:
+        key_players = key_player_index()
     for item in bajas_list:
         _apply_scaled_adjustment(
             team_adjustments=team_adjustments,
@@ -289,7 +429,8 @@ def apply_bajas_list(team_adjustments, bajas_list):
             reason=item['reason'],
             source=item['source'],
             confidence=item['confidence'],
-            recency_days=item['recency_days']
+            recency_days=item['recency_days'],
+            key_players=key_players
         )
     return team_adjustments
 
@@ -298,139 +439,53 @@ def apply_bajas_list(team_adjustments, bajas_list):
 def load_bajas_penalties(file_path="data/inputs/evaluacion_bajas.json"):
     # Now just a wrapper for the new flow if called in isolation (not recommended)
     raw = collect_manual_bajas(file_path)
-    adj = {}
-    apply_bajas_list(adj, raw)
-    return adj
+    return apply_bajas_list(adjustments.TeamAdjustments(), raw)
 
 def load_qualitative_adjustments(team_adjustments, qualitative_path="data/inputs/Investigacion_cualitativa_jornada6.json"):
     """
-    Loads qualitative context and transfers.
-    Updates the team_adjustments dictionary in place.
+    Loads qualitative context and transfers into the TeamAdjustments store.
+    (El texto lo tokeniza qualitative.parse_qualitative; aquí sólo se aplican las entradas.)
     """
+    team_adjustments = adjustments.as_store(team_adjustments)
     if not os.path.exists(qualitative_path):
         print(f"WARNING: {qualitative_path} not found. Skipping qualitative adjustments.")
         return team_adjustments
-        
-    with open(qualitative_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        
-    lines = content.splitlines()
-    current_section = None
-    current_team = None
-    current_context_type = None
-    
-    # Initialize keys if missing
-    for team in team_adjustments:
-        if 'movimientos_txt' not in team_adjustments[team]: team_adjustments[team]['movimientos_txt'] = []
-        if 'context_txt' not in team_adjustments[team]: team_adjustments[team]['context_txt'] = []
-        if 'report_log' not in team_adjustments[team]: team_adjustments[team]['report_log'] = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line: continue
-        
-        if "TRANSFERENCIAS" in line: current_section = 'transfers'; continue
-        if "CONTEXTO" in line: current_section = 'context'; continue
-        if "AUSENCIAS" in line: current_section = 'skip'; continue
-        if "NOTAS" in line: current_section = 'skip'; continue
-        
-        if current_section == 'transfers':
-            if "Equipo:" in line:
-                tm_match = re.search(r"Equipo:\s*(.*?)\s*\|", line)
-                ply_match = re.search(r"Jugador:\s*(.*?)\s*\|", line)
-                if tm_match:
-                    tm_name = dl.canonical_team_name(tm_match.group(1))
-                    ply_name = ply_match.group(1) if ply_match else "Player"
-                    
-                    if tm_name not in team_adjustments:
-                        team_adjustments[tm_name] = {
-                            'att_adj': 1.0, 
-                            'def_adj': 1.0, 
-                            'notes': [], 
-                            'report_log': [],
-                            'ausencias_txt': [], 
-                            'movimientos_txt': [], 
-                            'context_txt': []
-                        }
-                    
-                    # Ensure keys exist (if created above they do, if existed from bajas they might not have these specific lists)
-                    if 'movimientos_txt' not in team_adjustments[tm_name]: team_adjustments[tm_name]['movimientos_txt'] = []
-                    
-                    # Apply Transfer Boost
-                    team_adjustments[tm_name]['att_adj'] *= 1.02
-                    team_adjustments[tm_name]['notes'].append(f"TRANSFER BOOST (+2%): {ply_name}")
-                    team_adjustments[tm_name]['movimientos_txt'].append(f"- 🟢 **ALTA ({tm_name.title()}):** {ply_name}")
-                    team_adjustments[tm_name]['report_log'].append({
-                        'desc': f"BOOST Lambda Propio (Fichaje): {ply_name}", 
-                        'pct': 2.0, 
-                        'type': 'HOME'
-                    })
-
-        elif current_section == 'context':
-            if line.startswith("Tipo:"):
-                current_context_type = line.replace("Tipo:", "").strip()
-            elif line.startswith("Afecta a:"):
-                affects_line = line.replace("Afecta a:", "").strip()
-                segments = [s.strip() for s in affects_line.split('/')]
-                
-                for segment in segments:
-                    # Strict Regex for Team Matching
-                    # We iterate over known aliases to find EXACT word matches
-                    # e.g. "San Luis" should not match "Luis" if "Luis" was an alias (it's not but illustrative)
-                    # We use word boundaries \b
-                    
-                    found_team = None
-                    # Sort candidates by length desc to match "Atletico San Luis" before "San Luis"
-                    candidates = sorted(['pumas', 'america', 'chivas', 'guadalajara', 'cruz azul', 'toluca', 'tigres', 'monterrey', 'pachuca', 'leon', 'santos', 'mazatlan', 'puebla', 'juarez', 'tijuana', 'necaxa', 'san luis', 'queretaro', 'atlas'], key=len, reverse=True)
-                    
-                    for t_code in candidates:
-                         # Regex: \b(pumas)\b case insensitive
-                         pattern = r'\b' + re.escape(t_code) + r'\b'
-                         if re.search(pattern, segment, re.IGNORECASE):
-                             found_team = dl.canonical_team_name(t_code)
-                             break # Stop at first longest match
-                    
-                    if found_team:
-                         tm_name = found_team
-                         if tm_name not in team_adjustments:
-                             # Ensure structure exists
-                             _ensure_team_adjustment(team_adjustments, tm_name)
-
-                         if 'context_txt' not in team_adjustments[tm_name]: team_adjustments[tm_name]['context_txt'] = []
-                         if 'report_log' not in team_adjustments[tm_name]: team_adjustments[tm_name]['report_log'] = []
-
-                         current_team = tm_name 
-
-                         subtype_match = re.search(r"\(([^)]+)\)", segment)
-                         team_subtype = subtype_match.group(1) if subtype_match else (current_context_type or "")
-                             
-                         if "momentum" in team_subtype.lower() and "crisis" not in team_subtype.lower():
-                             team_adjustments[tm_name]['att_adj'] *= 1.05
-                             team_adjustments[tm_name]['notes'].append(f"CONTEXT MOMENTUM (+5%): {team_subtype}")
-                             team_adjustments[tm_name]['report_log'].append({'desc': f"Contexto: {team_subtype}", 'pct': 5.0, 'type': 'HOME'})
-                         elif "crisis" in team_subtype.lower() or ("extrema" in team_subtype.lower() and "crisis" in current_context_type.lower()):
-                             team_adjustments[tm_name]['att_adj'] *= 0.95
-                             team_adjustments[tm_name]['def_adj'] *= 1.05
-                             team_adjustments[tm_name]['notes'].append(f"CONTEXT CRISIS (-5% Att, -5% Def): {team_subtype}")
-                             team_adjustments[tm_name]['report_log'].append({'desc': f"Contexto: {team_subtype}", 'pct': -5.0, 'type': 'HOME'})
-                             # elif "winning_streak" in team_subtype.lower():
-                             #     team_adjustments[tm_name]['att_adj'] *= 1.03
-                             #     team_adjustments[tm_name]['notes'].append(f"CONTEXT WINNING STREAK (+3%): {team_subtype}")
-                             #     team_adjustments[tm_name]['report_log'].append({'desc': f"Contexto: Buena Forma (5 ganados)", 'pct': 3.0, 'type': 'HOME'})
-                             
-                             current_team = tm_name
-
-            elif line.startswith("Evidencia:") and current_team:
-                evidence = line.replace("Evidencia:", "").strip()
-                if 'context_txt' not in team_adjustments[current_team]: team_adjustments[current_team]['context_txt'] = []
-                team_adjustments[current_team]['context_txt'].append(f"- ℹ️ **CONTEXTO:** {evidence}")
+
+    for entry in qualitative.parse_qualitative_file(qualitative_path):
+        tm_name = entry['team']
+        _ensure_team_adjustment(team_adjustments, tm_name)
+
+        if entry['kind'] == 'transfer':
+            ply_name = entry['player']
+            # Apply Transfer Boost
+            team_adjustments.record(
+                tm_name, 'qualitative', att_adj=1.02,
+                notes=f"TRANSFER BOOST (+2%): {ply_name}",
+                movimientos_txt=f"- 🟢 **ALTA ({tm_name.title()}):** {ply_name}",
+                report_log={'desc': f"BOOST Lambda Propio (Fichaje): {ply_name}", 'pct': 2.0, 'type': 'HOME'})
+
+        elif entry['kind'] == 'context':
+            team_subtype = entry['subtype']
+            if entry['effect'] == 'momentum':
+                team_adjustments.record(
+                    tm_name, 'qualitative', att_adj=1.05,
+                    notes=f"CONTEXT MOMENTUM (+5%): {team_subtype}",
+                    report_log={'desc': f"Contexto: {team_subtype}", 'pct': 5.0, 'type': 'HOME'})
+            elif entry['effect'] == 'crisis':
+                team_adjustments.record(
+                    tm_name, 'qualitative', att_adj=0.95, def_adj=1.05,
+                    notes=f"CONTEXT CRISIS (-5% Att, -5% Def): {team_subtype}",
+                    report_log={'desc': f"Contexto: {team_subtype}", 'pct': -5.0, 'type': 'HOME'})
+
+        elif entry['kind'] == 'evidence':
+            team_adjustments.record(tm_name, 'qualitative', context_txt=f"- ℹ️ **CONTEXTO:** {entry['text']}")
 
     return team_adjustments
 
 
 
 def _apply_scaled_adjustment(team_adjustments, team_name, player, role, impact_level, status, reason,
-                             source='perplexity', confidence=0.75, recency_days=0):
+                             source='perplexity', confidence=0.75, recency_days=0, key_players=None):
     """
     Aplica ajuste de bajas con factor de confianza y recencia.
 
@@ -445,7 +500,7 @@ def _apply_scaled_adjustment(team_adjustments, team_name, player, role, impact_l
 
     if (impact_level or '').lower() in ['low', 'none', 'unknown', 'desconocido']:
         # Check for Key Player Override even if source says Low/Unknown
-        auto_imp = get_player_importance_level(team_name, player)
+        auto_imp = get_player_importance_level(team_name, player, key_players)
         if auto_imp == 'High':
              print(f"⚡ UPGRADE (Perplexity): {player} is ELITE. Force High Impact.")
              impact_level = 'High'
@@ -508,38 +563,32 @@ def _apply_scaled_adjustment(team_adjustments, team_name, player, role, impact_l
         pct_log = (penalty_att - 1.0) * 100
         affects = 'HOME'
 
-    curr = team_adjustments[team_name]
-    curr['att_adj'] *= penalty_att
-    curr['def_adj'] *= penalty_def
-
     icon = "🚑" if "fuera" in status_l or "out" in status_l else "⚠️"
-    curr['ausencias_txt'].append(
-        f"{icon} **{player}** ({role or 'N/A'}): {status or 'N/A'} - *{reason or 'Sin detalle'}* "
-        f"[Impacto: {impact_level}, Confianza:{confidence:.2f}, Recencia:{recency_days}d]"
-    )
-    
-    # Add Structured Item
-    curr['ausencias_items'].append({
-        'player': player,
-        'role': role_norm,
-        'status': status,
-        'reason': reason,
-        'impact_level': impact_level,
-        'confidence': confidence,
-        'recency_days': recency_days,
-        'source': source
-    })
-
-    curr['notes'].append(
-        f"{source.upper()} | {player} ({role}) impact={impact_level} conf={confidence:.2f} recency={recency_days}d"
+    team_adjustments.record(
+        team_name, source, att_adj=penalty_att, def_adj=penalty_def,
+        ausencias_txt=(
+            f"{icon} **{player}** ({role or 'N/A'}): {status or 'N/A'} - *{reason or 'Sin detalle'}* "
+            f"[Impacto: {impact_level}, Confianza:{confidence:.2f}, Recencia:{recency_days}d]"
+        ),
+        # Structured Item
+        ausencias_items={
+            'player': player,
+            'role': role_norm,
+            'status': status,
+            'reason': reason,
+            'impact_level': impact_level,
+            'confidence': confidence,
+            'recency_days': recency_days,
+            'source': source
+        },
+        notes=f"{source.upper()} | {player} ({role}) impact={impact_level} conf={confidence:.2f} recency={recency_days}d",
+        report_log={
+            'desc': f"{desc_log}: {player} ({status})",
+            'pct': pct_log,
+            'type': affects
+        },
     )
 
-    curr['report_log'].append({
-        'desc': f"{desc_log}: {player} ({status})",
-        'pct': pct_log,
-        'type': affects
-    })
-
 
 
 
@@ -608,16 +657,12 @@ def collect_context_adjustments(file_path):
 
 def apply_context_adjustments(team_adjustments, context_list):
     """
-    Applies structured context adjustments to team_adjustments dict.
+    Applies structured context adjustments to the TeamAdjustments store.
     Works on top of existing bajas adjustments — multiplicative.
     """
+    team_adjustments = adjustments.as_store(team_adjustments)
     for item in context_list:
         team = item['team']
-        _ensure_team_adjustment(team_adjustments, team)
-
-        team_adjustments[team]['att_adj'] *= item['att_adj']
-        team_adjustments[team]['def_adj'] *= item['def_adj']
-
         pct_att = (item['att_adj'] - 1.0) * 100
         pct_def = (item['def_adj'] - 1.0) * 100
         note = (
@@ -626,12 +671,21 @@ def apply_context_adjustments(team_adjustments, context_list):
             + (f" Def{pct_def:+.1f}%" if abs(pct_def) > 0.1 else "")
             + f": {item['note'][:80]}"
         )
-        team_adjustments[team]['notes'].append(note)
-        team_adjustments[team]['report_log'].append({
-            'desc': f"Contexto ({item['type']}): {item['note'][:60]}",
-            'pct': pct_att,
-            'type': 'HOME'
-        })
+        team_adjustments.record(
+            team, 'context', att_adj=item['att_adj'], def_adj=item['def_adj'],
+            context_items={
+                'type': item['type'],
+                'att_adj': item['att_adj'],
+                'def_adj': item['def_adj'],
+                'confidence': item['confidence'],
+            },
+            notes=note,
+            report_log={
+                'desc': f"Contexto ({item['type']}): {item['note'][:60]}",
+                'pct': pct_att,
+                'type': 'HOME'
+            },
+        )
 
     return team_adjustments
 
@@ -644,5 +698,4 @@ def load_perplexity_weekly_bajas(team_adjustments, file_path="data/inputs/perple
     raw = collect_perplexity_bajas(file_path)
     # We can't easily dedup against already applied adjustments without parsing them back.
     # So we simply apply.
-    apply_bajas_list(team_adjustments, raw)
-    return team_adjustments
+    return apply_bajas_list(team_adjustments, raw)
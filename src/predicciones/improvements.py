@@ -1,49 +1,92 @@
+import json
+import os
+from collections import defaultdict, deque
+
 import pandas as pd
 import numpy as np
 import src.predicciones.config as config
 import src.predicciones.core as dl
+import src.predicciones.utils as utils
 
 
-def _get_team_matches(stats_df, team_name, match_date, n):
-    """Helper: returns last N matches for a team before match_date, sorted recent-first."""
-    df = stats_df.copy()
-    if not pd.api.types.is_datetime64_any_dtype(df['date']):
-        df['date'] = pd.to_datetime(df['date'], dayfirst=True)
-    if 'home_canon' not in df.columns:
-        df['home_canon'] = df['home_team'].apply(dl.canonical_team_name)
-    if 'away_canon' not in df.columns:
-        df['away_canon'] = df['away_team'].apply(dl.canonical_team_name)
-    match_date = pd.to_datetime(match_date)
-    return df[
-        ((df['home_canon'] == team_name) | (df['away_canon'] == team_name)) &
-        (df['date'] < match_date)
-    ].sort_values('date', ascending=False).head(n)
-
-
-def _match_points(row, team_name):
-    """Returns 3/1/0 points for a team in a given match row."""
-    is_home = (row['home_canon'] == team_name)
-    gf = row['home_goals'] if is_home else row['away_goals']
-    ga = row['away_goals'] if is_home else row['home_goals']
-    return 3 if gf > ga else (1 if gf == ga else 0)
-
-def calculate_momentum_direction(stats_df, team_name, match_date, n=5,
-                                 threshold=0.20, bonus_max=0.02):
+class TeamTimelineIndex:
     """
-    Detecta si el equipo está acelerando o desacelerando comparando
-    el ritmo de puntos de los últimos 2 partidos vs los 3 anteriores (de los últimos 5).
-
-    Returns: (direction_multiplier, info_dict)
-      direction_multiplier ≈ 1.0 ± bonus_max
+    Índice por equipo (canónico) con su historial ordenado por fecha:
+    arreglos de (date, is_home, gf, ga, points). Se construye una vez por
+    corrida; "últimos N antes de la fecha" es un searchsorted + slice.
     """
-    team_matches = _get_team_matches(stats_df, team_name, match_date, n)
 
-    if len(team_matches) < n:
-        return 1.0, {"status": "insufficient_data", "games": len(team_matches)}
+    def __init__(self, stats_df):
+        dates = stats_df['date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, dayfirst=True)
+        dates = dates.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        valid = dates != np.iinfo(np.int64).min  # NaT nunca cumple date < match_date
+
+        # Canonicalizar solo los nombres únicos (memoizado en core)
+        home_canon = stats_df['home_team'].map({t: dl.canonical_team_name(t) for t in stats_df['home_team'].unique()})
+        away_canon = stats_df['away_team'].map({t: dl.canonical_team_name(t) for t in stats_df['away_team'].unique()})
+        home_goals = stats_df['home_goals'].to_numpy()
+        away_goals = stats_df['away_goals'].to_numpy()
+
+        # Vista "por equipo": cada partido aparece dos veces (local y visitante)
+        team = np.concatenate([home_canon.to_numpy(dtype=object), away_canon.to_numpy(dtype=object)])
+        is_home = np.concatenate([np.ones(len(stats_df), dtype=bool), np.zeros(len(stats_df), dtype=bool)])
+        gf = np.concatenate([home_goals, away_goals])
+        ga = np.concatenate([away_goals, home_goals])
+        date = np.concatenate([dates, dates])
+        row = np.concatenate([np.arange(len(stats_df)), np.arange(len(stats_df))])
+        keep = np.concatenate([valid, valid])
+
+        team, is_home, gf, ga, date, row = team[keep], is_home[keep], gf[keep], ga[keep], date[keep], row[keep]
+        points = np.where(gf > ga, 3, np.where(gf == ga, 1, 0))
+
+        # Empates de fecha: la fila posterior de stats_df cuenta como más reciente
+        codes, names = pd.factorize(team)
+        order = np.lexsort((row, date, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+
+        self._timelines = {}
+        for i, name in enumerate(names):
+            idx = order[bounds[i]:bounds[i + 1]]
+            timeline = {
+                'date': date[idx], 'is_home': is_home[idx],
+                'gf': gf[idx], 'ga': ga[idx], 'points': points[idx],
+            }
+            home_mask = timeline['is_home']
+            home_timeline = {k: v[home_mask] for k, v in timeline.items()}
+            self._timelines[name] = (timeline, home_timeline)
+
+    @property
+    def teams(self):
+        return list(self._timelines)
 
-    rows = list(team_matches.iterrows())
-    recent_pts = sum(_match_points(row, team_name) for _, row in rows[:2])
-    prior_pts  = sum(_match_points(row, team_name) for _, row in rows[2:5])
+    def last_n(self, team_name, match_date, n, home_only=False):
+        """Últimos n partidos de team_name antes de match_date, del más reciente al más viejo."""
+        entry = self._timelines.get(team_name)
+        if entry is None:
+            return {k: np.empty(0, dtype=np.int64) for k in ('date', 'is_home', 'gf', 'ga', 'points')}
+        timeline = entry[1] if home_only else entry[0]
+        cutoff = pd.to_datetime(match_date).value
+        pos = int(np.searchsorted(timeline['date'], cutoff, side='left'))
+        start = max(0, pos - n)
+        return {k: v[start:pos][::-1] for k, v in timeline.items()}
+
+
+def _as_timeline(stats_or_index):
+    """Acepta un TeamTimelineIndex ya construido o un stats_df crudo (compatibilidad)."""
+    if isinstance(stats_or_index, TeamTimelineIndex):
+        return stats_or_index
+    return TeamTimelineIndex(stats_or_index)
+
+
+def _momentum_from_points(points, n=5, threshold=0.20, bonus_max=0.02):
+    """Kernel de momentum sobre los puntos de los últimos n partidos (más reciente primero)."""
+    if len(points) < n:
+        return 1.0, {"status": "insufficient_data", "games": len(points)}
+
+    recent_pts = int(points[:2].sum())
+    prior_pts  = int(points[2:5].sum())
 
     recent_pct = recent_pts / 6.0   # max 6 pts en 2 partidos
     prior_pct  = prior_pts  / 9.0   # max 9 pts en 3 partidos
@@ -66,36 +109,30 @@ def calculate_momentum_direction(stats_df, team_name, match_date, n=5,
     }
 
 
-def calculate_home_crisis_factor(stats_df, team_name, match_date, n_home=4,
-                                  crisis_threshold=1, crisis_penalty=0.92,
-                                  stronghold_bonus=1.04):
+def calculate_momentum_direction(stats_df, team_name, match_date, n=5,
+                                 threshold=0.20, bonus_max=0.02):
     """
-    Detecta si el equipo LOCAL está en crisis o en racha como local.
-    Revisa los últimos n_home partidos jugados DE LOCAL antes de match_date.
+    Detecta si el equipo está acelerando o desacelerando comparando
+    el ritmo de puntos de los últimos 2 partidos vs los 3 anteriores (de los últimos 5).
 
-    Crisis     : ≤ crisis_threshold victorias locales → multiplier = crisis_penalty  (default -8%)
-    Stronghold : ≥ (n_home - 1) victorias locales     → multiplier = stronghold_bonus (default +4%)
-    Normal     : multiplier = 1.0
+    stats_df puede ser un TeamTimelineIndex precalculado (recomendado en loops).
 
-    Returns: (multiplier, info_dict)
+    Returns: (direction_multiplier, info_dict)
+      direction_multiplier ≈ 1.0 ± bonus_max
     """
-    df = stats_df.copy()
-    if not pd.api.types.is_datetime64_any_dtype(df['date']):
-        df['date'] = pd.to_datetime(df['date'], dayfirst=True)
-    if 'home_canon' not in df.columns:
-        df['home_canon'] = df['home_team'].apply(dl.canonical_team_name)
-
-    match_date = pd.to_datetime(match_date)
-    home_matches = df[
-        (df['home_canon'] == team_name) &
-        (df['date'] < match_date)
-    ].sort_values('date', ascending=False).head(n_home)
-
-    if len(home_matches) < 3:
-        return 1.0, {"status": "insufficient_data", "home_games": len(home_matches)}
-
-    home_wins = int((home_matches['home_goals'] > home_matches['away_goals']).sum())
-    total = len(home_matches)
+    points = _as_timeline(stats_df).last_n(team_name, match_date, n)['points']
+    return _momentum_from_points(points, n, threshold, bonus_max)
+
+
+def _home_crisis_from_matches(home_matches, crisis_threshold=1, crisis_penalty=0.92,
+                              stronghold_bonus=1.04):
+    """Kernel de crisis/fortaleza local sobre los últimos partidos DE LOCAL (gf/ga)."""
+    total = len(home_matches['points'])
+
+    if total < 3:
+        return 1.0, {"status": "insufficient_data", "home_games": total}
+
+    home_wins = int((home_matches['gf'] > home_matches['ga']).sum())
     win_rate = home_wins / total
 
     if home_wins <= crisis_threshold:
@@ -118,77 +155,32 @@ def calculate_home_crisis_factor(stats_df, team_name, match_date, n_home=4,
     }
 
 
-def calculate_recent_form(stats_df, team_name, match_date, n=5):
+def calculate_home_crisis_factor(stats_df, team_name, match_date, n_home=4,
+                                  crisis_threshold=1, crisis_penalty=0.92,
+                                  stronghold_bonus=1.04):
     """
-    Calculates a form multiplier based on the last N games.
+    Detecta si el equipo LOCAL está en crisis o en racha como local.
+    Revisa los últimos n_home partidos jugados DE LOCAL antes de match_date.
+
+    Crisis     : ≤ crisis_threshold victorias locales → multiplier = crisis_penalty  (default -8%)
+    Stronghold : ≥ (n_home - 1) victorias locales     → multiplier = stronghold_bonus (default +4%)
+    Normal     : multiplier = 1.0
+
+    stats_df puede ser un TeamTimelineIndex precalculado (recomendado en loops).
+
+    Returns: (multiplier, info_dict)
     """
-    # Ensure date column is datetime
-    if not pd.api.types.is_datetime64_any_dtype(stats_df['date']):
-        stats_df['date'] = pd.to_datetime(stats_df['date'], dayfirst=True)
-        
-    match_date = pd.to_datetime(match_date)
-    
-    # Filter for team matches before the specific date
-    # We need to check both home_team and away_team columns
-    # And we need to use canonical names for comparison if possible, 
-    # but stats_df might have raw names. 
-    # Ideally stats_df should have been pre-processed, but we can do a quick apply here 
-    # or just assume the caller handles it. 
-    # Given the pipeline structure, stats_df is raw from CSV.
-    
-    # Efficiency: create a mask. 
-    # We will normalize the team name we are looking for.
-    # And we will normalize the dataframe columns on the fly or assuming they are somewhat cleaner.
-    # 'Stats_liga_mx.json' usually has specific names.
-    
-    # Let's try to filter using the string containment or exact match if we know the mapping.
-    # better to use dl.canonical_team_name on the df if it's small enough, or just iterate.
-    # Stats file is small (~600 rows).
-    
-    # Create a copy to avoid SettingWithCopy warning on the main df if we modify it
-    df = stats_df.copy()
-    
-    # Normalize team names in df for accurate matching
-    # unique_teams = pd.concat([df['home_team'], df['away_team']]).unique()
-    # mapping = {t: dl.canonical_team_name(t) for t in unique_teams}
-    # df['home_canon'] = df['home_team'].map(mapping)
-    # df['away_canon'] = df['away_team'].map(mapping)
-    
-    # Fast filtering
-    # We assume 'team_name' passed in is already canonical.
-    
-    # To avoid mapping everything, apply canonicalization in lambda (slower but safe)
-    # or just rely on the fact that we can search for the name.
-    
-    # Let's do it robustly.
-    # df['home_canon'] = df['home_team'].apply(dl.canonical_team_name) # OPTIMIZACION: Ya viene de afuera
-    # df['away_canon'] = df['away_team'].apply(dl.canonical_team_name) # OPTIMIZACION: Ya viene de afuera
-    
-    if 'home_canon' not in df.columns:
-         df['home_canon'] = df['home_team'].apply(dl.canonical_team_name)
-    if 'away_canon' not in df.columns:
-         df['away_canon'] = df['away_team'].apply(dl.canonical_team_name)
-    
-    team_matches = df[
-        ((df['home_canon'] == team_name) | (df['away_canon'] == team_name)) & 
-        (df['date'] < match_date)
-    ].sort_values('date', ascending=False).head(n)
-    
-    if len(team_matches) < 3:
-        return 1.0, {"status": "insufficient_data", "games": len(team_matches), "pct": 0.5} # Neutral 0.5 pct
-        
-    points = 0
-    max_points = len(team_matches) * 3
-    
-    for _, row in team_matches.iterrows():
-        is_home = (row['home_canon'] == team_name)
-        gf = row['home_goals'] if is_home else row['away_goals']
-        ga = row['away_goals'] if is_home else row['home_goals']
+    home_matches = _as_timeline(stats_df).last_n(team_name, match_date, n_home, home_only=True)
+    return _home_crisis_from_matches(home_matches, crisis_threshold, crisis_penalty, stronghold_bonus)
+
+
+def _form_from_points(team_points):
+    """Kernel de forma reciente sobre los puntos de los últimos N partidos."""
+    if len(team_points) < 3:
+        return 1.0, {"status": "insufficient_data", "games": len(team_points), "pct": 0.5} # Neutral 0.5 pct
         
-        if gf > ga:
-            points += 3
-        elif gf == ga:
-            points += 1
+    points = int(team_points.sum())
+    max_points = len(team_points) * 3
             
     pct_points = points / max_points if max_points > 0 else 0
     
@@ -211,9 +203,228 @@ def calculate_recent_form(stats_df, team_name, match_date, n=5):
         
     return multiplier, {
         "status": "calculated",
-        "games": len(team_matches),
+        "games": len(team_points),
         "points": points,
         "max_points": max_points,
         "pct": pct_points,
         "multiplier": multiplier
     }
+
+
+def calculate_recent_form(stats_df, team_name, match_date, n=5):
+    """
+    Calculates a form multiplier based on the last N games.
+    stats_df may be a prebuilt TeamTimelineIndex (preferred inside match loops).
+    """
+    # Historial del equipo vía índice por equipo (searchsorted + slice, sin copiar stats_df)
+    team_points = _as_timeline(stats_df).last_n(team_name, match_date, n)['points']
+    return _form_from_points(team_points)
+
+
+# ========== EXTRACTOR FUSIONADO (forma + momentum + crisis local) ==========
+
+def extract_team_features(stats_df, queries, config=None):
+    """
+    Forma reciente, momentum y crisis local para un lote de consultas
+    (team_canon, kickoff) con una sola ventana por equipo-fecha.
+
+    Args:
+        stats_df: TeamTimelineIndex (o stats_df crudo)
+        queries: Iterable de (team_canon, kickoff)
+        config (dict): RECENT_FORM_GAMES, MOMENTUM_THRESHOLD, MOMENTUM_BONUS_MAX,
+                       N_HOME_FORM, HOME_CRISIS_WINS_THRESHOLD (mismos defaults que los mains)
+
+    Returns:
+        dict {(team_canon, kickoff): record} con form_multiplier/form_info,
+        momentum_multiplier/momentum_info y home_crisis_multiplier/home_crisis_info.
+    """
+    config = config or {}
+    timeline = _as_timeline(stats_df)
+    n_form = config.get('RECENT_FORM_GAMES', 5)
+    n_momentum = 5
+    n_home = config.get('N_HOME_FORM', 4)
+    threshold = config.get('MOMENTUM_THRESHOLD', 0.20)
+    bonus_max = config.get('MOMENTUM_BONUS_MAX', 0.02)
+    crisis_threshold = config.get('HOME_CRISIS_WINS_THRESHOLD', 1)
+
+    features = {}
+    for team_name, kickoff in queries:
+        key = (team_name, kickoff)
+        if key in features:
+            continue
+        # Una sola ventana (la más larga) sirve para forma y momentum
+        window = timeline.last_n(team_name, kickoff, max(n_form, n_momentum))['points']
+        home_matches = timeline.last_n(team_name, kickoff, n_home, home_only=True)
+
+        form_mult, form_info = _form_from_points(window[:n_form])
+        momentum_mult, momentum_info = _momentum_from_points(window[:n_momentum], n_momentum, threshold, bonus_max)
+        crisis_mult, crisis_info = _home_crisis_from_matches(home_matches, crisis_threshold)
+
+        features[key] = {
+            'team': team_name,
+            'kickoff': kickoff,
+            'form_multiplier': form_mult,
+            'form_info': form_info,
+            'momentum_multiplier': momentum_mult,
+            'momentum_info': momentum_info,
+            'home_crisis_multiplier': crisis_mult,
+            'home_crisis_info': crisis_info,
+        }
+    return features
+
+
+# ========== FEATURE STORE POINT-IN-TIME (backtesting) ==========
+
+FEATURE_STORE_VERSION = 1
+
+# La forma point-in-time depende del orden temporal: la fecha entra en la llave
+FEATURE_STORE_HASH_COLUMNS = ['date', 'tournament', 'home_team', 'away_team', 'home_goals', 'away_goals']
+
+
+def _feature_params(config):
+    config = config or {}
+    return {
+        'RECENT_FORM_GAMES': config.get('RECENT_FORM_GAMES', 5),
+        'N_HOME_FORM': config.get('N_HOME_FORM', 4),
+        'MOMENTUM_THRESHOLD': config.get('MOMENTUM_THRESHOLD', 0.20),
+        'MOMENTUM_BONUS_MAX': config.get('MOMENTUM_BONUS_MAX', 0.02),
+        'HOME_CRISIS_WINS_THRESHOLD': config.get('HOME_CRISIS_WINS_THRESHOLD', 1),
+    }
+
+
+def build_point_in_time_features(stats_df, config=None):
+    """
+    Forma / momentum / crisis local de cada partido histórico tal como se
+    conocían ANTES de su fecha, en una sola pasada cronológica O(partidos)
+    con ventanas móviles (deques) por equipo.
+
+    Partidos del mismo día no se ven entre sí (mismo corte date < kickoff
+    que extract_team_features).
+
+    Returns:
+        DataFrame en orden cronológico, una fila por partido ('row' = índice en stats_df).
+    """
+    params = _feature_params(config)
+    n_form = params['RECENT_FORM_GAMES']
+    n_momentum = 5
+    n_home = params['N_HOME_FORM']
+
+    dates = stats_df['date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, dayfirst=True)
+    dates = dates.to_numpy(dtype='datetime64[ns]')
+    home_canon = stats_df['home_team'].map({t: dl.canonical_team_name(t) for t in stats_df['home_team'].unique()}).to_numpy()
+    away_canon = stats_df['away_team'].map({t: dl.canonical_team_name(t) for t in stats_df['away_team'].unique()}).to_numpy()
+    home_goals = stats_df['home_goals'].to_numpy()
+    away_goals = stats_df['away_goals'].to_numpy()
+    tournaments = stats_df['tournament'].to_numpy() if 'tournament' in stats_df.columns else np.full(len(stats_df), '')
+
+    valid = ~np.isnat(dates)
+    order = np.flatnonzero(valid)[np.argsort(dates[valid], kind='stable')]
+
+    recent_points = defaultdict(lambda: deque(maxlen=max(n_form, n_momentum)))
+    home_results = defaultdict(lambda: deque(maxlen=n_home))
+    pending = []
+    current_date = None
+
+    records = []
+    for i in order:
+        if dates[i] != current_date:
+            # Resultados del día anterior pasan a las ventanas
+            for team_h, team_a, gh, ga in pending:
+                recent_points[team_h].append(3 if gh > ga else (1 if gh == ga else 0))
+                recent_points[team_a].append(3 if ga > gh else (1 if gh == ga else 0))
+                home_results[team_h].append((gh, ga))
+            pending = []
+            current_date = dates[i]
+
+        h, a = home_canon[i], away_canon[i]
+        record = {
+            'row': stats_df.index[i],
+            'date': dates[i],
+            'tournament': tournaments[i],
+            'home_team_canonical': h,
+            'away_team_canonical': a,
+        }
+        for side, team in (('home', h), ('away', a)):
+            window = np.array(recent_points[team], dtype=np.int64)[::-1]  # más reciente primero
+            form_mult, form_info = _form_from_points(window[:n_form])
+            momentum_mult, momentum_info = _momentum_from_points(
+                window[:n_momentum], n_momentum,
+                params['MOMENTUM_THRESHOLD'], params['MOMENTUM_BONUS_MAX'],
+            )
+            record[f'{side}_form_mult'] = form_mult
+            record[f'{side}_form_pct'] = form_info['pct']
+            record[f'{side}_form_games'] = form_info['games']
+            record[f'{side}_momentum_mult'] = momentum_mult
+            record[f'{side}_momentum_direction'] = momentum_info.get('direction', np.nan)
+
+        home_hist = np.array(home_results[h], dtype=np.int64).reshape(-1, 2)[::-1]
+        crisis_mult, crisis_info = _home_crisis_from_matches(
+            {'points': np.where(home_hist[:, 0] > home_hist[:, 1], 3, np.where(home_hist[:, 0] == home_hist[:, 1], 1, 0)),
+             'gf': home_hist[:, 0], 'ga': home_hist[:, 1]},
+            params['HOME_CRISIS_WINS_THRESHOLD'],
+        )
+        record['home_crisis_mult'] = crisis_mult
+        record['home_crisis_label'] = crisis_info.get('label', 'insufficient_data')
+        record['home_crisis_wins'] = crisis_info.get('home_wins', -1)
+
+        # Mismo combinado que gen_predicciones
+        record['combined_home_form'] = record['home_form_mult'] * record['home_momentum_mult'] * crisis_mult
+        record['combined_away_form'] = record['away_form_mult'] * record['away_momentum_mult']
+
+        records.append(record)
+        pending.append((h, a, home_goals[i], away_goals[i]))
+
+    return pd.DataFrame.from_records(records)
+
+
+def save_feature_store(features_df, path, stats_df, config=None):
+    """
+    Persiste el feature store en formato columnar (.npz, un arreglo por columna)
+    con escritura atómica. Guarda hash de datos y parámetros para invalidación.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    meta = {
+        'version': FEATURE_STORE_VERSION,
+        'data_hash': utils.calculate_data_hash(stats_df, FEATURE_STORE_HASH_COLUMNS),
+        'params': _feature_params(config),
+        'columns': list(features_df.columns),
+    }
+    arrays = {}
+    for col in features_df.columns:
+        values = features_df[col].to_numpy()
+        arrays[col] = values.astype(str) if values.dtype == object else values
+
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, __meta__=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_feature_store(path, stats_df, config=None):
+    """Carga el feature store si existe y coincide con los datos/parámetros actuales; si no, None."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['__meta__']))
+            if (meta.get('version') != FEATURE_STORE_VERSION or
+                    meta.get('data_hash') != utils.calculate_data_hash(stats_df, FEATURE_STORE_HASH_COLUMNS) or
+                    meta.get('params') != _feature_params(config)):
+                return None
+            return pd.DataFrame({col: data[col] for col in meta['columns']})
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Feature store ilegible, se reconstruirá: {path} ({e})")
+        return None
+
+
+def point_in_time_feature_store(stats_df, config=None, path=None):
+    """Carga el feature store persistido o lo reconstruye (una pasada) y lo guarda."""
+    path = path or (config or {}).get('FEATURE_STORE_PATH', 'data/processed/feature_store.npz')
+    features_df = load_feature_store(path, stats_df, config)
+    if features_df is None:
+        features_df = build_point_in_time_features(stats_df, config)
+        save_feature_store(features_df, path, stats_df, config)
+    return features_df
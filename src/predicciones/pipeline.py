@@ -0,0 +1,130 @@
+"""
+Contexto compartido del pipeline (modo in-process).
+
+Los tres steps (predicciones, reporte técnico, diagnóstico) leen los mismos
+inputs y construyen las mismas stats / prior / promedios de liga. PipelineContext
+los carga UNA vez (perezosamente) y cada step los toma de ahí; corriendo un step
+suelto (subprocess / `python app/steps/...`) se crea un contexto propio.
+"""
+import json
+from functools import cached_property
+
+import src.predicciones.adjustments as adjustments
+import src.predicciones.config as config
+import src.predicciones.core as dl
+import src.predicciones.data as data_loader
+import src.predicciones.improvements as improvements
+import src.predicciones.quiniela as qx
+
+
+class PipelineContext:
+    """Inputs y artefactos derivados de una jornada, calculados una sola vez."""
+
+    def __init__(self, runtime_config=None, jornada=None, stats_df=None):
+        self.config = runtime_config if runtime_config is not None else config.resolve_config(jornada)
+        if stats_df is not None:
+            # Tabla ya parseada (p.ej. snapshot mapeado por un worker multi-jornada)
+            self.__dict__['stats_df'] = stats_df
+
+    # --- Inputs ---
+
+    @cached_property
+    def matches_data(self):
+        with open(self.config['INPUT_MATCHES'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @cached_property
+    def stats_df(self):
+        return data_loader.load_stats_table(self.config['INPUT_STATS'], self.config.get('STATS_SNAPSHOT_DIR'))
+
+    # --- Stats / prior / liga ---
+
+    @cached_property
+    def _team_stats(self):
+        return dl.build_team_stats_canonical(self.stats_df, self.config['CURRENT_TOURNAMENT'])
+
+    @property
+    def team_stats_current(self):
+        return self._team_stats[0]
+
+    @property
+    def fusion_log_current(self):
+        return self._team_stats[1]
+
+    @cached_property
+    def prior_weighted_stats(self):
+        return dl.build_weighted_prior_stats(self.stats_df, self.config)
+
+    @cached_property
+    def league_avg_curr(self):
+        return dl.calculate_league_averages_by_tournament(self.stats_df, self.config['CURRENT_TOURNAMENT'])
+
+    @cached_property
+    def current_table(self):
+        return dl.calculate_current_table(self.stats_df, self.config['CURRENT_TOURNAMENT'])
+
+    # --- Ajustes cualitativos (bajas + cualitativo + contexto) ---
+
+    @cached_property
+    def _base_adjustment_map(self):
+        cfg = self.config
+        key_players = data_loader.key_player_index(cfg.get('INPUT_KEY_PLAYERS', 'data/key_players.json'))
+        raw_manual = data_loader.collect_manual_bajas(cfg['INPUT_EVALUATION'], key_players)
+        raw_perplexity = data_loader.collect_perplexity_bajas(
+            cfg.get('INPUT_PERPLEXITY_BAJAS', 'data/inputs/perplexity_bajas_semana.json'), key_players)
+        all_bajas = raw_manual + raw_perplexity
+        deduped_bajas = data_loader.deduplicate_bajas(all_bajas)
+        print(f"  > Raw Manual: {len(raw_manual)} | Raw Perplexity: {len(raw_perplexity)}")
+        print(f"  > Deduplicated Total: {len(deduped_bajas)} (Removed {len(all_bajas) - len(deduped_bajas)} duplicates)")
+
+        adj_map = data_loader.apply_bajas_list(adjustments.TeamAdjustments(), deduped_bajas, key_players)
+        # Qualitative Context (legacy free-text parser, kept for backwards compat)
+        adj_map = data_loader.load_qualitative_adjustments(adj_map, cfg['INPUT_QUALITATIVE'])
+
+        # Structured Context Adjustments (fatigue, rotation, suspension, motivation...)
+        context_list = data_loader.collect_context_adjustments(cfg.get('INPUT_CONTEXT', ''))
+        if context_list:
+            print(f"  > Context adjustments loaded: {len(context_list)} entries")
+            adj_map = data_loader.apply_context_adjustments(adj_map, context_list)
+        else:
+            print("  > No context adjustments file for this jornada (optional)")
+        return adj_map
+
+    def adjustment_map(self):
+        """Copia fresca del store de ajustes: cada step le agrega notas / regresiones propias."""
+        return self._base_adjustment_map.copy()
+
+    # --- Features / lambdas / picks ---
+
+    @cached_property
+    def team_features(self):
+        """Forma / momentum / crisis local de todos los equipos de la jornada."""
+        queries = [
+            (dl.canonical_team_name(m['match'][side]), m['match']['kickoff_datetime'])
+            for m in self.matches_data['matches'] for side in ('home', 'away')
+        ]
+        return improvements.extract_team_features(
+            improvements.TeamTimelineIndex(self.stats_df), queries, self.config)
+
+    @cached_property
+    def base_components(self):
+        """Componentes y lambdas SIN ajustes de toda la jornada (DataFrame, orden de matches)."""
+        teams = list(self.team_stats_current)
+        home_idx, away_idx, rivalry = dl.encode_matches(self.matches_data['matches'], teams)
+        return dl.compute_components_and_lambdas_batch(
+            home_idx, away_idx, teams, self.team_stats_current, self.prior_weighted_stats,
+            self.league_avg_curr, self.config, adjustments=None, rivalry=rivalry)
+
+    @cached_property
+    def pick_cache(self):
+        return qx.PickCache.load(
+            self.config.get('PICK_CACHE_PATH'),
+            maxsize=self.config.get('PICK_CACHE_MAXSIZE', 4096),
+            resolution=self.config.get('PICK_CACHE_RESOLUTION', 1e-4),
+        )
+
+    def save_pick_cache(self):
+        """Persiste el cache de picks y regresa sus estadísticas."""
+        if self.config.get('PICK_CACHE_PATH'):
+            self.pick_cache.save(self.config['PICK_CACHE_PATH'])
+        return self.pick_cache.stats()
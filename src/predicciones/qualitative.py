@@ -0,0 +1,131 @@
+"""
+Parser compilado de los archivos de texto libre Investigacion_cualitativa_jornadaN.json.
+
+Una sola pasada por líneas con una máquina de estados (sección actual:
+TRANSFERENCIAS / CONTEXTO / AUSENCIAS / NOTAS) y regex compiladas una vez
+al importar el módulo. Los equipos de "Afecta a:" se buscan con UNA
+alternación sobre los códigos de equipo (más largo primero), no con una
+regex por candidato. Costo lineal en el tamaño del texto.
+
+parse_qualitative() devuelve una lista estructurada de entradas; el efecto
+sobre el adj_map lo aplica data.load_qualitative_adjustments.
+"""
+import os
+import re
+
+import src.predicciones.core as dl
+
+# Encabezados de sección (substring en mayúsculas; si hay varios en la línea gana el primero de la tupla)
+SECTIONS = (('TRANSFERENCIAS', 'transfers'), ('CONTEXTO', 'context'),
+            ('AUSENCIAS', 'skip'), ('NOTAS', 'skip'))
+_SECTION_RE = re.compile('|'.join(word for word, _ in SECTIONS))
+_SECTION_RANK = {word: (rank, state) for rank, (word, state) in enumerate(SECTIONS)}
+
+_TRANSFER_TEAM_RE = re.compile(r"Equipo:\s*(.*?)\s*\|")
+_TRANSFER_PLAYER_RE = re.compile(r"Jugador:\s*(.*?)\s*\|")
+_CONTEXT_FIELD_RE = re.compile(r"(Tipo|Afecta a|Evidencia):")
+_SUBTYPE_RE = re.compile(r"\(([^)]+)\)")
+
+# Códigos de equipo del parser legacy. Más largo primero;
+# a igual largo, orden de la lista. Coincidencia por palabra completa, sin distinguir
+# mayúsculas, sobre el texto tal cual (sin normalizar acentos, como antes).
+TEAM_CODES = ['pumas', 'america', 'chivas', 'guadalajara', 'cruz azul', 'toluca', 'tigres', 'monterrey',
+              'pachuca', 'leon', 'santos', 'mazatlan', 'puebla', 'juarez', 'tijuana', 'necaxa', 'san luis',
+              'queretaro', 'atlas']
+_TEAM_CODES_SORTED = sorted(TEAM_CODES, key=len, reverse=True)
+_CODE_RANK = {code: rank for rank, code in enumerate(_TEAM_CODES_SORTED)}
+_TEAM_CODE_RE = re.compile(r'\b(?:' + '|'.join(map(re.escape, _TEAM_CODES_SORTED)) + r')\b', re.IGNORECASE)
+
+
+def match_team(text):
+    """Equipo canónico del código más largo presente en `text` (palabra completa, sin distinguir mayúsculas)."""
+    found = [m.group(0).lower() for m in _TEAM_CODE_RE.finditer(text)]
+    if not found:
+        return None
+    return dl.canonical_team_name(min(found, key=_CODE_RANK.__getitem__))
+
+
+def context_effect(subtype, context_type):
+    """'momentum' / 'crisis' / None según el subtipo del equipo y el Tipo del bloque."""
+    subtype_l = subtype.lower()
+    if "momentum" in subtype_l and "crisis" not in subtype_l:
+        return 'momentum'
+    if "crisis" in subtype_l or ("extrema" in subtype_l and "crisis" in (context_type or '').lower()):
+        return 'crisis'
+    return None
+
+
+def _section_of(line):
+    words = _SECTION_RE.findall(line)
+    if not words:
+        return None
+    return min(_SECTION_RANK[w] for w in words)[1]
+
+
+def parse_qualitative(text):
+    """
+    Tokeniza el texto cualitativo en entradas estructuradas, en orden:
+
+        {'kind': 'transfer', 'team', 'player'}
+        {'kind': 'context', 'team', 'subtype', 'context_type', 'effect'}
+        {'kind': 'evidence', 'team', 'text'}   # team = último equipo de "Afecta a:"
+    """
+    entries = []
+    section = None
+    context_type = None
+    current_team = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        state = _section_of(line)
+        if state is not None:
+            section = state
+            continue
+
+        if section == 'transfers':
+            team_match = _TRANSFER_TEAM_RE.search(line)
+            if team_match:
+                player_match = _TRANSFER_PLAYER_RE.search(line)
+                entries.append({
+                    'kind': 'transfer',
+                    'team': dl.canonical_team_name(team_match.group(1)),
+                    'player': player_match.group(1) if player_match else "Player",
+                })
+
+        elif section == 'context':
+            field = _CONTEXT_FIELD_RE.match(line)
+            if not field:
+                continue
+            value = line[field.end():].strip()
+            if field.group(1) == 'Tipo':
+                context_type = value
+            elif field.group(1) == 'Afecta a':
+                for segment in value.split('/'):
+                    segment = segment.strip()
+                    team = match_team(segment)
+                    if team is None:
+                        continue
+                    current_team = team
+                    subtype_match = _SUBTYPE_RE.search(segment)
+                    subtype = subtype_match.group(1) if subtype_match else (context_type or "")
+                    entries.append({
+                        'kind': 'context',
+                        'team': team,
+                        'subtype': subtype,
+                        'context_type': context_type,
+                        'effect': context_effect(subtype, context_type),
+                    })
+            elif current_team:
+                entries.append({'kind': 'evidence', 'team': current_team, 'text': value})
+
+    return entries
+
+
+def parse_qualitative_file(file_path):
+    """parse_qualitative del archivo; [] si no existe."""
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return parse_qualitative(f.read())
@@ -1,5 +1,13 @@
+import json
+import os
+from collections import OrderedDict
+from functools import lru_cache
 from math import exp, factorial
 
+import numpy as np
+
+from . import utils
+
 
 def poisson_prob(lambda_val, k):
     return (lambda_val**k * exp(-lambda_val)) / factorial(k)
@@ -25,21 +33,120 @@ def dc_correction(h, a, lh, la, rho):
     return 1.0
 
 
-def _captured_mass(lambda_home, lambda_away, max_goals):
-    """Masa capturada por la grilla 0..max_goals para ambos equipos."""
-    mass_home = sum(poisson_prob(lambda_home, k) for k in range(max_goals + 1))
-    mass_away = sum(poisson_prob(lambda_away, k) for k in range(max_goals + 1))
-    return mass_home * mass_away
+def grid_limit_with_pmfs(lambda_home, lambda_away, target_mass=0.995, min_goals=5, max_cap=12):
+    """
+    Tamaño de grilla adaptativo + PMFs de ambos equipos en una sola pasada.
+
+    Extiende las CDF de Poisson un término por paso con la recurrencia
+    p(k+1) = p(k)·λ/(k+1) y se detiene en cuanto la masa capturada
+    CDF_home(g)·CDF_away(g) alcanza target_mass (g >= min_goals).
+
+    Returns: (max_goals, pmf_home, pmf_away) con PMFs 0..max_goals como np.ndarray,
+    listas para pasarse directo a scoreline_grid.
+    """
+    p_home, p_away = exp(-lambda_home), exp(-lambda_away)
+    pmf_home, pmf_away = [p_home], [p_away]
+    cdf_home, cdf_away = p_home, p_away
+    for k in range(1, max_cap + 1):
+        p_home = p_home * lambda_home / k
+        p_away = p_away * lambda_away / k
+        pmf_home.append(p_home)
+        pmf_away.append(p_away)
+        cdf_home += p_home
+        cdf_away += p_away
+        if k >= min_goals and cdf_home * cdf_away >= target_mass:
+            break
+    return len(pmf_home) - 1, np.array(pmf_home), np.array(pmf_away)
 
 
 def choose_grid_limit(lambda_home, lambda_away, target_mass=0.995, min_goals=5, max_cap=12):
     """
     Selecciona tamaño de grilla adaptativo para minimizar truncamiento.
     """
-    for g in range(min_goals, max_cap + 1):
-        if _captured_mass(lambda_home, lambda_away, g) >= target_mass:
-            return g
-    return max_cap
+    return grid_limit_with_pmfs(lambda_home, lambda_away, target_mass, min_goals, max_cap)[0]
+
+
+# ========== MOTOR MATRICIAL (NumPy) ==========
+
+_GOALS = np.arange(64)
+
+
+def poisson_pmf_vector(lambda_val, max_goals):
+    """PMF de Poisson para k = 0..max_goals como vector NumPy (recurrencia p(k+1) = p(k)·λ/(k+1))."""
+    p = exp(-lambda_val)
+    pmf = [p]
+    for k in range(1, max_goals + 1):
+        p = p * lambda_val / k
+        pmf.append(p)
+    return np.array(pmf)
+
+
+def apply_dc_correction(grid, lambda_home, lambda_away, rho):
+    """
+    Aplica la corrección Dixon-Coles in-place sobre el bloque 2x2 de marcadores bajos.
+    Equivalente a multiplicar cada celda por dc_correction(h, a, ...).
+    """
+    grid[:2, :2] *= np.array([
+        [1.0 - lambda_home * lambda_away * rho, 1.0 + lambda_home * rho],
+        [1.0 + lambda_away * rho, 1.0 - rho],
+    ])
+    return grid
+
+
+OUTCOME_LABELS = ('1', 'X', '2')
+_OUTCOME_CODES = np.arange(3)
+
+
+@lru_cache(maxsize=None)
+def _grid_layout(max_goals):
+    """
+    Índices y etiquetas por celda en orden h-mayor (mismo orden que el loop original).
+    Returns: (outcome_idx, h_list, a_list, outcome_list, scores) con outcome_idx 0='1', 1='X', 2='2'.
+    """
+    h_idx, a_idx = np.divmod(np.arange((max_goals + 1) ** 2), max_goals + 1)
+    outcome_idx = np.where(h_idx > a_idx, 0, np.where(h_idx == a_idx, 1, 2))
+    outcome_idx.setflags(write=False)
+    h_list, a_list = h_idx.tolist(), a_idx.tolist()
+    outcome_list = [OUTCOME_LABELS[o] for o in outcome_idx.tolist()]
+    scores = [f"{h}-{a}" for h, a in zip(h_list, a_list)]
+    return outcome_idx, h_list, a_list, outcome_list, scores
+
+
+@lru_cache(maxsize=None)
+def _outcome_cells(max_goals):
+    """Índices de celda (orden h-mayor) de cada escenario '1', 'X', '2'."""
+    outcome_idx = _grid_layout(max_goals)[0]
+    return tuple(np.flatnonzero(outcome_idx == o) for o in _OUTCOME_CODES)
+
+
+def scoreline_grid(lambda_home, lambda_away, dc_rho, max_goals, pmf_home=None, pmf_away=None):
+    """
+    Grilla (max_goals+1)x(max_goals+1) de probabilidades conjuntas sin normalizar:
+    producto externo de las PMF de Poisson con corrección Dixon-Coles.
+    """
+    if pmf_home is None:
+        pmf_home = poisson_pmf_vector(lambda_home, max_goals)
+    if pmf_away is None:
+        pmf_away = poisson_pmf_vector(lambda_away, max_goals)
+    grid = np.outer(pmf_home, pmf_away)
+    return apply_dc_correction(grid, lambda_home, lambda_away, dc_rho)
+
+
+def _scoreline_items(indices, probs_flat, ev_flat, raw_flat, max_goals):
+    """Materializa como dicts (schema histórico) solo las celdas solicitadas."""
+    _, h_list, a_list, outcome_list, scores = _grid_layout(max_goals)
+    return [
+        {
+            'h': h_list[i], 'a': a_list[i],
+            'score': scores[i],
+            'prob_raw': raw,
+            'outcome': outcome_list[i],
+            'prob': prob,
+            'ev': ev,
+        }
+        for i, raw, prob, ev in zip(indices.tolist(), raw_flat[indices].tolist(),
+                                    probs_flat[indices].tolist(), ev_flat[indices].tolist())
+    ]
 
 
 def optimize_pick_for_quiniela(lambda_home, lambda_away, dc_rho=-0.10):
@@ -52,106 +159,305 @@ def optimize_pick_for_quiniela(lambda_home, lambda_away, dc_rho=-0.10):
     3. Calcula el EV de cada escenario: EV = P(Exacto) + P(Resultado).
     4. Elige el escenario con mayor EV.
 
+    La grilla se arma como producto externo de las PMF (NumPy) y todas las
+    reducciones (masa 1/X/2, argmax por escenario, top 5) son operaciones de arreglo.
+
     dc_rho: parámetro Dixon-Coles (negativo = mayor probabilidad de empates).
     """
-    max_goals = choose_grid_limit(lambda_home, lambda_away)
-
-    # 1. Calcular Probabilidades Raw (con corrección Dixon-Coles)
-    probs_all = []
-    sum_raw = 0.0
-
-    raw_p1, raw_px, raw_p2 = 0.0, 0.0, 0.0
-
-    for h in range(max_goals + 1):
-        for a in range(max_goals + 1):
-            p = poisson_prob(lambda_home, h) * poisson_prob(lambda_away, a)
-            p *= dc_correction(h, a, lambda_home, lambda_away, dc_rho)
-            
-            outcome = 'X'
-            if h > a: outcome = '1'
-            elif a > h: outcome = '2'
-            
-            probs_all.append({
-                'h': h, 'a': a, 
-                'score': f"{h}-{a}", 
-                'prob_raw': p,
-                'outcome': outcome
-            })
-            sum_raw += p
-            
-            if outcome == '1': raw_p1 += p
-            elif outcome == 'X': raw_px += p
-            elif outcome == '2': raw_p2 += p
+    # Tamaño de grilla + PMFs en una sola pasada (no se recalculan para la grilla)
+    max_goals, pmf_home, pmf_away = grid_limit_with_pmfs(lambda_home, lambda_away)
+
+    # 1. Grilla Raw (con corrección Dixon-Coles)
+    grid = scoreline_grid(lambda_home, lambda_away, dc_rho, max_goals, pmf_home, pmf_away)
+    raw_flat = grid.ravel()
 
     # 2. Normalizar
-    captured_mass = sum_raw
+    captured_mass = float(raw_flat.sum())
     if captured_mass <= 0: return {} # Error case
-    
-    prob_1 = raw_p1 / captured_mass
-    prob_x = raw_px / captured_mass
-    prob_2 = raw_p2 / captured_mass
-    
-    # Normalizar scores individualmente
-    for item in probs_all:
-        item['prob'] = item['prob_raw'] / captured_mass
-    
-    # 3. Encontrar el mejor exacto por grupo
-    # Filtrar y ordenar
-    scores_1 = sorted([x for x in probs_all if x['outcome'] == '1'], key=lambda x: x['prob'], reverse=True)
-    scores_x = sorted([x for x in probs_all if x['outcome'] == 'X'], key=lambda x: x['prob'], reverse=True)
-    scores_2 = sorted([x for x in probs_all if x['outcome'] == '2'], key=lambda x: x['prob'], reverse=True)
-    
-    best_1 = scores_1[0] if scores_1 else None
-    best_x = scores_x[0] if scores_x else None
-    best_2 = scores_2[0] if scores_2 else None
-    
-    # 4. Calcular EV por Candidato
-    candidates = []
-    
-    if best_1:
-        ev_1 = best_1['prob'] + prob_1
-        candidates.append({'pick_1x2': '1', 'pick_exact': best_1['score'], 'ev': ev_1})
-        
-    if best_x:
-        ev_x = best_x['prob'] + prob_x
-        candidates.append({'pick_1x2': 'X', 'pick_exact': best_x['score'], 'ev': ev_x})
-        
-    if best_2:
-        ev_2 = best_2['prob'] + prob_2
-        candidates.append({'pick_1x2': '2', 'pick_exact': best_2['score'], 'ev': ev_2})
-        
-    # Ordenar candidatos por EV
-    candidates = sorted(candidates, key=lambda x: x['ev'], reverse=True)
-    winner = candidates[0]
-    
-    # Calcular gap con el segundo mejor (de distinta outcome si es posible, o raw)
-    # Gap confidence usuallly vs 2nd absolute best option in the global table
-    # But here we want gap between the chosen strategy and the next best strategy
-    ev_confidence_gap = 0.0
-    if len(candidates) > 1:
-        ev_confidence_gap = winner['ev'] - candidates[1]['ev']
-        
-    # Recalcular lista global para Top 5 Display
-    # Calculamos EV "naive" para todos para mostrar en tabla
-    for item in probs_all:
-        if item['outcome'] == '1': p_res = prob_1
-        elif item['outcome'] == 'X': p_res = prob_x
-        else: p_res = prob_2
-        item['ev'] = item['prob'] + p_res
-        
-    top_5_prob = sorted(probs_all, key=lambda x: x['prob'], reverse=True)[:5]
-    top_5_ev_naive = sorted(probs_all, key=lambda x: x['ev'], reverse=True)[:5]
+
+    outcome_idx, _, _, _, scores = _grid_layout(max_goals)
+    probs_flat = raw_flat / captured_mass
+    outcome_probs = np.bincount(outcome_idx, weights=probs_flat, minlength=3)
+    prob_1, prob_x, prob_2 = outcome_probs.tolist()
+
+    # 3. Mejor exacto por escenario: primera celda de cada resultado en el orden
+    #    por probabilidad (argsort estable = mismo desempate que el sort original)
+    order_prob = np.argsort(-probs_flat, kind='stable')
+    first_pos = np.argmax(outcome_idx[order_prob][:, None] == _OUTCOME_CODES, axis=0)
+    best_idx = order_prob[first_pos].tolist()
+
+    # 4. EV por candidato, ordenado de forma estable (1 > X > 2 en empate)
+    evs = (probs_flat[best_idx] + outcome_probs).tolist()
+    order = sorted(range(3), key=lambda o: evs[o], reverse=True)
+    winner = order[0]
+
+    # Gap entre la estrategia elegida y la siguiente mejor
+    ev_confidence_gap = evs[winner] - evs[order[1]]
+
+    # Top 5 global: EV "naive" = P(exacto) + P(resultado) por celda
+    ev_flat = probs_flat + outcome_probs[outcome_idx]
+    top_prob_idx = order_prob[:5]
+    top_ev_idx = np.argsort(-ev_flat, kind='stable')[:5]
 
     return {
-        'pick_exact': winner['pick_exact'],
-        'pick_1x2': winner['pick_1x2'],
-        'ev': winner['ev'],
+        'pick_exact': scores[best_idx[winner]],
+        'pick_1x2': OUTCOME_LABELS[winner],
+        'ev': evs[winner],
         'ev_confidence_gap': ev_confidence_gap,
         'prob_home_win': prob_1,
         'prob_draw': prob_x,
         'prob_away_win': prob_2,
-        'top_5_by_prob': top_5_prob,
-        'top_5_by_ev': top_5_ev_naive,
+        'top_5_by_prob': _scoreline_items(top_prob_idx, probs_flat, ev_flat, raw_flat, max_goals),
+        'top_5_by_ev': _scoreline_items(top_ev_idx, probs_flat, ev_flat, raw_flat, max_goals),
         'grid_max_goals': max_goals,
         'captured_mass': captured_mass,
     }
+
+
+# ========== OPTIMIZADOR BATCH (N partidos en una sola grilla 3-D) ==========
+
+BATCH_CHUNK_SIZE = 2048  # partidos por bloque; bloques chicos caben en caché (~3x más rápido que 16k)
+
+
+def poisson_pmf_matrix(lambdas, max_goals):
+    """PMF de Poisson k = 0..max_goals para un arreglo de lambdas → shape (N, max_goals+1)."""
+    lambdas = np.asarray(lambdas, dtype=float)
+    pmf = np.empty((lambdas.shape[0], max_goals + 1))
+    pmf[:, 0] = np.exp(-lambdas)
+    for k in range(1, max_goals + 1):
+        pmf[:, k] = pmf[:, k - 1] * lambdas / k
+    return pmf
+
+
+def choose_grid_limits(lambda_home, lambda_away, target_mass=0.995, min_goals=5, max_cap=12):
+    """
+    Versión vectorizada de choose_grid_limit: tamaño de grilla por partido.
+    """
+    cdf_home = np.cumsum(poisson_pmf_matrix(lambda_home, max_cap), axis=1)
+    cdf_away = np.cumsum(poisson_pmf_matrix(lambda_away, max_cap), axis=1)
+    reached = (cdf_home * cdf_away)[:, min_goals:] >= target_mass
+    return np.where(reached.any(axis=1), min_goals + reached.argmax(axis=1), max_cap)
+
+
+def _optimize_picks_chunk(lambda_home, lambda_away, dc_rho):
+    """Optimiza un bloque de partidos (arreglos 1-D) sobre una grilla 3-D con padding."""
+    n_matches = lambda_home.shape[0]
+    limits = choose_grid_limits(lambda_home, lambda_away)
+    max_goals = int(limits.max())
+    n = max_goals + 1
+
+    # PMFs con ceros más allá de la grilla propia de cada partido (padding)
+    inside = _GOALS[:n] <= limits[:, None]
+    pmf_home = np.where(inside, poisson_pmf_matrix(lambda_home, max_goals), 0.0)
+    pmf_away = np.where(inside, poisson_pmf_matrix(lambda_away, max_goals), 0.0)
+
+    grid = pmf_home[:, :, None] * pmf_away[:, None, :]
+    grid[:, 0, 0] *= 1.0 - lambda_home * lambda_away * dc_rho
+    grid[:, 1, 0] *= 1.0 + lambda_away * dc_rho
+    grid[:, 0, 1] *= 1.0 + lambda_home * dc_rho
+    grid[:, 1, 1] *= 1.0 - dc_rho
+
+    raw = grid.reshape(n_matches, n * n)
+    captured_mass = raw.sum(axis=1)
+    probs = raw / captured_mass[:, None]
+
+    outcome_idx, _, _, _, scores = _grid_layout(max_goals)
+    outcome_onehot = outcome_idx[:, None] == _OUTCOME_CODES      # (celdas, 3)
+    outcome_probs = probs @ outcome_onehot                        # (N, 3)
+
+    # Mejor exacto por escenario: argmax sobre las celdas del escenario (en orden
+    # h-mayor) devuelve la primera celda máxima, igual que el loop original
+    best_idx = np.empty((n_matches, 3), dtype=np.intp)           # (N, 3)
+    for o, cells in enumerate(_outcome_cells(max_goals)):
+        best_idx[:, o] = cells[probs[:, cells].argmax(axis=1)]
+    evs = np.take_along_axis(probs, best_idx, axis=1) + outcome_probs
+
+    # argmax = primer máximo → mismo desempate 1 > X > 2 que el sort estable
+    winner = evs.argmax(axis=1)
+    evs_sorted = np.sort(evs, axis=1)
+    rows = np.arange(n_matches)
+
+    return {
+        'pick_exact': np.asarray(scores, dtype=object)[best_idx[rows, winner]],
+        'pick_1x2': np.asarray(OUTCOME_LABELS, dtype=object)[winner],
+        'ev': evs[rows, winner],
+        'ev_confidence_gap': evs_sorted[:, 2] - evs_sorted[:, 1],
+        'prob_home_win': outcome_probs[:, 0],
+        'prob_draw': outcome_probs[:, 1],
+        'prob_away_win': outcome_probs[:, 2],
+        'grid_max_goals': limits,
+        'captured_mass': captured_mass,
+    }
+
+
+def optimize_picks_batch(lambda_home, lambda_away, dc_rho=-0.10, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Optimiza el pick de quiniela para N partidos en una sola llamada.
+
+    Acepta arreglos (o escalares) broadcasteables de lambda_home, lambda_away y dc_rho,
+    p.ej. (9 partidos × 500 draws Monte Carlo). Cada partido conserva su propia grilla
+    adaptativa (choose_grid_limit); el bloque se evalúa en una grilla 3-D con padding.
+
+    Returns: dict columnar con las mismas llaves escalares de optimize_pick_for_quiniela
+    (sin las tablas top 5), cada una como arreglo con el shape del broadcast.
+    """
+    lambda_home, lambda_away, dc_rho = np.broadcast_arrays(
+        np.asarray(lambda_home, dtype=float),
+        np.asarray(lambda_away, dtype=float),
+        np.asarray(dc_rho, dtype=float),
+    )
+    shape = lambda_home.shape
+    lambda_home, lambda_away, dc_rho = lambda_home.ravel(), lambda_away.ravel(), dc_rho.ravel()
+    total = lambda_home.shape[0]
+
+    chunks = [
+        _optimize_picks_chunk(lambda_home[i:i + chunk_size],
+                              lambda_away[i:i + chunk_size],
+                              dc_rho[i:i + chunk_size])
+        for i in range(0, total, chunk_size)
+    ]
+    if not chunks:
+        return {k: np.empty(shape, dtype=v) for k, v in (
+            ('pick_exact', object), ('pick_1x2', object), ('ev', float),
+            ('ev_confidence_gap', float), ('prob_home_win', float), ('prob_draw', float),
+            ('prob_away_win', float), ('grid_max_goals', int), ('captured_mass', float),
+        )}
+
+    return {
+        key: np.concatenate([c[key] for c in chunks]).reshape(shape)
+        for key in chunks[0]
+    }
+
+
+def evaluate_pick_batch(lambda_home, lambda_away, dc_rho, pick_exact, batch):
+    """
+    EV de un pick FIJO ("h-a") bajo cada juego de lambdas: P(exacto) + P(escenario),
+    con la misma grilla normalizada que optimize_picks_batch (`batch` = su salida
+    para esas mismas lambdas). Un marcador fuera de la grilla de un draw vale 0.
+    """
+    lambda_home, lambda_away, dc_rho = np.broadcast_arrays(
+        np.asarray(lambda_home, dtype=float),
+        np.asarray(lambda_away, dtype=float),
+        np.asarray(dc_rho, dtype=float),
+    )
+    h, a = (int(x) for x in pick_exact.split('-'))
+    cell = (np.exp(-lambda_home) * lambda_home ** h / factorial(h)
+            * np.exp(-lambda_away) * lambda_away ** a / factorial(a))
+    if h == 0 and a == 0:
+        cell = cell * (1.0 - lambda_home * lambda_away * dc_rho)
+    elif h == 1 and a == 0:
+        cell = cell * (1.0 + lambda_away * dc_rho)
+    elif h == 0 and a == 1:
+        cell = cell * (1.0 + lambda_home * dc_rho)
+    elif h == 1 and a == 1:
+        cell = cell * (1.0 - dc_rho)
+    inside = np.maximum(h, a) <= batch['grid_max_goals']
+    prob_cell = np.where(inside, cell / batch['captured_mass'], 0.0)
+
+    outcome = 'prob_home_win' if h > a else ('prob_draw' if h == a else 'prob_away_win')
+    return prob_cell + batch[outcome]
+
+
+# ========== CACHE DE PICKS (LRU, lambdas cuantizadas) ==========
+
+class PickCache:
+    """
+    Cache LRU acotado delante de optimize_pick_for_quiniela.
+
+    La llave cuantiza (lambda_home, lambda_away, dc_rho) a `resolution` (p.ej. 1e-4) y el
+    pick se calcula sobre los valores cuantizados, así el resultado depende solo de la
+    llave (determinista sin importar el orden de llamadas ni el estado del cache).
+    Los resultados cacheados se comparten: tratarlos como solo-lectura.
+    El archivo persistido lleva el hash del código del optimizador (quiniela.py):
+    si cambia la grilla, Dixon-Coles o la regla de EV, el cache guardado se descarta.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, maxsize=4096, resolution=1e-4):
+        self.maxsize = maxsize
+        self.resolution = resolution
+        self._scale = round(1.0 / resolution)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, lambda_home, lambda_away, dc_rho):
+        scale = self._scale
+        return (round(lambda_home * scale), round(lambda_away * scale), round(dc_rho * scale))
+
+    def optimize(self, lambda_home, lambda_away, dc_rho=-0.10):
+        """Equivalente cacheado de optimize_pick_for_quiniela."""
+        key = self._key(lambda_home, lambda_away, dc_rho)
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        scale = self._scale
+        result = optimize_pick_for_quiniela(key[0] / scale, key[1] / scale, dc_rho=key[2] / scale)
+        self._entries[key] = result
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return result
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def code_version():
+        """Hash del código del optimizador (este módulo)."""
+        return utils.calculate_code_version('quiniela.py')
+
+    def save(self, path):
+        """Persiste el cache en JSON (escritura atómica: tmp + rename)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        payload = {
+            'version': self.FORMAT_VERSION,
+            'code_version': self.code_version(),
+            'resolution': self.resolution,
+            'entries': [[list(key), value] for key, value in self._entries.items()],
+        }
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path, maxsize=4096, resolution=1e-4):
+        """
+        Carga un cache persistido. Si el archivo no existe, es de otra versión de
+        formato o de código del optimizador, o usa otra resolución, regresa un cache vacío.
+        """
+        cache = cls(maxsize=maxsize, resolution=resolution)
+        if not path or not os.path.exists(path):
+            return cache
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"WARNING: Pick cache ilegible ({path}): {e}")
+            return cache
+        if payload.get('version') != cls.FORMAT_VERSION or payload.get('resolution') != resolution:
+            return cache
+        if payload.get('code_version') != cls.code_version():
+            print(f"  > Pick cache de otra versión del optimizador, se descarta: {path}")
+            return cache
+        for key, value in payload.get('entries', [])[-maxsize:]:
+            cache._entries[tuple(key)] = value
+        return cache
@@ -0,0 +1,190 @@
+"""
+Simulador de temporada: distribución de posiciones finales, play-in y liguilla.
+
+Parte de la tabla actual (core.calculate_current_table), juega los partidos
+pendientes con goles Poisson tomados de la matriz round-robin de lambdas
+(core.round_robin_matrices) y ordena cada temporada simulada por
+puntos → diferencia de goles → goles a favor → sorteo.
+
+El estado es compacto: arreglos enteros (temporadas × equipos) por bloque y
+un conteo (equipo × posición) acumulado. Los bloques tienen semillas
+derivadas de una SeedSequence, así el resultado no depende de cuántos
+procesos se usen (workers=None → secuencial).
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import src.predicciones.core as dl
+
+SEASON_CHUNK_SIZE = 25000  # temporadas por bloque (acota memoria de (S, partidos))
+
+
+def table_arrays(current_table, teams):
+    """Puntos, PJ, DG y GF actuales alineados con `teams` (equipos sin partidos = 0)."""
+    def column(key):
+        return np.array([current_table.get(t, {}).get(key, 0) for t in teams], dtype=np.int64)
+    return {key: column(key) for key in ('pts', 'pj', 'gd', 'gf')}
+
+
+def remaining_fixtures(stats_df, tournament, teams, scheduled=None):
+    """
+    Partidos pendientes del torneo (round-robin sencillo: cada par se enfrenta una vez).
+
+    Args:
+        scheduled: Iterable de (local, visita) con calendario conocido (p.ej. de
+            data/inputs/jornada_N_final.json). Los cruces ya jugados se ignoran.
+
+    Returns:
+        (home_idx, away_idx, neutral): índices a `teams`; neutral=True marca los
+        cruces pendientes sin sede conocida (se sortea la sede en cada temporada).
+    """
+    position = {t: i for i, t in enumerate(teams)}
+    played = stats_df[stats_df['tournament'] == tournament]
+    played_pairs = {
+        frozenset((dl.canonical_team_name(h), dl.canonical_team_name(a)))
+        for h, a in zip(played['home_team'], played['away_team'])
+    }
+
+    home_idx, away_idx, neutral = [], [], []
+    seen = set(played_pairs)
+    for home, away in scheduled or []:
+        home, away = dl.canonical_team_name(home), dl.canonical_team_name(away)
+        pair = frozenset((home, away))
+        if pair in seen or home not in position or away not in position:
+            continue
+        seen.add(pair)
+        home_idx.append(position[home])
+        away_idx.append(position[away])
+        neutral.append(False)
+
+    for i in range(len(teams)):
+        for j in range(i + 1, len(teams)):
+            if frozenset((teams[i], teams[j])) not in seen:
+                home_idx.append(i)
+                away_idx.append(j)
+                neutral.append(True)
+
+    return (np.array(home_idx, dtype=np.intp), np.array(away_idx, dtype=np.intp),
+            np.array(neutral, dtype=bool))
+
+
+def _simulate_chunk(table, home_idx, away_idx, neutral, lambda_home, lambda_away, n_seasons, seed):
+    """
+    Simula un bloque de temporadas.
+
+    Returns:
+        (position_counts (T, T) int64, points_sum (T,) int64)
+    """
+    rng = np.random.default_rng(seed)
+    n_teams = len(table['pts'])
+    n_matches = len(home_idx)
+
+    # Lambdas del equipo "home_idx" (g1) y "away_idx" (g2); sede sorteada si es neutral
+    lam_1 = np.broadcast_to(lambda_home[home_idx, away_idx], (n_seasons, n_matches))
+    lam_2 = np.broadcast_to(lambda_away[home_idx, away_idx], (n_seasons, n_matches))
+    if neutral.any():
+        flip = neutral & (rng.random((n_seasons, n_matches)) < 0.5)
+        lam_1 = np.where(flip, lambda_away[away_idx, home_idx], lam_1)
+        lam_2 = np.where(flip, lambda_home[away_idx, home_idx], lam_2)
+    g1 = rng.poisson(lam_1).astype(np.int16)
+    g2 = rng.poisson(lam_2).astype(np.int16)
+
+    # Incidencia partido → equipo; el matmul en float32 es exacto para estos enteros
+    inc_1 = np.zeros((n_matches, n_teams), dtype=np.float32)
+    inc_2 = np.zeros((n_matches, n_teams), dtype=np.float32)
+    inc_1[np.arange(n_matches), home_idx] = 1.0
+    inc_2[np.arange(n_matches), away_idx] = 1.0
+
+    draw = g1 == g2
+    pts_1 = (3 * (g1 > g2) + draw).astype(np.float32)
+    pts_2 = (3 * (g2 > g1) + draw).astype(np.float32)
+    diff = (g1 - g2).astype(np.float32)
+
+    pts = table['pts'] + (pts_1 @ inc_1 + pts_2 @ inc_2).astype(np.int64)
+    gd = table['gd'] + (diff @ (inc_1 - inc_2)).astype(np.int64)
+    gf = table['gf'] + (g1.astype(np.float32) @ inc_1 + g2.astype(np.float32) @ inc_2).astype(np.int64)
+
+    # Llave compuesta: puntos > DG > GF > sorteo (mayor = mejor)
+    key = pts * 1024 + np.clip(gd + 512, 0, 1023)
+    key = key * 1024 + np.clip(gf, 0, 1023)
+    key = key * 65536 + rng.integers(0, 65536, size=(n_seasons, n_teams))
+    order = np.argsort(-key, axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n_teams)[None, :], axis=1)
+
+    cells = np.arange(n_teams)[None, :] * n_teams + positions
+    counts = np.bincount(cells.ravel(), minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+    return counts.astype(np.int64), pts.sum(axis=0)
+
+
+def _simulate_chunk_star(args):
+    return _simulate_chunk(*args)
+
+
+def simulate_seasons(table, home_idx, away_idx, lambda_home, lambda_away, neutral=None,
+                     n_seasons=100000, seed=None, chunk_size=SEASON_CHUNK_SIZE, workers=None):
+    """
+    Simula `n_seasons` cierres de torneo.
+
+    Args:
+        table: Salida de table_arrays (pts / gd / gf actuales por equipo)
+        lambda_home, lambda_away: Matrices (T, T) de round_robin_matrices
+        workers: Procesos para repartir los bloques (None/1 = en este proceso)
+
+    Returns:
+        dict con 'position_counts' (equipo × posición), 'points_sum' y 'n_seasons'
+    """
+    home_idx = np.asarray(home_idx, dtype=np.intp)
+    away_idx = np.asarray(away_idx, dtype=np.intp)
+    neutral = np.zeros(len(home_idx), dtype=bool) if neutral is None else np.asarray(neutral, dtype=bool)
+    lambda_home = np.asarray(lambda_home, dtype=float)
+    lambda_away = np.asarray(lambda_away, dtype=float)
+
+    sizes = [min(chunk_size, n_seasons - start) for start in range(0, n_seasons, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(table, home_idx, away_idx, neutral, lambda_home, lambda_away, size, s)
+             for size, s in zip(sizes, seeds)]
+
+    if workers and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_simulate_chunk_star, tasks))
+    else:
+        results = [_simulate_chunk(*task) for task in tasks]
+
+    n_teams = len(table['pts'])
+    counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    points_sum = np.zeros(n_teams, dtype=np.int64)
+    for chunk_counts, chunk_points in results:
+        counts += chunk_counts
+        points_sum += chunk_points
+    return {'position_counts': counts, 'points_sum': points_sum, 'n_seasons': n_seasons}
+
+
+def season_summary(teams, table, simulation, config):
+    """
+    Probabilidades por equipo: superliderato, liguilla directa, play-in,
+    clasificación total y distribución completa de posición final (p_pos_k).
+    """
+    direct = config.get('LIGUILLA_DIRECT_SPOTS', 6)
+    play_in_last = config.get('PLAY_IN_LAST_SPOT', 10)
+    counts = simulation['position_counts']
+    probs = counts / simulation['n_seasons']
+    positions = np.arange(1, len(teams) + 1)
+
+    df = pd.DataFrame({
+        'team': teams,
+        'pts': table['pts'],
+        'pj': table['pj'],
+        'gd': table['gd'],
+        'pts_mean': simulation['points_sum'] / simulation['n_seasons'],
+        'pos_mean': probs @ positions,
+        'p_superlider': probs[:, 0],
+        'p_liguilla_directa': probs[:, :direct].sum(axis=1),
+        'p_play_in': probs[:, direct:play_in_last].sum(axis=1),
+        'p_clasifica': probs[:, :play_in_last].sum(axis=1),
+    })
+    for k in positions:
+        df[f'p_pos_{k}'] = probs[:, k - 1]
+    return df.sort_values(['pos_mean', 'team']).reset_index(drop=True)
@@ -0,0 +1,148 @@
+"""
+Simulación Monte Carlo de la incertidumbre de lambdas (robustez del pick).
+
+El pick se optimiza sobre lambdas puntuales; aquí se muestrean
+  - las tasas suavizadas de ataque/defensa desde su posterior gamma
+    (los BAYES_ALPHA_* son pseudo-partidos del prior, ver core.rate_posteriors_batch), y
+  - los multiplicadores de bajas / contexto / xPTS alrededor de su valor puntual,
+    con dispersión mayor cuanto menor es la `confidence` de lo que los originó,
+y todos los draws pasan juntos por el optimizador batch de quiniela.
+Todo es columnar: (draws, partidos) sin loops por draw.
+"""
+import numpy as np
+import pandas as pd
+
+import src.predicciones.core as dl
+import src.predicciones.quiniela as qx
+
+DEFAULT_DRAWS = 20000  # si no se pide n_draws y la config lo tiene desactivado (MC_SIMULATIONS = 0)
+
+# Columnas de ADJUSTMENT_COLUMNS que vienen del adj_map (bajas/contexto/xPTS).
+# La forma/momentum/crisis son funciones deterministas de resultados pasados: fijas.
+_ADJ_MAP_SIDES = {
+    'home_att_adj': 'home',
+    'home_def_adj': 'home',
+    'away_att_adj': 'away',
+    'away_def_adj': 'away',
+}
+
+
+def team_adjustment_confidence(team_entry, default=0.75):
+    """
+    Confianza media de lo que movió el ajuste de un equipo (bajas estructuradas +
+    ajustes de contexto). Sin items registrados (xPTS, cualitativo legacy) → default.
+    """
+    items = (team_entry or {}).get('ausencias_items', []) + (team_entry or {}).get('context_items', [])
+    confidences = [float(item['confidence']) for item in items if item.get('confidence') is not None]
+    return float(np.mean(confidences)) if confidences else default
+
+
+def adjustment_uncertainty(home_teams, away_teams, adj_map, config):
+    """
+    Coeficiente de variación (n, 6) del efecto de cada multiplicador, en el orden
+    de ADJUSTMENT_COLUMNS. cv interpola entre MC_ADJ_CV_MAX (confianza 0) y
+    MC_ADJ_CV_MIN (confianza 1); las columnas de forma quedan en 0.
+    """
+    cv_min = config.get('MC_ADJ_CV_MIN', 0.15)
+    cv_max = config.get('MC_ADJ_CV_MAX', 0.60)
+    default = config.get('MC_DEFAULT_CONFIDENCE', 0.75)
+    cv = np.zeros((len(home_teams), len(dl.ADJUSTMENT_COLUMNS)))
+    for j, name in enumerate(dl.ADJUSTMENT_COLUMNS):
+        if name not in _ADJ_MAP_SIDES:
+            continue
+        teams = home_teams if _ADJ_MAP_SIDES[name] == 'home' else away_teams
+        for i, team in enumerate(teams):
+            conf = min(1.0, max(0.0, team_adjustment_confidence(adj_map.get(team), default)))
+            cv[i, j] = cv_max * (1.0 - conf) + cv_min * conf
+    return cv
+
+
+def sample_adjustments(adjustments, cv, n_draws, rng):
+    """
+    Draws (n_draws, n, 6) de los multiplicadores: m' = 1 + (m - 1) * U con
+    U ~ Gamma(k, 1/k), k = 1/cv² (media 1: el valor puntual es el esperado).
+    """
+    adjustments = np.asarray(adjustments, dtype=float)
+    cv = np.asarray(cv, dtype=float)
+    active = (cv > 0) & (adjustments != 1.0)
+    shape = np.where(active, 1.0 / np.where(active, cv, 1.0) ** 2, 1.0)
+    u = rng.gamma(shape, 1.0 / shape, size=(n_draws,) + adjustments.shape)
+    return np.where(active, 1.0 + (adjustments - 1.0) * u, adjustments)
+
+
+def sample_rates(posteriors, n_draws, rng):
+    """Draws (n_draws, n) de cada tasa desde su posterior Gamma(shape, rate)."""
+    rates = {}
+    for name, (shape, rate) in posteriors['posterior'].items():
+        shape = np.asarray(shape, dtype=float)
+        valid = shape > 0
+        draws = rng.gamma(np.where(valid, shape, 1.0), 1.0 / np.asarray(rate, dtype=float),
+                          size=(n_draws,) + shape.shape)
+        rates[name] = np.where(valid, draws, 0.0)
+    return rates
+
+
+def simulate_pick_robustness(home_idx, away_idx, teams, team_stats_current, prior_weighted_stats,
+                             league_avg_curr_raw, config, point_picks, adjustments=None,
+                             adjustment_cv=None, rivalry=None, dc_rho=-0.10, xg_lookup=None,
+                             n_draws=None, seed=None):
+    """
+    Estabilidad del pick y distribución de EV por partido bajo incertidumbre de lambdas.
+
+    Args:
+        point_picks: Pick exacto ("h-a") optimizado sobre las lambdas puntuales, por partido
+        adjustments: Matriz (n, 6) de multiplicadores puntuales (ADJUSTMENT_COLUMNS)
+        adjustment_cv: (n, 6) de adjustment_uncertainty, o None (multiplicadores fijos)
+        dc_rho: Escalar o arreglo (n,) de ρ Dixon-Coles por partido
+        n_draws / seed: default MC_SIMULATIONS (o DEFAULT_DRAWS) / MC_SEED de config
+
+    Returns:
+        DataFrame (una fila por partido): estabilidad del exacto y del 1X2, pick modal
+        de los draws y percentiles de EV del pick puntual y de las lambdas.
+    """
+    home_idx = np.asarray(home_idx, dtype=np.intp).ravel()
+    away_idx = np.asarray(away_idx, dtype=np.intp).ravel()
+    n_draws = int(n_draws or config.get('MC_SIMULATIONS') or DEFAULT_DRAWS)
+    rng = np.random.default_rng(config.get('MC_SEED', 2026) if seed is None else seed)
+
+    post = dl.rate_posteriors_batch(home_idx, away_idx, teams, team_stats_current, prior_weighted_stats,
+                                    league_avg_curr_raw, config, xg_lookup)
+    n = post['n']
+    adjustments = np.ones((n, len(dl.ADJUSTMENT_COLUMNS))) if adjustments is None else np.asarray(adjustments, dtype=float)
+    adj_draws = (adjustments if adjustment_cv is None
+                 else sample_adjustments(adjustments, adjustment_cv, n_draws, rng))
+
+    lam = dl.lambdas_from_rates(post, sample_rates(post, n_draws, rng), config, adj_draws, rivalry)
+    lambda_home, lambda_away = lam['lambda_home_final'], lam['lambda_away_final']
+    rho = np.broadcast_to(np.asarray(dc_rho, dtype=float), (n,))
+    batch = qx.optimize_picks_batch(lambda_home, lambda_away, rho)
+
+    rows = []
+    team_names = np.asarray(teams, dtype=object)
+    for i in range(n):
+        pick = point_picks[i]
+        h, a = (int(x) for x in pick.split('-'))
+        outcome = '1' if h > a else ('X' if h == a else '2')
+        ev = qx.evaluate_pick_batch(lambda_home[:, i], lambda_away[:, i], rho[i], pick,
+                                    {k: v[:, i] for k, v in batch.items()})
+        picks = pd.Series(batch['pick_exact'][:, i]).value_counts()
+        rows.append({
+            'home_team_canonical': team_names[home_idx[i]],
+            'away_team_canonical': team_names[away_idx[i]],
+            'mc_draws': n_draws,
+            'pick_exact_point': pick,
+            'pick_stability': float(np.mean(batch['pick_exact'][:, i] == pick)),
+            'pick_1x2_stability': float(np.mean(batch['pick_1x2'][:, i] == outcome)),
+            'mc_modal_pick': picks.index[0],
+            'mc_modal_share': float(picks.iloc[0] / n_draws),
+            'ev_mean': float(ev.mean()),
+            'ev_std': float(ev.std()),
+            'ev_p05': float(np.quantile(ev, 0.05)),
+            'ev_p50': float(np.quantile(ev, 0.50)),
+            'ev_p95': float(np.quantile(ev, 0.95)),
+            'lambda_home_p05': float(np.quantile(lambda_home[:, i], 0.05)),
+            'lambda_home_p95': float(np.quantile(lambda_home[:, i], 0.95)),
+            'lambda_away_p05': float(np.quantile(lambda_away[:, i], 0.05)),
+            'lambda_away_p95': float(np.quantile(lambda_away[:, i], 0.95)),
+        })
+    return pd.DataFrame(rows)
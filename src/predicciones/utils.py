@@ -3,79 +3,330 @@ import hashlib
 import json
 import os
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
-def calculate_file_hash(filepath):
-    """Calcula SHA256 de un archivo."""
-    if not os.path.exists(filepath):
-        return "FILE_NOT_FOUND"
-    
+# ========== HASH DE ARCHIVOS (buffers grandes + cache por (size, mtime_ns)) ==========
+
+HASH_CHUNK_SIZE = 1 << 20  # 1 MB por lectura (antes 4 KB)
+DEFAULT_HASH_CACHE_PATH = 'data/processed/file_hashes.json'
+HASH_CACHE_VERSION = 1
+# Archivos modificados hace menos de esto no se memoizan: con mtime de baja
+# resolución una reescritura del mismo tamaño podría no cambiar la llave.
+HASH_RACY_WINDOW_NS = 2_000_000_000
+
+
+def _sha256_file(filepath):
     sha256_hash = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(filepath, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            sha256_hash.update(view[:n])
     return sha256_hash.hexdigest()
 
+
+class FileHashCache:
+    """
+    Digests SHA-256 memoizados por (path, size, mtime_ns). Un archivo que no cambió
+    no se vuelve a leer; el cache se persiste en un sidecar JSON pequeño.
+    Thread-safe: hash_many() reparte los archivos en un pool de threads
+    (hashlib libera el GIL en buffers grandes).
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path=DEFAULT_HASH_CACHE_PATH):
+        """Carga el sidecar; si no existe o es de otra versión, arranca vacío."""
+        cache = cls(path)
+        if not path or not os.path.exists(path):
+            return cache
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return cache
+        if payload.get('version') == HASH_CACHE_VERSION:
+            cache._entries = {k: tuple(v) for k, v in payload.get('entries', {}).items()}
+        return cache
+
+    def hash(self, filepath):
+        """SHA-256 del archivo ("FILE_NOT_FOUND" si no existe)."""
+        try:
+            st = os.stat(filepath)
+        except (FileNotFoundError, NotADirectoryError):
+            return "FILE_NOT_FOUND"
+        key = os.path.abspath(filepath)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            with self._lock:
+                self.hits += 1
+            return entry[2]
+
+        digest = _sha256_file(filepath)
+        with self._lock:
+            self.misses += 1
+            if time.time_ns() - st.st_mtime_ns >= HASH_RACY_WINDOW_NS:
+                self._entries[key] = (st.st_size, st.st_mtime_ns, digest)
+                self._dirty = True
+        return digest
+
+    def hash_many(self, filepaths, max_workers=None):
+        """Hashea varios archivos concurrentemente. Returns: {path: digest}"""
+        unique = list(dict.fromkeys(filepaths))
+        if len(unique) <= 1:
+            return {path: self.hash(path) for path in unique}
+        workers = max_workers or min(8, len(unique))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(unique, pool.map(self.hash, unique)))
+
+    def save(self, path=None):
+        """Persiste el sidecar (atómico) si hubo cambios; descarta archivos que ya no existen."""
+        path = path or self.path
+        if not path or not self._dirty:
+            return None
+        with self._lock:
+            entries = {k: list(v) for k, v in self._entries.items() if os.path.exists(k)}
+            self._dirty = False
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp.{os.getpid()}'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': HASH_CACHE_VERSION, 'entries': entries}, f)
+        os.replace(tmp_path, path)
+        return path
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+_FILE_HASH_CACHE = None
+
+
+def file_hash_cache():
+    """Cache de hashes del proceso (se carga del sidecar la primera vez)."""
+    global _FILE_HASH_CACHE
+    if _FILE_HASH_CACHE is None:
+        _FILE_HASH_CACHE = FileHashCache.load(DEFAULT_HASH_CACHE_PATH)
+    return _FILE_HASH_CACHE
+
+
+def calculate_file_hash(filepath):
+    """Calcula SHA256 de un archivo (memoizado por size + mtime)."""
+    return file_hash_cache().hash(filepath)
+
+
+def calculate_file_hashes(filepaths, max_workers=None):
+    """SHA256 de varios archivos en paralelo. Returns: {path: digest}"""
+    return file_hash_cache().hash_many(filepaths, max_workers)
+
+
+def save_file_hash_cache():
+    """Persiste el sidecar de hashes del proceso (no-op si no cambió)."""
+    return file_hash_cache().save()
+
+
 def calculate_config_hash(config):
     """
     Hash de parámetros críticos del modelo que afectan prior.
     Usado para cache invalidation.
     """
-    critical_params = {
-        'BAYES_ALPHA_ATT': config['BAYES_ALPHA_ATT'],
-        'BAYES_ALPHA_DEF': config['BAYES_ALPHA_DEF'],
-        'BLEND_K': config['BLEND_K'],
-        'LEAGUE_AVG_K': config['LEAGUE_AVG_K'],
-        'BAYES_K': config['BAYES_K'],
-        'CLAMP_REL_MIN': config['CLAMP_REL_MIN'],
-        'CLAMP_REL_MAX': config['CLAMP_REL_MAX'],
-        'PRIOR_TOURNAMENTS': config['PRIOR_TOURNAMENTS'],
-    }
+    critical_keys = [
+        'BAYES_ALPHA_ATT', 'BAYES_ALPHA_DEF', 'BLEND_K', 'LEAGUE_AVG_K', 'BAYES_K',
+        'CLAMP_REL_MIN', 'CLAMP_REL_MAX', 'PRIOR_TOURNAMENTS',
+    ]
+    critical_params = {key: config.get(key) for key in critical_keys}
     hash_str = json.dumps(critical_params, sort_keys=True).encode()
     return hashlib.sha256(hash_str).hexdigest()[:8]  # 8 chars suficientes
 
-def save_prior_cache(prior_stats, config, cache_dir='data/processed'):
+
+def calculate_full_config_hash(config):
+    """Hash de TODA la config (no sólo la del prior): llave de re-ejecución de etapas."""
+    hash_str = json.dumps(config, sort_keys=True, default=str).encode()
+    return hashlib.sha256(hash_str).hexdigest()[:16]
+
+# ========== CACHE CONTENT-ADDRESSED (prior / league averages) ==========
+
+DEFAULT_CACHE_DIR = 'data/processed'
+DEFAULT_CACHE_MAX_FILES = 8
+
+# Columnas de stats_df que alimentan prior y promedios de liga
+_STATS_HASH_COLUMNS = ['tournament', 'home_team', 'away_team', 'home_goals', 'away_goals']
+
+
+def calculate_code_version(module_file='core.py'):
+    """Hash del código que construye los artefactos cacheados (default core.py)."""
+    return calculate_file_hash(os.path.join(os.path.dirname(os.path.abspath(__file__)), module_file))[:8]
+
+
+def calculate_data_hash(stats_df, columns=_STATS_HASH_COLUMNS):
+    """
+    Hash del contenido relevante de stats_df (no del archivo): cualquier fila nueva
+    o corregida en Stats_liga_mx.json invalida el cache automáticamente.
+    `columns`: columnas que alimentan el artefacto (default: las de prior / promedios de liga).
+    """
+    import pandas as pd
+
+    cols = [c for c in columns if c in stats_df.columns]
+    row_hashes = pd.util.hash_pandas_object(stats_df[cols], index=False).to_numpy()
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(json.dumps(cols).encode())
+    return digest.hexdigest()[:8]
+
+
+def cache_path_for(kind, config, stats_df, cache_dir=DEFAULT_CACHE_DIR):
+    """Ruta content-addressed: {kind}_cache_{config_hash}_{data_hash}_{code_version}.json"""
+    return os.path.join(
+        cache_dir,
+        f'{kind}_cache_{calculate_config_hash(config)}_{calculate_data_hash(stats_df)}_{calculate_code_version()}.json'
+    )
+
+
+def save_cached_artifact(kind, payload, config, stats_df, cache_dir=DEFAULT_CACHE_DIR,
+                         max_files=DEFAULT_CACHE_MAX_FILES):
     """
-    Guarda prior multi-torneo con hash de config.
+    Guarda un artefacto derivado de stats_df + config con escritura atómica (tmp + rename),
+    metadatos (build time, filas) y evicción: se conservan los max_files más recientes por kind.
+
+    Returns:
+        str: Path del archivo de caché guardado
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = cache_path_for(kind, config, stats_df, cache_dir)
+    document = {
+        'meta': {
+            'kind': kind,
+            'built_at': datetime.now().isoformat(),
+            'row_count': int(len(stats_df)),
+            'config_hash': calculate_config_hash(config),
+            'data_hash': calculate_data_hash(stats_df),
+            'code_version': calculate_code_version(),
+        },
+        'data': payload,
+    }
+
+    tmp_path = f'{cache_path}.tmp.{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+    evict_cache_files(kind, cache_dir, max_files)
+    return cache_path
+
+
+def load_cached_artifact(kind, config, stats_df, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Carga un artefacto si existe uno con el mismo hash de config + datos + código.
+
+    Returns:
+        (data, meta) | (None, None)
+    """
+    cache_path = cache_path_for(kind, config, stats_df, cache_dir)
+    if not os.path.exists(cache_path):
+        return None, None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"⚠️ Cache ilegible, se recalculará: {cache_path} ({e})")
+        return None, None
+    return document.get('data'), document.get('meta', {})
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # otro worker ya lo borró (FileNotFoundError) o no se puede borrar: se omite
+
+
+def evict_oldest_files(directory, prefix, suffix, max_files, companions=()):
+    """
+    Conserva los max_files archivos {prefix}*{suffix} más recientes (mtime) de
+    `directory` y borra el resto, junto con sus `companions` (mismo nombre con
+    otro sufijo, p.ej. '.npy').
+
+    Varios workers pueden compartir el directorio: un archivo que otro proceso
+    borra entre el listado y el stat / remove simplemente se omite.
+
+    Returns:
+        list: Paths desalojados
+    """
+    try:
+        names = [n for n in os.listdir(directory) if n.startswith(prefix) and n.endswith(suffix)]
+    except FileNotFoundError:
+        return []
+    stamped = []
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            stamped.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue
+    stamped.sort(key=lambda item: item[0], reverse=True)
+    evicted = [path for _, path in stamped[max_files:]]
+    for path in evicted:
+        _remove_file(path)
+        for companion in companions:
+            _remove_file(path[:-len(suffix)] + companion)
+    return evicted
+
+
+def evict_cache_files(kind, cache_dir=DEFAULT_CACHE_DIR, max_files=DEFAULT_CACHE_MAX_FILES):
+    """Borra los archivos {kind}_cache_*.json más viejos (mtime) por encima de max_files."""
+    return evict_oldest_files(cache_dir, f'{kind}_cache_', '.json', max_files)
+
+
+def save_prior_cache(prior_stats, config, stats_df, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Guarda prior multi-torneo con hash de config + datos + código.
     
     Args:
         prior_stats (dict): Resultado de build_weighted_prior_stats()
         config (dict): Configuración del modelo
+        stats_df (DataFrame): Datos con los que se construyó el prior
         cache_dir (str): Directorio de caché
     
     Returns:
         str: Path del archivo de caché guardado
     """
-    os.makedirs(cache_dir, exist_ok=True)
-    config_hash = calculate_config_hash(config)
-    cache_path = os.path.join(cache_dir, f'prior_cache_{config_hash}.json')
-    
-    with open(cache_path, 'w', encoding='utf-8') as f:
-        json.dump(prior_stats, f, indent=2)
-    
+    cache_path = save_cached_artifact(
+        'prior', prior_stats, config, stats_df, cache_dir,
+        max_files=config.get('CACHE_MAX_FILES', DEFAULT_CACHE_MAX_FILES)
+    )
     print(f"✅ Prior cache guardado: {cache_path}")
     return cache_path
 
-def load_prior_cache(config, cache_dir='data/processed'):
+def load_prior_cache(config, stats_df, cache_dir=DEFAULT_CACHE_DIR):
     """
-    Carga prior multi-torneo si hash de config coincide.
+    Carga prior multi-torneo si hash de config + datos + código coincide.
     
     Args:
         config (dict): Configuración del modelo
+        stats_df (DataFrame): Datos actuales
         cache_dir (str): Directorio de caché
     
     Returns:
         dict | None: Prior stats si existe y hash coincide, None otherwise
     """
-    config_hash = calculate_config_hash(config)
-    cache_path = os.path.join(cache_dir, f'prior_cache_{config_hash}.json')
-    
-    if os.path.exists(cache_path):
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            prior_stats = json.load(f)
-        print(f"✅ Prior cache cargado: {cache_path}")
+    prior_stats, meta = load_cached_artifact('prior', config, stats_df, cache_dir)
+    if prior_stats is not None:
+        print(f"✅ Prior cache cargado ({meta.get('row_count')} filas, {meta.get('built_at')})")
         return prior_stats
     
-    print(f"⚠️ Prior cache no encontrado, se calculará: {cache_path}")
+    print(f"⚠️ Prior cache no encontrado, se calculará: {cache_path_for('prior', config, stats_df, cache_dir)}")
     return None
 
 def get_git_commit():
@@ -0,0 +1,77 @@
+"""
+Tests del store columnar de ajustes (src/predicciones/adjustments.py).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_adjustments.py -v
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import adjustments
+from src.predicciones import data as data_loader
+
+
+class TestTeamAdjustments:
+    """Factores compuestos del log, vistas por canal, copia y rollback."""
+
+    def test_factors_match_sequential_product(self):
+        rng = np.random.default_rng(0)
+        store = adjustments.TeamAdjustments()
+        expected = {}
+        for _ in range(200):
+            team = f"t{rng.integers(5)}"
+            att, dfn = rng.uniform(0.9, 1.1, size=2)
+            store.record(team, 'test', att_adj=float(att), def_adj=float(dfn), notes='x')
+            e_att, e_def = expected.get(team, (1.0, 1.0))
+            expected[team] = (e_att * float(att), e_def * float(dfn))
+            if rng.random() < 0.1:
+                store.factors  # composición incremental intercalada
+        for team, factors in expected.items():
+            assert store.factor(team) == factors  # mismo orden de multiplicación → idéntico
+        assert store.factor('ausente') == (1.0, 1.0)
+        np.testing.assert_array_equal(store.factor_matrix(['ausente', 't0'])[0], [1.0, 1.0])
+
+    def test_views_and_legacy_shape(self):
+        store = adjustments.TeamAdjustments()
+        store.add_team('pumas')
+        store.record('toluca', 'manual', att_adj=0.9, notes='baja', report_log={'desc': 'd', 'pct': -10.0})
+        store.record('toluca', 'context', context_txt='ctx')
+        assert list(store) == ['pumas', 'toluca']
+        assert store.channel('toluca', 'notes') == ['baja']
+        view = store['toluca']
+        assert view['att_adj'] == 0.9 and view['def_adj'] == 1.0
+        assert view['report_log'] == [{'desc': 'd', 'pct': -10.0}] and view['ausencias_items'] == []
+        assert store.get('pumas')['notes'] == [] and store.get('necaxa') is None
+        log = store.event_log()
+        assert log['team'].tolist() == ['toluca', 'toluca', 'toluca']
+        assert log['att_adj'].tolist() == [0.9, 1.0, 1.0]  # el factor va en la primera fila del evento
+
+    def test_copy_and_rollback_are_independent(self):
+        store = adjustments.TeamAdjustments.from_dict({'america': {'att_adj': 0.95, 'notes': ['baja']}})
+        clone = store.copy()
+        clone.record('america', 'xpts', att_adj=0.5, notes='regresion')
+        assert store.factor('america') == (0.95, 1.0) and store.channel('america', 'notes') == ['baja']
+
+        mark = store.snapshot()
+        store.record('america', 'what-if', def_adj=1.2)
+        store.record('tigres', 'what-if', att_adj=0.8)
+        assert store.factor('america') == (0.95, 1.2)
+        store.rollback(mark)
+        assert store.factor('america') == (0.95, 1.0)
+        assert 'tigres' not in store and len(store.event_log()) == 2
+
+    def test_context_adjustments_compose_with_bajas(self):
+        store = data_loader.apply_context_adjustments(adjustments.TeamAdjustments(), [
+            {'team': 'leon', 'type': 'squad_fatigue', 'att_adj': 0.95, 'def_adj': 1.02,
+             'confidence': 0.8, 'note': 'Concachampions'},
+            {'team': 'leon', 'type': 'rotation_expected', 'att_adj': 0.98, 'def_adj': 1.0,
+             'confidence': 0.5, 'note': 'Rotación'},
+        ])
+        assert store.factor('leon') == (0.95 * 0.98, 1.02)
+        assert [item['type'] for item in store.channel('leon', 'context_items')] == \
+            ['squad_fatigue', 'rotation_expected']
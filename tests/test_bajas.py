@@ -0,0 +1,162 @@
+"""
+Tests de la ingesta de bajas (src/predicciones/bajas.py).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_bajas.py -v
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import bajas
+from src.predicciones import data as data_loader
+
+
+def _write(tmp_path, payload, name="feed.json"):
+    path = tmp_path / name
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+    return str(path)
+
+
+def _perplexity_item(player, **overrides):
+    item = {"team": "Chivas", "current_team": "Guadalajara", "player": player, "role": "Delantero",
+            "status": "Fuera", "impact_level": "Mid", "confidence": 0.9, "recency_days": 3,
+            "is_active_for_next_match": True, "verification_status": "confirmed", "reason": "Lesión"}
+    item.update(overrides)
+    return item
+
+
+class TestStreaming:
+    """iter_json_array: mismo resultado que json.load con cualquier tamaño de chunk."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+    def test_items_match_json_load(self, tmp_path, chunk_size):
+        payload = {
+            "meta": {"note": "contiene \"bajas\": [1, 2]", "version": 12345},
+            "instructions": ["bajas", {"nested": [1, {"x": None}]}],
+            "bajas": [{"player": f"Jugador {i}", "n": i * 1.5, "tags": ["á", "ñ"]} for i in range(25)],
+            "trailer": 1,
+        }
+        path = _write(tmp_path, payload)
+        assert list(bajas.iter_json_array(path, "bajas", chunk_size)) == payload["bajas"]
+        assert list(bajas.iter_json_array(path, "missing", chunk_size)) == []
+        assert list(bajas.iter_json_array(path, "trailer", chunk_size)) == []  # no es lista
+
+
+class TestSchema:
+    """Esquema compilado: defaults, tipos y descarte de items inválidos."""
+
+    def test_validator_coerces_and_rejects(self):
+        validate = bajas.compile_schema({"team": (str, bajas.REQUIRED), "confidence": (float, 0.75),
+                                         "active": (bool, None)})
+        columns, invalid = validate([
+            {"team": "Toluca", "confidence": "0.9"},
+            {"confidence": 1},
+            {"team": 3},
+            {"team": "Atlas", "active": "yes"},
+            ["team"],
+            {"team": "Pumas", "confidence": 2, "active": False},
+        ])
+        assert columns == {"team": ["Toluca", "Pumas"], "confidence": [0.9, 2.0], "active": [None, False]}
+        assert sorted(invalid) == [1, 2, 3, 4]
+
+    def test_invalid_items_are_reported_not_fatal(self, tmp_path):
+        path = _write(tmp_path, {"bajas": [_perplexity_item("A"), _perplexity_item("B", recency_days="ayer"),
+                                           "texto suelto"]})
+        table = bajas.ingest_perplexity_bajas(path)
+        assert table["player"].tolist() == ["A"]
+        assert [i for i, _ in table.attrs["invalid"]] == [1, 2]
+
+
+class TestFilters:
+    """Filtros columnares del feed semanal y del archivo multi-semana."""
+
+    def test_perplexity_filter_chain(self, tmp_path):
+        path = _write(tmp_path, {"bajas": [
+            _perplexity_item("Ok"),
+            _perplexity_item("Inactivo", is_active_for_next_match=False),
+            _perplexity_item("Retirado", is_retired=True),
+            _perplexity_item("Transferido", current_team="Toluca"),
+            _perplexity_item("Sin verificar", verification_status="unverified"),
+            _perplexity_item("Vieja", recency_days=25, is_active_for_next_match=None),
+            _perplexity_item("Vieja activa", recency_days=25),
+            _perplexity_item("Capada", recency_days=16, is_active_for_next_match=None),
+            _perplexity_item("Menor", impact_level="Low"),
+        ]})
+        table = bajas.ingest_perplexity_bajas(path)
+        assert table["player"].tolist() == ["Ok", "Vieja activa", "Capada"]
+        assert table["team"].tolist() == ["guadalajara"] * 3
+        assert table["confidence"].tolist() == [0.9, 0.9, 0.55]
+        assert str(table["team"].dtype) == "category"
+
+    def test_key_players_upgrade_impact(self, tmp_path):
+        index = data_loader.KeyPlayerIndex.from_data(
+            {"players": [{"name": "Menor", "team": "Chivas", "rank": 70}]})
+        path = _write(tmp_path, {"bajas": [_perplexity_item("Menor", impact_level="Low")]})
+        table = bajas.ingest_perplexity_bajas(path, index)
+        assert table["impact_level"].tolist() == ["Mid"]
+
+    def test_archive_as_of_drops_future_reports(self, tmp_path):
+        path = _write(tmp_path, {"season": "Clausura 2026", "teams": [
+            {"team": "Club América", "players": [
+                {"player_name": "Pasado", "position": "DEF", "status": "OUT", "last_updated": "2026-01-20"},
+                {"player_name": "Futuro", "position": "FW", "status": "DOUBTFUL", "last_updated": "2026-02-20"},
+                {"player_name": "Sin fecha", "position": None, "status": "SUSPENDED", "last_updated": None},
+                {"position": "MID"},
+            ]},
+        ]})
+        table = bajas.ingest_archive_bajas(path, as_of="2026-01-31")
+        assert table["player"].tolist() == ["Pasado", "Sin fecha"]
+        assert table["role"].tolist() == ["Defensa", ""]
+        assert table["status"].tolist() == ["Fuera", "Fuera"]
+        assert table["recency_days"].tolist()[0] == 11
+        assert table["recency_days"].isna().tolist() == [False, True]
+        assert len(table.attrs["invalid"]) == 1
+        records = bajas.bajas_records(table)
+        assert records[0]["team"] == "america" and records[0]["source"] == "archive"
+
+
+class TestMerge:
+    """merge_bajas: una fila por (team, jugador) con la tupla de prioridad y su provenance."""
+
+    def test_priority_tuple_and_provenance(self, tmp_path):
+        manual = _write(tmp_path, {"bajas_identificadas": [
+            {"team": "Chivas", "player": "Efraín", "status": "fuera", "manual_impact_level": "Mid"},
+            {"team": "Chivas", "player": "Solo", "status": "fuera", "manual_impact_level": "Low"},
+        ]}, "manual.json")
+        week1 = _write(tmp_path, {"bajas": [
+            _perplexity_item("efrain", confidence=1.0),
+            _perplexity_item("Rival", impact_level="High", confidence=0.7),
+        ]}, "week1.json")
+        week2 = _write(tmp_path, {"bajas": [
+            _perplexity_item("Rival", impact_level="High", confidence=0.9),
+            _perplexity_item("Rival", impact_level="High", confidence=0.9, reason="repetido"),
+        ]}, "week2.json")
+        tables = [bajas.ingest_manual_bajas(manual), bajas.ingest_perplexity_bajas(week1),
+                  bajas.ingest_perplexity_bajas(week2)]
+        merged, provenance = bajas.merge_bajas(tables)
+
+        assert merged["player"].tolist() == ["Efraín", "Solo", "Rival"]
+        assert merged["source"].tolist() == ["manual", "manual", "perplexity"]
+        assert merged["reason"].tolist()[2] == "Lesión"  # empate total → gana el que llegó antes
+        by_player = provenance.set_index("player")
+        assert by_player.loc["Efraín", "reason"] == "fuente"
+        assert by_player.loc["Solo", "reason"] == "unica"
+        assert by_player.loc["Rival", "reason"] == "orden"  # vs. el subcampeón (mismo 0.9)
+        assert by_player.loc["Rival", "sources"] == "perplexity+perplexity+perplexity"
+        assert provenance["candidates"].sum() == sum(len(t) for t in tables)
+
+    def test_list_dedup_keeps_original_records(self):
+        items = [
+            {"team": "toluca", "player": "Ángel", "impact_level": "Low", "confidence": 1.0, "source": "manual"},
+            {"team": "toluca", "player": "angel ", "impact_level": "Mid", "confidence": 0.6, "source": "perplexity"},
+            {"team": "pumas", "player": "Ángel", "impact_level": "Low", "confidence": 0.6, "source": "perplexity"},
+        ]
+        deduped = data_loader.deduplicate_bajas(items)
+        assert deduped == [items[1], items[2]]
+        assert data_loader.deduplicate_bajas([]) == []
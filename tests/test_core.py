@@ -0,0 +1,284 @@
+"""
+Tests de src/predicciones/core.py (canonicalización, agregados por equipo, lambdas).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_core.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import core
+
+ROOT = Path(__file__).parent.parent
+STATS_PATH = ROOT / "data" / "inputs" / "Stats_liga_mx.json"
+
+
+class TestTeamNameCanonicalizer:
+    """El índice memoizado debe dar exactamente la misma salida que las reglas crudas."""
+
+    @pytest.mark.parametrize("raw,expected", [
+        ("CD Guadalajara", "guadalajara"),
+        ("Querétaro", "queretaro"),
+        ("Club América", "america"),
+        ("FC Juárez", "juarez"),
+        ("Atlético de San Luis", "atletico de san luis"),
+        ("Pumas UNAM", "pumas"),
+        ("  Deportivo  Toluca F.C. ", "toluca"),
+        ("Cruz-Azul", "cruz azul"),
+        ("", ""),
+        (None, ""),
+    ])
+    def test_known_names(self, raw, expected):
+        assert core.canonical_team_name(raw) == expected
+
+    def test_memo_counts_hits(self):
+        index = core.TeamNameCanonicalizer()
+        for _ in range(5):
+            index("Tigres UANL")
+        assert index.stats() == {'hits': 4, 'misses': 1, 'size': 1, 'hit_rate': 0.8}
+
+    def test_seed_from_stats_file(self):
+        index = core.TeamNameCanonicalizer().seed_from_stats_file(str(STATS_PATH))
+        assert index.stats()['size'] >= 18
+        assert index("CD Guadalajara") == "guadalajara"
+        assert index.stats()['hits'] == 1
+        assert index.stats()['misses'] == 0
+
+
+class TestTeamStatsAggregation:
+    """build_team_stats_canonical (columnar) debe fusionar alias y sumar por venue."""
+
+    def _stats_df(self):
+        import pandas as pd
+        return pd.DataFrame({
+            "tournament": ["Clausura 2025"] * 4 + ["Apertura 2025"],
+            "home_team": ["CD Guadalajara", "Club América", "Chivas", "Tigres UANL", "Toluca"],
+            "away_team": ["Club América", "Tigres UANL", "América", "CD Guadalajara", "Chivas"],
+            "home_goals": [2, 1, 0, 3, 5],
+            "away_goals": [1, 1, 2, 0, 0],
+        })
+
+    def test_team_stats_and_fusion_log(self):
+        team_stats, fusion_log = core.build_team_stats_canonical(self._stats_df(), "Clausura 2025")
+
+        assert list(team_stats) == ["guadalajara", "america", "tigres"]
+        assert team_stats["guadalajara"] == {
+            'PJ_home': 2, 'PJ_away': 1, 'PJ_total': 3,
+            'GF_home': 2, 'GF_away': 0, 'GF_total': 2,
+            'GC_home': 3, 'GC_away': 3, 'GC_total': 6,
+        }
+        assert team_stats["america"]["GF_away"] == 3
+        assert team_stats["tigres"]["PJ_total"] == 2
+        assert fusion_log["guadalajara"] == {"CD Guadalajara", "Chivas"}
+        assert fusion_log["america"] == {"Club América", "América"}
+
+    def test_matrix_is_consistent_with_dicts(self):
+        df = self._stats_df()
+        teams, matrix, _ = core.build_team_stats_matrix(df, "Clausura 2025")
+        team_stats, _ = core.build_team_stats_canonical(df, "Clausura 2025")
+        assert matrix.shape == (len(teams), len(core.TEAM_STAT_COLUMNS))
+        for team, row in zip(teams, matrix.tolist()):
+            assert dict(zip(core.TEAM_STAT_COLUMNS, row)) == team_stats[team]
+        # Cada partido aporta un PJ_home y un PJ_away
+        pj = matrix[:, core.TEAM_STAT_COLUMNS.index('PJ_home')].sum()
+        assert pj == matrix[:, core.TEAM_STAT_COLUMNS.index('PJ_away')].sum() == 4
+
+    def test_unknown_tournament_raises(self):
+        with pytest.raises(ValueError):
+            core.build_team_stats_canonical(self._stats_df(), "Torneo Inexistente")
+
+
+class TestWeightedPriorCube:
+    """El prior multi-torneo (cubo) debe coincidir con el ponderado torneo por torneo."""
+
+    @pytest.fixture
+    def no_prior_cache(self, monkeypatch):
+        from src.predicciones import utils
+        monkeypatch.setattr(utils, "load_prior_cache", lambda *a, **k: None)
+        monkeypatch.setattr(utils, "save_prior_cache", lambda *a, **k: None)
+
+    def test_prior_matches_per_tournament_weighting(self, no_prior_cache):
+        import pandas as pd
+
+        stats_df = pd.read_csv(STATS_PATH, sep="\t")
+        K = 3.0
+        tournaments = [
+            {"name": "Clausura 2025", "weight": 0.25},
+            {"name": "Apertura 2025", "weight": 0.50},
+            {"name": "TORNEO_INEXISTENTE", "weight": 0.25},
+        ]
+        prior = core.build_weighted_prior_stats(
+            stats_df, {"PRIOR_TOURNAMENTS": tournaments, "BAYES_K": K}
+        )
+
+        # Referencia: fórmula escalar sobre build_team_stats_canonical por torneo
+        sums, weights = {}, {}
+        for t in tournaments[:2]:
+            team_stats, _ = core.build_team_stats_canonical(stats_df, t["name"])
+            avg = core.calculate_league_averages_by_tournament(stats_df, t["name"])
+            for team, st in team_stats.items():
+                rate = (st["GF_home"] + K * avg["home"]) / (st["PJ_home"] + K)
+                sums[team] = sums.get(team, 0.0) + rate * t["weight"]
+                weights[team] = weights.get(team, 0.0) + t["weight"]
+
+        assert set(prior) == set(sums)
+        for team in sums:
+            assert prior[team]["rate_att_home_prior"] == pytest.approx(sums[team] / weights[team], rel=1e-12)
+
+    def test_cube_league_averages(self):
+        import pandas as pd
+
+        stats_df = pd.read_csv(STATS_PATH, sep="\t")
+        agg = core.build_tournament_cube(stats_df, ["Apertura 2025", "Clausura 2024", "NO_EXISTE"])
+        assert agg["tournaments"] == ["Apertura 2025", "Clausura 2024"]
+        assert agg["cube"].shape == (2, len(agg["teams"]), len(core.TEAM_STAT_COLUMNS))
+        for i, name in enumerate(agg["tournaments"]):
+            avg = core.calculate_league_averages_by_tournament(stats_df, name)
+            assert agg["avg_home"][i] == pytest.approx(avg["home"])
+            assert agg["matches"][i] == avg["matches"]
+
+
+class TestComponentsBatch:
+    """compute_components_and_lambdas_batch debe reproducir la versión escalar partido a partido."""
+
+    def test_all_pairings_match_scalar(self):
+        import numpy as np
+        import pandas as pd
+        from src.predicciones import config as cfg
+
+        config = dict(cfg.get_config(10), XG_BLEND=0.3)
+        stats_df = pd.read_csv(STATS_PATH, sep="\t")
+        current = config['CURRENT_TOURNAMENT']
+        team_stats, _ = core.build_team_stats_canonical(stats_df, current)
+        teams = list(team_stats)
+        # Prior parcial: equipos sin prior usan los defaults escalares
+        prior = {t: {'rate_att_home_prior': 1.3, 'att_home_prior': 1.1, 'def_away_prior': 0.9}
+                 for t in teams[::2]}
+        league_avg = core.calculate_league_averages_by_tournament(stats_df, current)
+        xg_lookup = {teams[0]: {'xG_per_match': 1.7, 'xGC': 12.0, 'PJ': 8},
+                     teams[1]: {'xG_per_match': 0.9, 'xGC': 0.0, 'PJ': 0}}
+
+        pairs = [(h, a) for h in range(len(teams)) for a in range(len(teams)) if h != a]
+        home_idx = np.array([h for h, _ in pairs])
+        away_idx = np.array([a for _, a in pairs])
+        rng = np.random.default_rng(3)
+        adj = rng.uniform(0.85, 1.15, (len(pairs), len(core.ADJUSTMENT_COLUMNS)))
+        rivalry = rng.random(len(pairs)) < 0.1
+
+        df = core.compute_components_and_lambdas_batch(
+            home_idx, away_idx, teams, team_stats, prior, league_avg, config,
+            adjustments=adj, rivalry=rivalry, xg_lookup=xg_lookup)
+        assert len(df) == len(pairs)
+
+        for i in range(0, len(pairs), 7):
+            h, a = pairs[i]
+            match = {'match': {'home': teams[h], 'away': teams[a], 'rivalry': bool(rivalry[i])}}
+            comp, errors = core.compute_components_and_lambdas(
+                match, team_stats, prior, league_avg, config, None,
+                dict(zip(core.ADJUSTMENT_COLUMNS, adj[i])), xg_lookup=xg_lookup)
+            assert not errors
+            assert list(df.columns) == list(comp)
+            row = df.iloc[i]
+            for key, value in comp.items():
+                if isinstance(value, str):
+                    assert row[key] == value
+                elif value is None:
+                    assert np.isnan(row[key]), key
+                else:
+                    assert row[key] == pytest.approx(value, rel=1e-12), key
+
+    def test_effective_goals_keep_integer_dtype_without_xg_blend(self):
+        import numpy as np
+        import pandas as pd
+        from src.predicciones import config as cfg
+
+        config = dict(cfg.get_config(10), XG_BLEND=0.4)
+        stats_df = pd.read_csv(STATS_PATH, sep="\t")
+        current = config['CURRENT_TOURNAMENT']
+        team_stats, _ = core.build_team_stats_canonical(stats_df, current)
+        teams = list(team_stats)
+        league_avg = core.calculate_league_averages_by_tournament(stats_df, current)
+        home_idx, away_idx = np.arange(0, 4), np.arange(4, 8)
+
+        # Sin xG (como el CSV de diagnóstico): mismo dtype entero que la versión por partido
+        df = core.compute_components_and_lambdas_batch(home_idx, away_idx, teams, team_stats, {},
+                                                       league_avg, config)
+        for col in ('eff_gf_home', 'eff_gc_home', 'eff_gf_away', 'eff_gc_away'):
+            assert df[col].dtype == df['gf_home_obs'].dtype, col
+        # Con xG en algún partido la columna pasa a float (igual que el DataFrame de dicts)
+        xg_lookup = {teams[0]: {'xG_per_match': 1.7, 'xGC': 12.0, 'PJ': 8}}
+        df = core.compute_components_and_lambdas_batch(home_idx, away_idx, teams, team_stats, {},
+                                                       league_avg, config, xg_lookup=xg_lookup)
+        assert df['eff_gf_home'].dtype == np.float64
+
+    def test_encode_matches(self):
+        teams = ["guadalajara", "america"]
+        matches = [
+            {'match': {'home': 'Chivas', 'away': 'Club América', 'rivalry': True}},
+            {'match': {'home': 'Tigres UANL', 'away': 'CD Guadalajara'}},
+        ]
+        home_idx, away_idx, rivalry = core.encode_matches(matches, teams)
+        assert teams == ["guadalajara", "america", "tigres"]
+        assert home_idx.tolist() == [0, 2]
+        assert away_idx.tolist() == [1, 0]
+        assert rivalry.tolist() == [True, False]
+
+
+class TestRoundRobin:
+    """round_robin_matrices: N×N lambdas/picks coherentes con el camino escalar."""
+
+    def test_matrices_match_scalar_path(self):
+        import numpy as np
+        import pandas as pd
+        from src.predicciones import config as cfg
+        from src.predicciones import quiniela as qx
+
+        config = cfg.get_config(10)
+        stats_df = pd.read_csv(STATS_PATH, sep="\t")
+        current = config['CURRENT_TOURNAMENT']
+        team_stats, _ = core.build_team_stats_canonical(stats_df, current)
+        league_avg = core.calculate_league_averages_by_tournament(stats_df, current)
+        teams = list(team_stats)
+        adj_map = {teams[0]: {'att_adj': 0.9, 'def_adj': 1.1, 'notes': []}}
+        form = {teams[1]: 1.05}
+
+        rr = core.round_robin_matrices(
+            team_stats, {}, league_avg, config, team_adjustments=adj_map,
+            form_multipliers=form, rivalries=[(teams[1], teams[0])])
+
+        n = len(teams)
+        assert rr['lambda_home'].shape == (n, n)
+        assert np.isnan(np.diag(rr['lambda_home'])).all()
+        assert len(rr['components']) == n * (n - 1)
+
+        for h, a in [(0, 1), (1, 0), (2, 5), (n - 1, 0)]:
+            match = {'match': {'home': teams[h], 'away': teams[a], 'rivalry': {h, a} == {0, 1}}}
+            match_adj = {
+                'home_att_adj': adj_map.get(teams[h], {}).get('att_adj', 1.0),
+                'home_def_adj': adj_map.get(teams[h], {}).get('def_adj', 1.0),
+                'away_att_adj': adj_map.get(teams[a], {}).get('att_adj', 1.0),
+                'away_def_adj': adj_map.get(teams[a], {}).get('def_adj', 1.0),
+                'home_form_adj': form.get(teams[h], 1.0),
+                'away_form_adj': form.get(teams[a], 1.0),
+            }
+            comp, _ = core.compute_components_and_lambdas(
+                match, team_stats, {}, league_avg, config, None, match_adj)
+            assert rr['lambda_home'][h, a] == pytest.approx(comp['lambda_home_final'], rel=1e-12)
+            assert rr['lambda_away'][h, a] == pytest.approx(comp['lambda_away_final'], rel=1e-12)
+
+            single = qx.optimize_pick_for_quiniela(
+                comp['lambda_home_final'], comp['lambda_away_final'], dc_rho=config['DC_RHO'])
+            pairing = core.round_robin_pairing(rr, teams[h], teams[a])
+            assert pairing['pick_exact'] == single['pick_exact']
+            assert pairing['pick_1x2'] == single['pick_1x2']
+            assert pairing['ev'] == pytest.approx(single['ev'], rel=1e-12)
+
+    def test_pairing_rejects_same_team(self):
+        rr = {'teams': ['america', 'tigres']}
+        with pytest.raises(ValueError):
+            core.round_robin_pairing(rr, 'América', 'Club América')
@@ -0,0 +1,160 @@
+"""
+Tests de src/predicciones/data.py (loader tipado de stats + snapshot binario).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_data.py -v
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import data as data_loader
+
+TSV = (
+    "tournament\tmatchday\tdate\thome_team\taway_team\thome_goals\taway_goals\n"
+    "Clausura 2025\tJ1\t05/01/2025\tChivas\tClub América\t2\t0\n"
+    "Clausura 2025\tJ1\t06/01/2025\tTigres UANL\tCD Guadalajara\t1\t1\n"
+    "Clausura 2025\tJ2\t12/01/2025\tAmérica\tTigres UANL\t0\t3\n"
+)
+
+
+class TestStatsSnapshot:
+    """Parse-once: tipos compactos y snapshot .npy llave = hash del archivo."""
+
+    def _write(self, tmp_path, text=TSV):
+        path = tmp_path / "stats.tsv"
+        path.write_text(text, encoding="utf-8")
+        return str(path)
+
+    def test_typed_columns(self, tmp_path):
+        df = data_loader.parse_stats_table(self._write(tmp_path))
+        assert df["date"].dtype == "datetime64[ns]"
+        assert df["date"].iloc[1] == pd.Timestamp("2025-01-06")  # day-first
+        assert df["home_goals"].dtype == np.int8
+        assert isinstance(df["home_team"].dtype, pd.CategoricalDtype)
+        assert df["home_team_canonical"].tolist() == ["guadalajara", "tigres", "america"]
+        assert df["away_team_canonical"].tolist() == ["america", "guadalajara", "tigres"]
+
+    def test_snapshot_roundtrip(self, tmp_path):
+        path = self._write(tmp_path)
+        snap_dir = str(tmp_path / "processed")
+        cold = data_loader.load_stats_table(path, snap_dir)
+        assert len([n for n in os.listdir(snap_dir) if n.endswith(".npy")]) == 1
+
+        warm = data_loader.load_stats_table(path, snap_dir)
+        pd.testing.assert_frame_equal(cold, warm)
+
+    def test_source_change_builds_new_snapshot(self, tmp_path):
+        path = self._write(tmp_path)
+        snap_dir = str(tmp_path / "processed")
+        data_loader.load_stats_table(path, snap_dir)
+
+        self._write(tmp_path, TSV + "Clausura 2025\tJ2\t13/01/2025\tToluca\tChivas\t2\t2\n")
+        df = data_loader.load_stats_table(path, snap_dir)
+        assert len(df) == 4
+        assert len([n for n in os.listdir(snap_dir) if n.endswith(".npy")]) == 2
+
+    def test_eviction_removes_pairs_and_tolerates_races(self, tmp_path, monkeypatch):
+        snap_dir = tmp_path / "processed"
+        snap_dir.mkdir()
+        for i in range(5):
+            for ext in (".json", ".npy"):
+                path = snap_dir / f"stats_snapshot_{i}{ext}"
+                path.write_text("x")
+                os.utime(path, (1_000_000 + i, 1_000_000 + i))
+        (snap_dir / "stats_snapshot_0.npy").unlink()  # par a medio borrar por otro worker
+        real_listdir = os.listdir
+        monkeypatch.setattr(os, "listdir", lambda d: real_listdir(d) + ["stats_snapshot_ghost.json"])
+
+        data_loader._evict_stats_snapshots(str(snap_dir), max_files=3)
+        assert sorted(real_listdir(snap_dir)) == sorted(
+            f"stats_snapshot_{i}{ext}" for i in (2, 3, 4) for ext in (".json", ".npy"))
+
+    def test_typed_frame_feeds_core(self, tmp_path):
+        from src.predicciones import core
+
+        path = self._write(tmp_path)
+        typed = data_loader.load_stats_table(path, str(tmp_path / "processed"))
+        raw = pd.read_csv(path, sep="\t")
+        assert core.build_team_stats_canonical(typed, "Clausura 2025") == \
+            core.build_team_stats_canonical(raw, "Clausura 2025")
+        assert core.calculate_league_averages_by_tournament(typed, "Clausura 2025") == \
+            core.calculate_league_averages_by_tournament(raw, "Clausura 2025")
+
+
+KEY_PLAYERS = {
+    "players": [
+        {"name": "Efraín Álvarez", "team": "CD Guadalajara", "rank": 1},
+        {"name": "Roberto Alvarado", "team": "Chivas", "rank": 60},
+        {"name": "Luis Romo", "team": "Chivas", "rank": 120},
+        {"name": "Luis Chávez", "team": "Chivas", "rank": 130},
+    ],
+    "elite_traits_players": {
+        "elite_scorer": [{"name": "Armando González", "team": "Guadalajara"}],
+    },
+}
+
+
+class TestKeyPlayerIndex:
+    """Índice de jugadores clave: llaves normalizadas, alias por tokens e invalidación."""
+
+    def _write(self, tmp_path, payload=KEY_PLAYERS):
+        path = tmp_path / "key_players.json"
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        return str(path)
+
+    def test_importance_levels_and_aliases(self, tmp_path):
+        index = data_loader.KeyPlayerIndex.from_file(self._write(tmp_path))
+        assert index.importance("Chivas", "EFRAIN ALVAREZ ") == "High"
+        assert index.importance("guadalajara", "Roberto Alvarado") == "Mid"
+        assert index.importance("Chivas", "Luis Romo") is None          # rank > 80
+        # Variantes del nombre: apodo intercalado, inicial, sólo apellido único
+        assert index.importance("Chivas", "Armando 'Hormiga' González") == "High"
+        assert index.importance("Chivas", "A. González") == "High"
+        assert index.importance("Chivas", "Alvarado") == "Mid"
+        # Ambiguo ("Luis" está en dos jugadores) u otro equipo → sin override
+        assert index.resolve("Chivas", "Luis") is None
+        assert index.importance("América", "Efraín Álvarez") is None
+
+    def test_index_is_shared_until_file_changes(self, tmp_path):
+        path = self._write(tmp_path)
+        first = data_loader.key_player_index(path)
+        assert data_loader.key_player_index(path) is first
+
+        payload = dict(KEY_PLAYERS, players=KEY_PLAYERS["players"][:1])
+        self._write(tmp_path, payload)
+        os.utime(path, ns=(0, 0))  # mtime distinto aunque el reloj no avance
+        second = data_loader.key_player_index(path)
+        assert second is not first
+        assert len(second) == 2
+
+    def test_missing_or_broken_file_is_cached(self, tmp_path, capsys):
+        missing = str(tmp_path / "nope.json")
+        assert data_loader.get_player_importance_level("Chivas", "X", data_loader.key_player_index(missing)) is None
+        data_loader.key_player_index(missing)
+        assert capsys.readouterr().out.count("not found") == 1
+
+        broken = tmp_path / "broken.json"
+        broken.write_text("{", encoding="utf-8")
+        assert len(data_loader.key_player_index(str(broken))) == 0
+        data_loader.key_player_index(str(broken))
+        assert capsys.readouterr().out.count("ERROR loading key players") == 1
+
+    def test_collect_manual_bajas_uses_index(self, tmp_path):
+        index = data_loader.KeyPlayerIndex.from_file(self._write(tmp_path))
+        bajas = tmp_path / "bajas.json"
+        bajas.write_text(json.dumps({"bajas_identificadas": [
+            {"team": "Chivas", "player": "A. González", "role": "Atacante", "status": "Fuera",
+             "manual_impact_level": "Low"},
+            {"team": "Chivas", "player": "Luis Romo", "role": "Medio", "status": "Fuera",
+             "manual_impact_level": "Low"},
+        ]}), encoding="utf-8")
+        collected = data_loader.collect_manual_bajas(str(bajas), index)
+        assert [b["impact_level"] for b in collected] == ["High", "Low"]
@@ -0,0 +1,142 @@
+"""
+Tests de src/predicciones/improvements.py (índice por equipo, forma, momentum, crisis).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_improvements.py -v
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import improvements
+
+
+def _stats_df():
+    return pd.DataFrame({
+        "date": ["05/01/2025", "12/01/2025", "19/01/2025", "26/01/2025", "02/02/2025", "09/02/2025"],
+        "home_team": ["Chivas", "América", "CD Guadalajara", "Tigres UANL", "Chivas", "Chivas"],
+        "away_team": ["Club América", "Chivas", "Tigres UANL", "Chivas", "Toluca", "América"],
+        "home_goals": [2, 1, 0, 3, 1, 2],
+        "away_goals": [0, 1, 1, 1, 1, 0],
+        "tournament": ["Clausura 2025"] * 6,
+    })
+
+
+class TestTeamTimelineIndex:
+    """Últimos N por equipo vía searchsorted, sin copiar stats_df."""
+
+    def test_last_n_is_recent_first_and_strictly_before(self):
+        index = improvements.TeamTimelineIndex(_stats_df())
+        last = index.last_n("guadalajara", "2025-02-02", 3)
+        # 26/01 derrota visitante, 19/01 derrota local, 12/01 empate visitante
+        assert last["points"].tolist() == [0, 0, 1]
+        assert last["is_home"].tolist() == [False, True, False]
+        assert last["gf"].tolist() == [1, 0, 1]
+
+        home = index.last_n("guadalajara", "2025-03-01", 10, home_only=True)
+        assert home["points"].tolist() == [3, 1, 0, 3]
+        assert len(index.last_n("equipo_inexistente", "2025-03-01", 5)["points"]) == 0
+
+    @pytest.mark.parametrize("func", [
+        improvements.calculate_recent_form,
+        improvements.calculate_momentum_direction,
+        improvements.calculate_home_crisis_factor,
+    ])
+    def test_index_and_dataframe_inputs_agree(self, func):
+        df = _stats_df()
+        index = improvements.TeamTimelineIndex(df)
+        for date in ("2025-01-20", "2025-02-05", "2025-03-01"):
+            assert func(index, "guadalajara", date) == func(df, "guadalajara", date)
+
+    def test_form_counts_points(self):
+        mult, info = improvements.calculate_recent_form(_stats_df(), "guadalajara", "2025-03-01", n=5)
+        # Últimos 5: V, E, D, D, E → 5 pts de 15
+        assert info["points"] == 5
+        assert info["max_points"] == 15
+        assert mult == pytest.approx(1.0)
+
+
+class TestFusedFeatureExtractor:
+    """extract_team_features debe coincidir con las tres funciones por separado."""
+
+    def test_batch_matches_individual_functions(self):
+        df = _stats_df()
+        index = improvements.TeamTimelineIndex(df)
+        config = {'RECENT_FORM_GAMES': 4, 'N_HOME_FORM': 3, 'MOMENTUM_THRESHOLD': 0.1}
+        queries = [(t, d) for t in ("guadalajara", "america", "tigres")
+                   for d in ("2025-01-20", "2025-02-05", "2025-03-01")]
+        queries.append(queries[0])  # duplicados se resuelven una vez
+
+        features = improvements.extract_team_features(index, queries, config)
+        assert len(features) == 9
+        for team, date in queries:
+            rec = features[(team, date)]
+            assert (rec['form_multiplier'], rec['form_info']) == \
+                improvements.calculate_recent_form(index, team, date, 4)
+            assert (rec['momentum_multiplier'], rec['momentum_info']) == \
+                improvements.calculate_momentum_direction(index, team, date, threshold=0.1)
+            assert (rec['home_crisis_multiplier'], rec['home_crisis_info']) == \
+                improvements.calculate_home_crisis_factor(index, team, date, n_home=3)
+
+
+class TestPointInTimeFeatureStore:
+    """Una pasada cronológica debe dar lo mismo que consultar el índice partido a partido."""
+
+    def test_store_matches_extractor_for_every_match(self):
+        df = _stats_df()
+        store = improvements.build_point_in_time_features(df)
+        index = improvements.TeamTimelineIndex(df)
+        assert len(store) == len(df)
+        assert store['date'].is_monotonic_increasing
+
+        for rec in store.itertuples():
+            feats = improvements.extract_team_features(
+                index, [(rec.home_team_canonical, rec.date), (rec.away_team_canonical, rec.date)])
+            home = feats[(rec.home_team_canonical, rec.date)]
+            away = feats[(rec.away_team_canonical, rec.date)]
+            assert rec.home_form_mult == home['form_multiplier']
+            assert rec.away_form_mult == away['form_multiplier']
+            assert rec.home_momentum_mult == home['momentum_multiplier']
+            assert rec.home_crisis_mult == home['home_crisis_multiplier']
+
+    def test_same_day_matches_do_not_leak(self):
+        df = _stats_df()
+        df.loc[5, 'date'] = df.loc[4, 'date']  # Chivas juega dos veces el 02/02
+        store = improvements.build_point_in_time_features(df).set_index('row')
+        assert store.loc[5, 'home_form_games'] == store.loc[4, 'home_form_games']
+        assert store.loc[5, 'home_form_pct'] == store.loc[4, 'home_form_pct']
+
+    def test_persist_roundtrip_and_invalidation(self, tmp_path):
+        df = _stats_df()
+        path = str(tmp_path / "feature_store.npz")
+        built = improvements.point_in_time_feature_store(df, path=path)
+
+        loaded = improvements.load_feature_store(path, df)
+        assert list(loaded.columns) == list(built.columns)
+        assert loaded['home_form_mult'].tolist() == built['home_form_mult'].tolist()
+        assert loaded['home_crisis_label'].tolist() == built['home_crisis_label'].tolist()
+
+        # Datos corregidos o parámetros distintos → reconstrucción
+        changed = df.copy()
+        changed.loc[0, 'home_goals'] = 5
+        assert improvements.load_feature_store(path, changed) is None
+        assert improvements.load_feature_store(path, df, {'RECENT_FORM_GAMES': 3}) is None
+
+    def test_date_change_rebuilds_store(self, tmp_path):
+        df = _stats_df()
+        path = str(tmp_path / "feature_store.npz")
+        improvements.point_in_time_feature_store(df, path=path)
+        assert improvements.load_feature_store(path, df) is not None
+
+        moved = df.copy()
+        moved.loc[5, 'date'] = moved.loc[4, 'date']  # misma fila, otra fecha
+        assert improvements.load_feature_store(path, moved) is None
+        rebuilt = improvements.point_in_time_feature_store(moved, path=path)
+        expected = improvements.build_point_in_time_features(moved)
+        assert rebuilt['home_form_games'].tolist() == expected['home_form_games'].tolist()
+        assert improvements.load_feature_store(path, moved) is not None
@@ -0,0 +1,61 @@
+"""
+Tests del contexto compartido del pipeline in-process (src/predicciones/pipeline.py).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_pipeline.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import config as cfg
+from src.predicciones import core
+from src.predicciones.adjustments import TeamAdjustments
+from src.predicciones.pipeline import PipelineContext
+
+
+@pytest.fixture
+def ctx(tmp_path):
+    # Caches en tmp_path: los tests no escriben en data/processed
+    config = dict(cfg.get_config(10), STATS_SNAPSHOT_DIR=None, PICK_CACHE_PATH=None,
+                  CACHE_DIR=str(tmp_path), FEATURE_STORE_PATH=str(tmp_path / "feature_store.npz"))
+    return PipelineContext(config)
+
+
+class TestPipelineContext:
+    """Los inputs se cargan una vez y cada step recibe su propia copia de lo mutable."""
+
+    def test_inputs_are_loaded_once(self, ctx):
+        assert ctx.stats_df is ctx.stats_df
+        assert ctx.team_stats_current is ctx.team_stats_current
+        assert ctx.prior_weighted_stats is ctx.prior_weighted_stats
+
+    def test_adjustment_map_copies_are_independent(self, ctx):
+        base = TeamAdjustments()
+        base.record('america', 'manual', att_adj=0.95, notes='baja')
+        ctx.__dict__['_base_adjustment_map'] = base
+        first = ctx.adjustment_map()
+        first.record('america', 'xpts', att_adj=0.5, notes='regresion')
+        first.record('toluca', 'xpts', def_adj=1.1)
+
+        second = ctx.adjustment_map()
+        assert second.factor('america') == (0.95, 1.0)
+        assert second.channel('america', 'notes') == ['baja']
+        assert 'toluca' not in second
+
+    def test_base_components_match_scalar(self, ctx):
+        df = ctx.base_components
+        matches = ctx.matches_data['matches']
+        assert len(df) == len(matches)
+
+        for i, match in enumerate(matches):
+            comp, errors = core.compute_components_and_lambdas(
+                match, ctx.team_stats_current, ctx.prior_weighted_stats,
+                ctx.league_avg_curr, ctx.config, None, None)
+            assert not errors
+            assert df.iloc[i]['lambda_home_final'] == pytest.approx(comp['lambda_home_final'], rel=1e-12)
+            assert df.iloc[i]['lambda_away_final'] == pytest.approx(comp['lambda_away_final'], rel=1e-12)
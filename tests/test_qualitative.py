@@ -0,0 +1,63 @@
+"""
+Tests del parser cualitativo (src/predicciones/qualitative.py).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_qualitative.py -v
+"""
+import sys
+from pathlib import Path
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import data as data_loader
+from src.predicciones import qualitative
+
+SAMPLE = """CONTEXTO CUALITATIVO JORNADA 6 - LIGA MX CLAUSURA 2026
+
+AUSENCIAS CONFIRMADAS (Pumas):
+Jugador: José Macías | Posición/rol: Delantero | Estatus: Fuera | Qué pasó: Lesión
+
+TRANSFERENCIAS RECIENTES (últimos 7 días):
+Equipo: Pumas | Jugador: Uriel Antuna | Entrada | Posición: Extremo
+Equipo: América | Sin jugador
+
+CONTEXTO COMPETITIVO:
+Tipo: extreme_crisis_squad + defensive_crisis
+Afecta a: Santos (extrema) / Queretaro / Atlético San Luis (presión)
+Evidencia: Santos en último lugar
+Tipo: momentum
+Afecta a: Equipo desconocido
+Evidencia: sigue pegada al último equipo reconocido
+"""
+
+
+class TestParser:
+    """Máquina de estados: secciones, alias más largo y evidencia del último equipo."""
+
+    def test_entries(self):
+        entries = qualitative.parse_qualitative(SAMPLE)
+        assert [(e['kind'], e['team']) for e in entries] == [
+            ('transfer', 'pumas'), ('transfer', 'america'),
+            ('context', 'santos laguna'), ('context', 'queretaro'), ('context', 'atletico de san luis'),
+            ('evidence', 'atletico de san luis'), ('evidence', 'atletico de san luis'),
+        ]
+        assert entries[1]['player'] == "Player"
+        assert [e['effect'] for e in entries if e['kind'] == 'context'] == ['crisis', 'crisis', None]
+        assert entries[3]['subtype'] == 'extreme_crisis_squad + defensive_crisis'
+
+    def test_match_team_prefers_longest_alias(self):
+        assert qualitative.match_team("Atlético de San Luis") == 'atletico de san luis'
+        assert qualitative.match_team("LEON (crisis)") == 'leon'
+        assert qualitative.match_team("León") is None  # como el parser anterior: no normaliza acentos
+        assert qualitative.match_team("Luisito") is None
+
+    def test_apply_to_adjustment_map(self, tmp_path):
+        path = tmp_path / "cualitativo.json"
+        path.write_text(SAMPLE, encoding="utf-8")
+        adj = data_loader.load_qualitative_adjustments({'pumas': {'att_adj': 1.0, 'def_adj': 1.0, 'notes': []}},
+                                                       str(path))
+        assert adj['pumas']['att_adj'] == 1.02
+        assert adj['queretaro']['att_adj'] == 0.95 and adj['queretaro']['def_adj'] == 1.05
+        assert adj['atletico de san luis']['att_adj'] == 1.0
+        assert len(adj['atletico de san luis']['context_txt']) == 2
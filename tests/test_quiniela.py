@@ -0,0 +1,210 @@
+"""
+Tests del motor de quiniela (grilla de marcadores + optimización de pick).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_quiniela.py -v
+"""
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import quiniela as qx
+
+
+def _reference_grid(lambda_home, lambda_away, dc_rho, max_goals):
+    """Grilla escalar celda por celda (implementación original con loops)."""
+    cells = {}
+    for h in range(max_goals + 1):
+        for a in range(max_goals + 1):
+            p = qx.poisson_prob(lambda_home, h) * qx.poisson_prob(lambda_away, a)
+            cells[(h, a)] = p * qx.dc_correction(h, a, lambda_home, lambda_away, dc_rho)
+    return cells
+
+
+LAMBDA_CASES = [
+    (1.38, 1.20, -0.10),
+    (2.45, 0.62, -0.14),
+    (0.55, 1.90, -0.10),
+    (3.80, 3.10, 0.00),
+]
+
+
+class TestScorelineMatrixEngine:
+    """La versión matricial debe reproducir la grilla escalar Poisson × Dixon-Coles."""
+
+    @pytest.mark.parametrize("lh,la,rho", LAMBDA_CASES)
+    def test_grid_matches_scalar_loop(self, lh, la, rho):
+        max_goals = qx.choose_grid_limit(lh, la)
+        grid = qx.scoreline_grid(lh, la, rho, max_goals)
+        ref = _reference_grid(lh, la, rho, max_goals)
+        for (h, a), p in ref.items():
+            assert grid[h, a] == pytest.approx(p, rel=1e-12)
+
+    @pytest.mark.parametrize("lh,la,rho", LAMBDA_CASES)
+    def test_outcome_probs_and_pick(self, lh, la, rho):
+        result = qx.optimize_pick_for_quiniela(lh, la, dc_rho=rho)
+        ref = _reference_grid(lh, la, rho, result['grid_max_goals'])
+        mass = sum(ref.values())
+        p1 = sum(p for (h, a), p in ref.items() if h > a) / mass
+        px = sum(p for (h, a), p in ref.items() if h == a) / mass
+        p2 = sum(p for (h, a), p in ref.items() if h < a) / mass
+
+        assert result['captured_mass'] == pytest.approx(mass, rel=1e-12)
+        assert result['prob_home_win'] == pytest.approx(p1, rel=1e-12)
+        assert result['prob_draw'] == pytest.approx(px, rel=1e-12)
+        assert result['prob_away_win'] == pytest.approx(p2, rel=1e-12)
+
+        # EV del pick = mejor exacto de su escenario + prob. del escenario
+        outcome_prob = {'1': p1, 'X': px, '2': p2}
+        evs = {}
+        for o, pred in (('1', lambda h, a: h > a), ('X', lambda h, a: h == a), ('2', lambda h, a: h < a)):
+            evs[o] = max(p for (h, a), p in ref.items() if pred(h, a)) / mass + outcome_prob[o]
+        assert result['pick_1x2'] == max(evs, key=evs.get)
+        assert result['ev'] == pytest.approx(max(evs.values()), rel=1e-12)
+
+    def test_return_schema_is_preserved(self):
+        result = qx.optimize_pick_for_quiniela(1.5, 1.1)
+        assert set(result) == {
+            'pick_exact', 'pick_1x2', 'ev', 'ev_confidence_gap',
+            'prob_home_win', 'prob_draw', 'prob_away_win',
+            'top_5_by_prob', 'top_5_by_ev', 'grid_max_goals', 'captured_mass',
+        }
+        assert len(result['top_5_by_prob']) == 5
+        for item in result['top_5_by_prob'] + result['top_5_by_ev']:
+            assert set(item) == {'h', 'a', 'score', 'prob_raw', 'outcome', 'prob', 'ev'}
+            assert item['score'] == f"{item['h']}-{item['a']}"
+            assert isinstance(item['prob'], float)
+
+        probs = [x['prob'] for x in result['top_5_by_prob']]
+        assert probs == sorted(probs, reverse=True)
+        evs = [x['ev'] for x in result['top_5_by_ev']]
+        assert evs == sorted(evs, reverse=True)
+
+
+class TestGridLimit:
+    """El dimensionamiento incremental debe coincidir con la búsqueda exhaustiva."""
+
+    @staticmethod
+    def _brute_force_limit(lh, la, target=0.995, min_goals=5, max_cap=12):
+        for g in range(min_goals, max_cap + 1):
+            mass_h = sum(qx.poisson_prob(lh, k) for k in range(g + 1))
+            mass_a = sum(qx.poisson_prob(la, k) for k in range(g + 1))
+            if mass_h * mass_a >= target:
+                return g
+        return max_cap
+
+    @pytest.mark.parametrize("lh,la", [(0.25, 0.25), (1.4, 1.1), (3.2, 0.4), (4.0, 4.0), (6.5, 1.0)])
+    def test_limit_matches_exhaustive_search(self, lh, la):
+        assert qx.choose_grid_limit(lh, la) == self._brute_force_limit(lh, la)
+
+    def test_returned_pmfs_cover_the_grid(self):
+        max_goals, pmf_home, pmf_away = qx.grid_limit_with_pmfs(2.1, 0.9)
+        assert len(pmf_home) == len(pmf_away) == max_goals + 1
+        for k in range(max_goals + 1):
+            assert pmf_home[k] == pytest.approx(qx.poisson_prob(2.1, k), rel=1e-12)
+            assert pmf_away[k] == pytest.approx(qx.poisson_prob(0.9, k), rel=1e-12)
+
+
+class TestBatchOptimizer:
+    """optimize_picks_batch debe coincidir partido a partido con la versión escalar."""
+
+    def test_batch_matches_scalar(self):
+        rng = np.random.default_rng(7)
+        lh = rng.uniform(0.25, 4.0, 200)
+        la = rng.uniform(0.25, 4.0, 200)
+        rho = rng.uniform(-0.18, 0.0, 200)
+
+        batch = qx.optimize_picks_batch(lh, la, rho, chunk_size=64)
+
+        for i in range(len(lh)):
+            single = qx.optimize_pick_for_quiniela(lh[i], la[i], dc_rho=rho[i])
+            for key in ('pick_exact', 'pick_1x2', 'grid_max_goals'):
+                assert batch[key][i] == single[key], key
+            for key in ('ev', 'ev_confidence_gap', 'prob_home_win', 'prob_draw',
+                        'prob_away_win', 'captured_mass'):
+                assert batch[key][i] == pytest.approx(single[key], rel=1e-12), key
+
+    def test_broadcast_shape(self):
+        lh = np.full((9, 50), 1.6)
+        la = np.linspace(0.5, 2.5, 50)
+        batch = qx.optimize_picks_batch(lh, la, dc_rho=-0.10)
+        assert batch['ev'].shape == (9, 50)
+        assert batch['pick_1x2'].shape == (9, 50)
+        # Mismas lambdas en cada fila → mismos picks
+        assert (batch['pick_exact'] == batch['pick_exact'][0]).all()
+
+    def test_evaluate_fixed_pick_matches_scalar_ev(self):
+        lh = np.array([1.6, 0.7, 2.9])
+        la = np.array([1.1, 1.8, 0.5])
+        batch = qx.optimize_picks_batch(lh, la, -0.10)
+        for i in range(len(lh)):
+            single = qx.optimize_pick_for_quiniela(lh[i], la[i], dc_rho=-0.10)
+            for item in single['top_5_by_ev']:
+                ev = qx.evaluate_pick_batch(lh, la, -0.10, item['score'], batch)
+                assert ev[i] == pytest.approx(item['ev'], rel=1e-12)
+        # Marcador fuera de la grilla → sólo cuenta la prob. del escenario
+        far = qx.evaluate_pick_batch(lh, la, -0.10, "13-0", batch)
+        assert far == pytest.approx(batch['prob_home_win'], rel=1e-12)
+
+
+class TestPickCache:
+    """Cache LRU con llave cuantizada delante de optimize_pick_for_quiniela."""
+
+    def test_hits_misses_and_quantized_key(self):
+        cache = qx.PickCache(maxsize=8, resolution=1e-4)
+        first = cache.optimize(1.41234, 1.10001, -0.10)
+        # Dentro de la misma celda de cuantización → hit con el mismo resultado
+        second = cache.optimize(1.41231, 1.09999, -0.10)
+        assert second is first
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+        expected = qx.optimize_pick_for_quiniela(1.4123, 1.1, dc_rho=-0.10)
+        assert first['ev'] == pytest.approx(expected['ev'], rel=1e-12)
+        assert first['pick_exact'] == expected['pick_exact']
+
+    def test_lru_eviction_is_bounded(self):
+        cache = qx.PickCache(maxsize=3)
+        for lh in (1.0, 1.1, 1.2, 1.3):
+            cache.optimize(lh, 1.0)
+        assert cache.stats()['size'] == 3
+        cache.optimize(1.0, 1.0)  # el más antiguo fue expulsado
+        assert cache.stats()['misses'] == 5
+
+    def test_persist_roundtrip(self, tmp_path):
+        path = str(tmp_path / "pick_cache.json")
+        cache = qx.PickCache()
+        original = cache.optimize(2.05, 0.85, -0.14)
+        cache.save(path)
+
+        reloaded = qx.PickCache.load(path)
+        result = reloaded.optimize(2.05, 0.85, -0.14)
+        assert reloaded.stats()['hits'] == 1
+        assert result['pick_exact'] == original['pick_exact']
+        assert result['top_5_by_ev'] == original['top_5_by_ev']
+
+    def test_load_ignores_other_resolution(self, tmp_path):
+        path = str(tmp_path / "pick_cache.json")
+        cache = qx.PickCache(resolution=1e-3)
+        cache.optimize(1.5, 1.2)
+        cache.save(path)
+        assert qx.PickCache.load(path, resolution=1e-4).stats()['size'] == 0
+
+    def test_load_rejects_other_optimizer_code(self, tmp_path):
+        path = tmp_path / "pick_cache.json"
+        cache = qx.PickCache()
+        cache.optimize(1.5, 1.2)
+        cache.save(str(path))
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        assert payload['code_version'] == qx.PickCache.code_version()
+        assert qx.PickCache.load(str(path)).stats()['size'] == 1
+
+        payload['code_version'] = 'stale000'  # picks de un optimizador anterior
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        assert qx.PickCache.load(str(path)).stats()['size'] == 0
@@ -0,0 +1,131 @@
+"""
+Tests del DAG incremental de run_pipeline.py (salto de etapas por hash de inputs).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_run_pipeline.py -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import run_pipeline
+
+
+@pytest.fixture
+def dag(tmp_path, monkeypatch):
+    """Dos etapas sintéticas: 'a' lee ctx.json + stats.json, 'b' sólo stats.json."""
+    (tmp_path / "ctx.json").write_text("{}")
+    (tmp_path / "stats.json").write_text("[]")
+    stages = [
+        {'name': 'a', 'description': 'A', 'script': 'run_pipeline.py',
+         'inputs': [str(tmp_path / "ctx.json"), str(tmp_path / "stats.json")],
+         'outputs': [str(tmp_path / "a.out")]},
+        {'name': 'b', 'description': 'B', 'script': 'run_pipeline.py',
+         'inputs': [str(tmp_path / "stats.json")],
+         'outputs': [str(tmp_path / "b.out")]},
+    ]
+    monkeypatch.setattr(run_pipeline, 'pipeline_stages', lambda cfg: stages)
+
+    ran = []
+
+    def runner(stage):
+        ran.append(stage['name'])
+        for path in stage['outputs']:
+            Path(path).write_text(f"{stage['name']} {len(ran)}")
+        return True
+
+    return tmp_path, ran, runner
+
+
+class TestStageDag:
+    """Sólo se re-ejecutan las etapas cuyos inputs, config o outputs cambiaron."""
+
+    def test_unchanged_inputs_skip_every_stage(self, dag):
+        _, ran, runner = dag
+        first = run_pipeline.run_dag({'JORNADA': 1}, runner)
+        assert ran == ['a', 'b']
+
+        second = run_pipeline.run_dag({'JORNADA': 1}, runner, first)
+        assert ran == ['a', 'b']
+        assert {r['status'] for r in second.values()} == {'skipped'}
+        assert second['a']['output_hashes'] == first['a']['output_hashes']
+
+    def test_only_affected_stages_rerun(self, dag):
+        tmp_path, ran, runner = dag
+        records = run_pipeline.run_dag({'JORNADA': 1}, runner)
+
+        (tmp_path / "ctx.json").write_text('{"fatigue": 1}')
+        records = run_pipeline.run_dag({'JORNADA': 1}, runner, records)
+        assert ran == ['a', 'b', 'a']
+        assert records['b']['status'] == 'skipped'
+
+        # Config distinta o output borrado → re-ejecuta
+        records = run_pipeline.run_dag({'JORNADA': 1, 'DC_RHO': -0.12}, runner, records)
+        assert ran == ['a', 'b', 'a', 'a', 'b']
+        (tmp_path / "b.out").unlink()
+        run_pipeline.run_dag({'JORNADA': 1, 'DC_RHO': -0.12}, runner, records)
+        assert ran[-1] == 'b' and ran.count('b') == 3
+
+    def test_failed_stage_aborts(self, dag):
+        assert run_pipeline.run_dag({'JORNADA': 1}, lambda stage: False) is None
+
+
+class TestMultiJornada:
+    """--jornadas: parseo del rango y configs explícitas con outputs separados."""
+
+    @pytest.mark.parametrize("spec,expected", [
+        ("6-10", [6, 7, 8, 9, 10]),
+        ("6,8,10", [6, 8, 10]),
+        ("9-10,6", [6, 9, 10]),
+        ("7", [7]),
+    ])
+    def test_parse_jornadas(self, spec, expected):
+        assert run_pipeline.parse_jornadas(spec) == expected
+
+    def test_parse_rejects_reversed_range(self):
+        with pytest.raises(ValueError):
+            run_pipeline.parse_jornadas("10-6")
+
+    def test_configs_do_not_share_outputs(self):
+        configs = [run_pipeline.jornada_config(j) for j in (8, 9)]
+        assert [c['JORNADA'] for c in configs] == [8, 9]
+        assert configs[0]['OUTPUT_CSV'] != configs[1]['OUTPUT_CSV']
+        assert configs[0]['OUTPUT_TXT'] != configs[1]['OUTPUT_TXT']
+        outputs = [p for c in configs for s in run_pipeline.pipeline_stages(c) for p in s['outputs']]
+        assert len(outputs) == len(set(outputs))
+
+    def test_robustez_only_tracked_when_monte_carlo_enabled(self):
+        def outputs(cfg):
+            return [p for s in run_pipeline.pipeline_stages(cfg) for p in s['outputs']]
+        assert not any('robustez' in p for p in outputs(run_pipeline.jornada_config(8)))
+        enabled = run_pipeline.jornada_config(8, {'MC_SIMULATIONS': 2000})
+        assert enabled['MC_SIMULATIONS'] == 2000
+        assert "outputs/robustez_jornada_8.csv" in outputs(enabled)
+
+    def test_subprocess_steps_use_per_jornada_config(self, tmp_path, monkeypatch):
+        """--jornadas --subprocess: cada step hijo escribe en los outputs de SU jornada."""
+        step = tmp_path / "step.py"
+        step.write_text(
+            "import src.predicciones.config as config\n"
+            "cfg = config.resolve_config()\n"
+            "with open(cfg['OUTPUT_CSV'], 'w') as f:\n"
+            "    f.write(f\"{cfg['JORNADA']} {cfg['MC_SIMULATIONS']}\")\n")
+        monkeypatch.setattr(run_pipeline, 'pipeline_stages', lambda cfg: [
+            {'name': 'diagnostico', 'description': 'D', 'script': str(step),
+             'inputs': [], 'outputs': [cfg['OUTPUT_CSV']]}])
+
+        records = {}
+        for jornada in (8, 9):
+            cfg = run_pipeline.jornada_config(jornada, {'MC_SIMULATIONS': 500})
+            cfg['OUTPUT_CSV'] = str(tmp_path / Path(cfg['OUTPUT_CSV']).name)
+            records[jornada] = run_pipeline.run_dag(cfg, run_pipeline.subprocess_runner(cfg))
+
+        for jornada in (8, 9):
+            output = tmp_path / f"diagnostico_lambda_components_jornada_{jornada}.csv"
+            assert output.read_text() == f"{jornada} 500"
+            hashes = records[jornada]['diagnostico']['output_hashes']
+            assert hashes[str(output)] is not None
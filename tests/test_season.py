@@ -0,0 +1,111 @@
+"""
+Tests del simulador de temporada (src/predicciones/season.py).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_season.py -v
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import core
+from src.predicciones import season
+
+
+def _table(pts, gd=None, gf=None):
+    n = len(pts)
+    return {
+        'pts': np.array(pts, dtype=np.int64),
+        'pj': np.zeros(n, dtype=np.int64),
+        'gd': np.array(gd if gd is not None else [0] * n, dtype=np.int64),
+        'gf': np.array(gf if gf is not None else [0] * n, dtype=np.int64),
+    }
+
+
+class TestRemainingFixtures:
+    """Pares pendientes: round-robin sencillo menos lo jugado; sede del calendario si existe."""
+
+    def test_pending_pairs_and_schedule(self):
+        stats_df = pd.DataFrame({
+            'tournament': ['C', 'C', 'A'],
+            'home_team': ['Toluca', 'Pachuca', 'Toluca'],
+            'away_team': ['América', 'Toluca', 'Pachuca'],
+            'home_goals': [1, 0, 2],
+            'away_goals': [0, 0, 1],
+        })
+        teams = ['toluca', 'america', 'pachuca']
+        home_idx, away_idx, neutral = season.remaining_fixtures(
+            stats_df, 'C', teams, scheduled=[('Pachuca', 'América'), ('América', 'Toluca')])
+        # Sólo falta américa-pachuca, con sede conocida (pachuca local)
+        assert list(zip(home_idx, away_idx)) == [(2, 1)]
+        assert not neutral.any()
+
+        _, _, neutral = season.remaining_fixtures(stats_df, 'C', teams)
+        assert neutral.all()
+
+    def test_table_tracks_goals_for(self):
+        stats_df = pd.DataFrame({
+            'tournament': ['C', 'C'], 'home_team': ['Toluca', 'Pachuca'],
+            'away_team': ['América', 'Toluca'], 'home_goals': [3, 1], 'away_goals': [1, 1],
+        })
+        table = core.calculate_current_table(stats_df, 'C')
+        assert table['toluca'] == {'pts': 4, 'pj': 2, 'gd': 2, 'gf': 4}
+        arrays = season.table_arrays(table, ['toluca', 'necaxa'])
+        assert list(arrays['gf']) == [4, 0]
+
+
+class TestSimulateSeasons:
+    """Distribuciones de posición: normalizadas, reproducibles e independientes de workers."""
+
+    @pytest.fixture
+    def league(self):
+        rng = np.random.default_rng(0)
+        n = 6
+        lambda_home = rng.uniform(0.8, 2.0, size=(n, n))
+        lambda_away = rng.uniform(0.5, 1.5, size=(n, n))
+        home_idx, away_idx = np.triu_indices(n, k=1)
+        neutral = np.arange(len(home_idx)) % 2 == 0
+        return _table([10, 9, 8, 8, 5, 3], gd=[4, 2, 1, 0, -3, -4], gf=[9, 8, 7, 7, 4, 3]), \
+            home_idx, away_idx, lambda_home, lambda_away, neutral
+
+    def test_distribution_is_normalized_and_reproducible(self, league):
+        table, home_idx, away_idx, lh, la, neutral = league
+        run = lambda: season.simulate_seasons(table, home_idx, away_idx, lh, la, neutral,
+                                              n_seasons=5000, seed=7, chunk_size=1500)
+        first, second = run(), run()
+        counts = first['position_counts']
+        assert (counts.sum(axis=0) == 5000).all()   # cada posición la ocupa un equipo
+        assert (counts.sum(axis=1) == 5000).all()   # cada equipo termina en una posición
+        np.testing.assert_array_equal(counts, second['position_counts'])
+        # Puntos esperados ≥ actuales (no se pueden perder puntos)
+        assert (first['points_sum'] / 5000 >= table['pts']).all()
+
+    def test_workers_do_not_change_result(self, league):
+        table, home_idx, away_idx, lh, la, neutral = league
+        kwargs = dict(n_seasons=3000, seed=3, chunk_size=1000)
+        serial = season.simulate_seasons(table, home_idx, away_idx, lh, la, neutral, **kwargs)
+        sharded = season.simulate_seasons(table, home_idx, away_idx, lh, la, neutral, workers=2, **kwargs)
+        np.testing.assert_array_equal(serial['position_counts'], sharded['position_counts'])
+        np.testing.assert_array_equal(serial['points_sum'], sharded['points_sum'])
+
+    def test_finished_tournament_follows_tiebreakers(self):
+        # Sin partidos pendientes: puntos > DG > GF; empate total → sorteo 50/50
+        table = _table([20, 20, 20, 15, 15], gd=[5, 5, 8, 0, 0], gf=[10, 12, 9, 6, 6])
+        empty = np.array([], dtype=np.intp)
+        lam = np.ones((5, 5))
+        sim = season.simulate_seasons(table, empty, empty, lam, lam, n_seasons=4000, seed=1)
+        summary = season.season_summary(['a', 'b', 'c', 'd', 'e'], table, sim,
+                                         {'LIGUILLA_DIRECT_SPOTS': 1, 'PLAY_IN_LAST_SPOT': 3})
+        by_team = summary.set_index('team')
+        assert by_team.loc['c', 'p_superlider'] == 1.0
+        assert by_team.loc['b', 'p_pos_2'] == 1.0
+        assert by_team.loc['a', 'p_play_in'] == 1.0
+        assert by_team.loc['d', 'p_pos_4'] == pytest.approx(0.5, abs=0.05)
+        assert (by_team['p_clasifica'][['d', 'e']] == 0).all()
+        assert list(summary['team'][:3]) == ['c', 'b', 'a']
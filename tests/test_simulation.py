@@ -0,0 +1,110 @@
+"""
+Tests del Monte Carlo de incertidumbre de lambdas (src/predicciones/simulation.py).
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_simulation.py -v
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import config as cfg
+from src.predicciones import core
+from src.predicciones import quiniela as qx
+from src.predicciones import simulation
+
+STATS_PATH = Path(__file__).parent.parent / "data" / "inputs" / "Stats_liga_mx.json"
+
+
+@pytest.fixture(scope="module")
+def jornada(tmp_path_factory):
+    # Cache del prior en un directorio temporal: los tests no escriben en data/processed
+    config = dict(cfg.get_config(10), CACHE_DIR=str(tmp_path_factory.mktemp("cache")))
+    stats_df = pd.read_csv(STATS_PATH, sep="\t")
+    current = config['CURRENT_TOURNAMENT']
+    team_stats, _ = core.build_team_stats_canonical(stats_df, current)
+    teams = list(team_stats)
+    prior = core.build_weighted_prior_stats(stats_df, config)
+    league_avg = core.calculate_league_averages_by_tournament(stats_df, current)
+    home_idx = np.arange(0, 8, 2)
+    away_idx = np.arange(1, 9, 2)
+    return config, teams, team_stats, prior, league_avg, home_idx, away_idx
+
+
+def _point_picks(config, teams, team_stats, prior, league_avg, home_idx, away_idx, dc_rho=-0.10):
+    df = core.compute_components_and_lambdas_batch(home_idx, away_idx, teams, team_stats, prior, league_avg, config)
+    batch = qx.optimize_picks_batch(df['lambda_home_final'].to_numpy(), df['lambda_away_final'].to_numpy(), dc_rho)
+    return list(batch['pick_exact']), batch['ev']
+
+
+class TestSampling:
+    """Los draws deben centrarse en los valores puntuales."""
+
+    def test_rate_draws_match_posterior_mean(self, jornada):
+        config, teams, team_stats, prior, league_avg, home_idx, away_idx = jornada
+        post = core.rate_posteriors_batch(home_idx, away_idx, teams, team_stats, prior, league_avg, config)
+        draws = simulation.sample_rates(post, 50000, np.random.default_rng(0))
+        for name, mean in core.posterior_mean_rates(post).items():
+            assert draws[name].shape == (50000, len(home_idx))
+            assert draws[name].mean(axis=0) == pytest.approx(mean, rel=0.02)
+
+    def test_adjustment_draws(self):
+        adjustments = np.array([[0.90, 1.0, 1.10, 1.0, 1.05, 0.97]])
+        cv = np.array([[0.5, 0.5, 0.2, 0.0, 0.0, 0.0]])
+        draws = simulation.sample_adjustments(adjustments, cv, 40000, np.random.default_rng(1))
+        assert draws.shape == (40000, 1, 6)
+        assert draws[:, 0, 0].mean() == pytest.approx(0.90, abs=2e-3)
+        assert draws[:, 0, 0].std() == pytest.approx(0.05, rel=0.05)
+        assert draws[:, 0, 2].std() == pytest.approx(0.02, rel=0.05)
+        # Sin efecto (1.0) o sin incertidumbre (cv 0, forma) → fijos
+        assert (draws[:, 0, 1] == 1.0).all()
+        assert (draws[:, 0, 3:] == adjustments[0, 3:]).all()
+
+    def test_confidence_narrows_uncertainty(self):
+        adj_map = {
+            'a': {'ausencias_items': [{'confidence': 1.0}]},
+            'b': {'ausencias_items': [{'confidence': 0.3}], 'context_items': [{'confidence': 0.5}]},
+        }
+        cv = simulation.adjustment_uncertainty(['a', 'b'], ['c', 'a'], adj_map, {})
+        assert cv[0, 0] == pytest.approx(0.15)          # confianza 1 → MC_ADJ_CV_MIN
+        assert cv[1, 0] == pytest.approx(0.60 * 0.6 + 0.15 * 0.4)
+        assert cv[0, 2] == pytest.approx(0.60 * 0.25 + 0.15 * 0.75)  # sin items → default 0.75
+        assert (cv[:, 4:] == 0).all()
+
+
+class TestPickRobustness:
+    """Estabilidad del pick y distribución de EV."""
+
+    def test_tight_posterior_reproduces_point_pick(self, jornada):
+        config, teams, team_stats, prior, league_avg, home_idx, away_idx = jornada
+        # Pseudo-conteos enormes → posterior casi degenerada en la tasa puntual
+        config = dict(config, BAYES_ALPHA_ATT=1e9, BAYES_ALPHA_DEF=1e9)
+        picks, evs = _point_picks(config, teams, team_stats, prior, league_avg, home_idx, away_idx)
+
+        result = simulation.simulate_pick_robustness(
+            home_idx, away_idx, teams, team_stats, prior, league_avg, config, picks, n_draws=2000, seed=3)
+        assert list(result['pick_exact_point']) == picks
+        assert (result['pick_stability'] == 1.0).all()
+        assert result['ev_p50'].to_numpy() == pytest.approx(evs, rel=1e-4)
+
+    def test_report_is_reproducible_and_bounded(self, jornada):
+        config, teams, team_stats, prior, league_avg, home_idx, away_idx = jornada
+        picks, _ = _point_picks(config, teams, team_stats, prior, league_avg, home_idx, away_idx)
+        run = lambda: simulation.simulate_pick_robustness(
+            home_idx, away_idx, teams, team_stats, prior, league_avg, config, picks,
+            adjustments=np.full((len(home_idx), 6), 0.95), adjustment_cv=np.full((len(home_idx), 6), 0.4),
+            dc_rho=np.full(len(home_idx), -0.12), n_draws=3000, seed=11)
+
+        first, second = run(), run()
+        pd.testing.assert_frame_equal(first, second)
+        assert ((first['pick_stability'] >= 0) & (first['pick_stability'] <= 1)).all()
+        assert (first['pick_1x2_stability'] >= first['pick_stability']).all()
+        assert (first['ev_p05'] <= first['ev_p50']).all()
+        assert (first['ev_p50'] <= first['ev_p95']).all()
+        assert (first['mc_modal_share'] >= first['pick_stability']).all()
@@ -0,0 +1,157 @@
+"""
+Tests de src/predicciones/utils.py: cache content-addressed (prior / league averages)
+y cache de hashes de archivos.
+
+Run with:
+    .venv\\Scripts\\python -m pytest tests/test_utils.py -v
+"""
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ensure project root is on the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.predicciones import utils
+
+CONFIG = {
+    'BAYES_ALPHA_ATT': 0.7, 'BAYES_ALPHA_DEF': 0.7, 'BLEND_K': 2.0, 'LEAGUE_AVG_K': 3.0,
+    'BAYES_K': 3.0, 'CLAMP_REL_MIN': 0.5, 'CLAMP_REL_MAX': 2.0,
+    'PRIOR_TOURNAMENTS': [{'name': 'Clausura 2025', 'weight': 1.0}],
+}
+
+
+def _stats_df():
+    return pd.DataFrame({
+        "tournament": ["Clausura 2025"] * 3,
+        "home_team": ["chivas", "america", "tigres"],
+        "away_team": ["america", "tigres", "chivas"],
+        "home_goals": [1, 2, 0],
+        "away_goals": [1, 1, 2],
+    })
+
+
+class TestContentAddressedCache:
+    """La llave del cache cubre config + contenido de stats + versión de código."""
+
+    def test_roundtrip_with_meta(self, tmp_path):
+        df = _stats_df()
+        path = utils.save_cached_artifact('prior', {'chivas': {'x': 1.5}}, CONFIG, df, str(tmp_path))
+        assert os.path.exists(path)
+        assert not [n for n in os.listdir(tmp_path) if '.tmp' in n]
+
+        data, meta = utils.load_cached_artifact('prior', CONFIG, df, str(tmp_path))
+        assert data == {'chivas': {'x': 1.5}}
+        assert meta['row_count'] == 3
+        assert meta['data_hash'] == utils.calculate_data_hash(df)
+        assert meta['code_version'] == utils.calculate_code_version()
+
+    def test_new_or_corrected_rows_invalidate(self, tmp_path):
+        df = _stats_df()
+        utils.save_cached_artifact('prior', {'ok': True}, CONFIG, df, str(tmp_path))
+
+        corrected = df.copy()
+        corrected.loc[1, 'away_goals'] = 2
+        appended = pd.concat([df, df.iloc[[0]]], ignore_index=True)
+        for changed in (corrected, appended):
+            assert utils.calculate_data_hash(changed) != utils.calculate_data_hash(df)
+            assert utils.load_cached_artifact('prior', CONFIG, changed, str(tmp_path)) == (None, None)
+
+        # Columnas ajenas al prior no cambian la llave
+        extra = df.assign(referee="x")
+        assert utils.calculate_data_hash(extra) == utils.calculate_data_hash(df)
+
+    def test_eviction_keeps_most_recent(self, tmp_path):
+        df = _stats_df()
+        for i in range(5):
+            cfg = dict(CONFIG, BAYES_K=float(i))
+            path = utils.save_cached_artifact('prior', {'i': i}, cfg, df, str(tmp_path), max_files=3)
+            os.utime(path, (1_000_000 + i, 1_000_000 + i))
+        utils.evict_cache_files('prior', str(tmp_path), max_files=3)
+
+        remaining = sorted(os.listdir(tmp_path))
+        assert len(remaining) == 3
+        assert utils.load_cached_artifact('prior', dict(CONFIG, BAYES_K=4.0), df, str(tmp_path))[0] == {'i': 4}
+        assert utils.load_cached_artifact('prior', dict(CONFIG, BAYES_K=0.0), df, str(tmp_path)) == (None, None)
+
+    def test_eviction_tolerates_files_removed_by_other_workers(self, tmp_path, monkeypatch):
+        for i in range(4):
+            path = tmp_path / f"prior_cache_{i}.json"
+            path.write_text("{}")
+            os.utime(path, (1_000_000 + i, 1_000_000 + i))
+        # Otro worker borra un archivo entre el listado y el stat, y otro antes del remove
+        real_listdir = os.listdir
+        monkeypatch.setattr(os, "listdir", lambda d: real_listdir(d) + ["prior_cache_ghost.json"])
+        real_remove = os.remove
+
+        def racing_remove(path):
+            real_remove(path)
+            if path.endswith("prior_cache_0.json"):
+                raise FileNotFoundError(path)
+        monkeypatch.setattr(os, "remove", racing_remove)
+
+        evicted = utils.evict_cache_files('prior', str(tmp_path), max_files=2)
+        assert sorted(os.path.basename(p) for p in evicted) == ["prior_cache_0.json", "prior_cache_1.json"]
+        assert sorted(real_listdir(tmp_path)) == ["prior_cache_2.json", "prior_cache_3.json"]
+
+
+class TestFileHashCache:
+    """Digests por (path, size, mtime_ns): archivos sin cambios no se vuelven a leer."""
+
+    @staticmethod
+    def _write(path, content, age_s=60):
+        path.write_bytes(content)
+        past = os.stat(path).st_mtime_ns - age_s * 1_000_000_000
+        os.utime(path, ns=(past, past))
+
+    def test_digest_and_memo(self, tmp_path):
+        f = tmp_path / "stats.json"
+        content = b"x" * (utils.HASH_CHUNK_SIZE * 2 + 17)
+        self._write(f, content)
+        cache = utils.FileHashCache()
+
+        assert cache.hash(str(f)) == hashlib.sha256(content).hexdigest()
+        assert cache.hash(str(f)) == hashlib.sha256(content).hexdigest()
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+        assert cache.hash(str(tmp_path / "missing.json")) == "FILE_NOT_FOUND"
+
+    def test_modified_file_is_rehashed(self, tmp_path):
+        f = tmp_path / "ctx.json"
+        self._write(f, b'{"a": 1}', age_s=120)
+        cache = utils.FileHashCache()
+        first = cache.hash(str(f))
+
+        self._write(f, b'{"a": 2}', age_s=60)  # mismo tamaño, otro mtime
+        assert cache.hash(str(f)) == hashlib.sha256(b'{"a": 2}').hexdigest() != first
+
+    def test_recent_files_are_not_memoized(self, tmp_path):
+        f = tmp_path / "out.csv"
+        f.write_bytes(b"a,b\n")
+        cache = utils.FileHashCache()
+        cache.hash(str(f))
+        cache.hash(str(f))
+        assert cache.stats()['misses'] == 2
+
+    def test_hash_many_and_sidecar_roundtrip(self, tmp_path):
+        paths = []
+        for i in range(5):
+            f = tmp_path / f"f{i}.json"
+            self._write(f, f"content {i}".encode())
+            paths.append(str(f))
+        sidecar = str(tmp_path / "hashes.json")
+
+        cache = utils.FileHashCache(sidecar)
+        digests = cache.hash_many(paths + paths[:2])
+        assert list(digests) == paths
+        assert digests[paths[3]] == hashlib.sha256(b"content 3").hexdigest()
+        assert cache.save() == sidecar
+
+        reloaded = utils.FileHashCache.load(sidecar)
+        assert reloaded.hash_many(paths) == digests
+        assert reloaded.stats()['hits'] == 5
+        assert reloaded.stats()['misses'] == 0